@@ -0,0 +1,58 @@
+"""Benchmark of the prediction path through a stack of decorators.
+
+Compares the work that the PredictionController did for each request before the DecoratorPipeline was added, which
+called predict() on the decorated model and read its qualified name for the debug log message, with the
+DecoratorPipeline. The pipeline also records the CPU time of each prediction, so it is measured with and without that
+accounting, and with profiling of each layer.
+
+Usage:
+    python benchmarks/decorator_pipeline.py
+
+"""
+import timeit
+from ml_base.decorator import MLModelDecorator
+
+from rest_model_service.decorator_pipeline import DecoratorPipeline
+from tests.mocks import IrisModel, IrisModelInput
+
+NUMBER = 20000
+REPEAT = 5
+LAYERS = 5
+
+
+def build_model():
+    model = IrisModel()
+    for _ in range(LAYERS):
+        model = MLModelDecorator().set_model(model)
+    return model
+
+
+def baseline(model, data):
+    # the controller called predict() on the decorated model and formatted its qualified name on every request
+    prediction = model.predict(data)
+    _ = model.qualified_name
+    return prediction
+
+
+def main():
+    data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+    model = build_model()
+    pipeline = DecoratorPipeline(build_model())
+    profiled_pipeline = DecoratorPipeline(build_model(), profile=True)
+
+    benchmarks = {
+        "baseline controller": lambda: baseline(model, data),
+        "precomposed chain": lambda: (pipeline._predict(data), pipeline.qualified_name),
+        "pipeline": lambda: (pipeline.predict(data), pipeline.qualified_name),
+        "profiled pipeline": lambda: (profiled_pipeline.predict(data), profiled_pipeline.qualified_name)
+    }
+
+    print("{} decorators, best of {} runs of {} predictions".format(LAYERS, REPEAT, NUMBER))
+    for name, function in benchmarks.items():
+        seconds = min(timeit.repeat(function, number=NUMBER, repeat=REPEAT))
+        print("{:<20} {:>8.2f} us per prediction".format(name, seconds / NUMBER * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark of the routing of prediction requests in a service with many models.
+
+Compares a route for each model with the single route of the prediction dispatcher, by sending a prediction request to
+the last model that was added to the service.
+
+Usage:
+    python benchmarks/prediction_routing.py
+
+"""
+import timeit
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model
+from tests import mocks
+
+NUMBER = 2000
+MODELS = 500
+
+
+def create_models():
+    # creating a model class with a different qualified name for each model
+    for i in range(MODELS):
+        name = "IrisModel{}".format(i)
+        setattr(mocks, name, type(name, (mocks.IrisModel,), {"qualified_name": "iris_model_{}".format(i)}))
+    return [Model(class_path="tests.mocks.IrisModel{}".format(i), create_endpoint=True) for i in range(MODELS)]
+
+
+def main():
+    models = create_models()
+    data = {"sepal_length": 6.0, "sepal_width": 5.0, "petal_length": 3.0, "petal_width": 2.0}
+    path = "/api/models/iris_model_{}/prediction".format(MODELS - 1)
+
+    results = {}
+    for name, prediction_dispatcher in [("route per model", False), ("prediction dispatcher", True)]:
+        ModelManager().clear_instance()
+        app = create_app(ServiceConfiguration(models=models, prediction_dispatcher=prediction_dispatcher),
+                         wait_for_model_creation=True)
+        with TestClient(app) as client:
+            assert client.post(path, json=data).status_code == 200
+            results[name] = timeit.timeit(lambda: client.post(path, json=data), number=NUMBER)
+
+    print("{} models, {} predictions".format(MODELS, NUMBER))
+    for name, seconds in results.items():
+        print("{:<25} {:>8.1f} us per prediction".format(name, seconds / NUMBER * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Store of memory-mapped model artifacts."""
+import os
+import mmap
+import logging
+from typing import Any, Dict, List, Tuple
+from threading import Lock
+from time import perf_counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+artifact_size = metrics.gauge("model_artifact_mapped_bytes",
+                              "Size of a memory-mapped model artifact, in bytes.",
+                              ["artifact"], multiprocess_mode="max")
+artifact_load_time = metrics.gauge("model_artifact_load_seconds",
+                                   "Time taken to map a model artifact into memory, in seconds.",
+                                   ["artifact"], multiprocess_mode="max")
+
+
+class _Artifact(object):
+    """An artifact file mapped into memory."""
+
+    def __init__(self, path: str, kind: str, value: Any, size: int,  # noqa: ANN101, ANN401
+                 load_seconds: float) -> None:
+        self.path = path
+        self.kind = kind
+        self.value = value
+        self.size = size
+        self.load_seconds = load_seconds
+
+
+class ArtifactStore(object):
+    """Store of read-only, memory-mapped model artifacts, singleton.
+
+    Note:
+        The artifacts are mapped into memory instead of being read into the private memory of the process. The pages
+        of an artifact are loaded from the page cache of the operating system when they are first accessed, and they are
+        shared by every process that maps the same file, including worker processes forked after the artifact is
+        mapped and other services running on the same node. Each file is mapped once per process, models that ask for
+        the same file get the same object.
+
+    """
+
+    _lock = Lock()
+
+    def __new__(cls, *args: Tuple, **kwargs: Dict):  # noqa: D102, ANN101, ANN204
+        """Create new ArtifactStore instance, after instance is first created it will always be returned."""
+        if not hasattr(cls, "_instance"):
+            with cls._lock:
+                cls._instance = super(ArtifactStore, cls).__new__(cls, *args, **kwargs)
+                cls._instance._is_initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Construct ArtifactStore object."""
+        if not self._is_initialized:  # pytype: disable=attribute-error
+            self._artifacts: Dict[Tuple[str, str], _Artifact] = {}
+            self._artifacts_lock = Lock()
+            self._is_initialized = True
+
+    @classmethod
+    def clear_instance(cls) -> None:  # noqa: ANN102
+        """Clear singleton instance from class."""
+        if hasattr(cls, "_instance"):
+            del cls._instance
+
+    def _get(self, path: str, kind: str) -> Any:  # noqa: ANN101, ANN401
+        key = (os.path.realpath(path), kind)
+        with self._artifacts_lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                start = perf_counter()
+                if kind == "array":
+                    value = numpy.load(key[0], mmap_mode="r", allow_pickle=False)
+                else:
+                    with open(key[0], "rb") as file:
+                        # the mapping stays valid after the file is closed
+                        value = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+                load_seconds = perf_counter() - start
+                artifact = _Artifact(key[0], kind, value, os.path.getsize(key[0]), load_seconds)
+                self._artifacts[key] = artifact
+
+                artifact_size.labels(artifact=artifact.path).set(artifact.size)
+                artifact_load_time.labels(artifact=artifact.path).set(artifact.load_seconds)
+                logger.info("Mapped artifact %s, %s bytes in %.6f seconds.", artifact.path, artifact.size,
+                            artifact.load_seconds)
+        return artifact.value
+
+    def get_array(self, path: str) -> Any:  # noqa: ANN101, ANN401
+        """Get a read-only, memory-mapped view of a NumPy array saved in the .npy format.
+
+        Args:
+            path: Path of the .npy file.
+
+        Returns:
+            numpy.memmap object that can not be written to.
+
+        Raises:
+            RuntimeError: Raised if the "tensor" optional dependencies are not installed.
+
+        """
+        if numpy is None:
+            raise RuntimeError("Memory-mapped arrays require the 'tensor' optional dependencies.")
+        return self._get(path, "array")
+
+    def get_buffer(self, path: str) -> memoryview:  # noqa: ANN101
+        """Get a read-only, memory-mapped view of the bytes of a file.
+
+        Args:
+            path: Path of the file, the file must not be empty.
+
+        Returns:
+            Read-only memoryview of the contents of the file.
+
+        """
+        return self._get(path, "buffer")
+
+    def get_artifacts(self) -> List[Dict[str, Any]]:  # noqa: ANN101
+        """Get the artifacts mapped into memory.
+
+        Returns:
+            List of dictionaries with the path, kind, size in bytes and load time in seconds of each artifact.
+
+        """
+        with self._artifacts_lock:
+            return [{
+                "path": artifact.path,
+                "kind": artifact.kind,
+                "size": artifact.size,
+                "load_seconds": artifact.load_seconds
+            } for artifact in self._artifacts.values()]
@@ -0,0 +1,195 @@
+"""Execution of work outside of the request path."""
+import os
+import atexit
+import logging
+from typing import Any, Callable, Optional
+from threading import Lock, Thread
+from queue import Queue, Full
+from ml_base import MLModel
+from ml_base.decorator import MLModelDecorator
+
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+queue_depth = metrics.gauge("background_queue_depth",
+                            "Number of items waiting in the queue of a background worker.",
+                            ["worker"])
+dropped_items = metrics.counter("background_dropped_items_total",
+                                "Number of items dropped because the queue of a background worker was full.",
+                                ["worker"])
+failed_items = metrics.counter("background_failed_items_total",
+                               "Number of items that raised an exception in a background worker.",
+                               ["worker"])
+
+DROP = "drop"
+BLOCK = "block"
+
+
+class BackgroundWorker(object):
+    """Executes functions in a background thread, taking them from a bounded queue.
+
+    Note:
+        The thread is started by the first call to submit() in each process. If the process is forked after the
+        worker was created, the child process gets its own queue and thread, items that were waiting in the parent's
+        queue are not executed in the child.
+
+    """
+
+    def __init__(self, name: str, queue_size: int = 1000, overflow_policy: str = DROP,  # noqa: ANN101
+                 close_timeout: float = 5.0) -> None:
+        """Initialize the worker.
+
+        Args:
+            name: Name of the worker, used as the label of its metrics.
+            queue_size: Maximum number of items waiting in the queue.
+            overflow_policy: What to do when the queue is full, "drop" discards the new item and "block" waits until
+                there is space in the queue.
+            close_timeout: Maximum time to wait for the queue to drain when the process exits, in seconds.
+
+        Raises:
+            ValueError: Raised if the overflow policy is not supported.
+
+        """
+        if overflow_policy not in (DROP, BLOCK):
+            raise ValueError("Overflow policy '{}' is not supported.".format(overflow_policy))
+
+        self.name = name
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.close_timeout = close_timeout
+
+        self._lock = Lock()
+        self._pid: Optional[int] = None
+        self._queue: Optional[Queue] = None
+        self._thread: Optional[Thread] = None
+
+        self._queue_depth = queue_depth.labels(worker=name)
+        self._dropped_items = dropped_items.labels(worker=name)
+        self._failed_items = failed_items.labels(worker=name)
+
+    def _start(self) -> Queue:  # noqa: ANN101
+        """Start the thread of the worker in the current process, if it is not running yet."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._queue
+
+        with self._lock:
+            if self._pid != pid:
+                self._queue = Queue(maxsize=self.queue_size)
+                self._thread = Thread(target=self._run, args=(self._queue,),
+                                      name="background-{}".format(self.name), daemon=True)
+                self._thread.start()
+                if self._pid is None:
+                    atexit.register(self.close)
+                self._pid = pid
+        return self._queue
+
+    def _run(self, queue: Queue) -> None:  # noqa: ANN101
+        while True:
+            item = queue.get()
+            try:
+                if item is None:
+                    return
+                function, args, kwargs = item
+                function(*args, **kwargs)
+            except Exception:
+                self._failed_items.inc()
+                logger.exception("Exception raised in background worker %s.", self.name)
+            finally:
+                queue.task_done()
+                self._queue_depth.set(queue.qsize())
+
+    def submit(self, function: Callable, *args: Any, **kwargs: Any) -> bool:  # noqa: ANN101, ANN401
+        """Add a function call to the queue of the worker.
+
+        Args:
+            function: Function to execute.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+
+        Returns:
+            True if the call was added to the queue, False if it was dropped because the queue was full.
+
+        """
+        queue = self._start()
+        item = (function, args, kwargs)
+        if self.overflow_policy == BLOCK:
+            queue.put(item)
+        else:
+            try:
+                queue.put_nowait(item)
+            except Full:
+                self._dropped_items.inc()
+                return False
+        self._queue_depth.set(queue.qsize())
+        return True
+
+    def join(self) -> None:  # noqa: ANN101
+        """Wait until every item in the queue has been executed."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self) -> None:  # noqa: ANN101
+        """Stop the thread of the worker after the items waiting in the queue are executed."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=self.close_timeout)
+        except Full:
+            logger.warning("Background worker %s did not drain its queue before closing.", self.name)
+            return
+        self._thread.join(timeout=self.close_timeout)
+
+
+class _RecordedPrediction(MLModelDecorator):
+    """Stands in for a model, returning a prediction that was already made."""
+
+    def __init__(self, model: MLModel, prediction: Any) -> None:  # noqa: ANN101, ANN401
+        super().__init__(model)
+        self.__dict__["_prediction"] = prediction
+
+    def predict(self, data: Any) -> Any:  # noqa: ANN101, ANN401
+        return self.__dict__["_prediction"]
+
+
+class AsynchronousDecorator(MLModelDecorator):
+    """Decorator that executes a side-effect decorator in a background worker, after the prediction is made.
+
+    Note:
+        The wrapped decorator receives the input of the prediction and a model that returns the prediction that was
+        already made, so it does not call the model again. The result of the wrapped decorator is discarded, so it
+        must not change the input, the output or any property of the model. Exceptions raised by the wrapped decorator
+        are logged and do not affect the prediction.
+
+    """
+
+    def __init__(self, decorator: MLModelDecorator, worker: BackgroundWorker) -> None:  # noqa: ANN101
+        """Initialize the decorator.
+
+        Args:
+            decorator: Side-effect decorator to execute in the background.
+            worker: Background worker that executes the decorator.
+
+        """
+        super().__init__()
+        self.__dict__["_decorator"] = decorator
+        self.__dict__["_worker"] = worker
+
+    def __repr__(self) -> str:  # noqa: ANN101
+        """Return a string describing the decorator and the model that it is decorating."""
+        return "{}({}, {})".format(self.__class__.__name__, self.__dict__["_decorator"].__class__.__name__,
+                                   str(self.__dict__["_model"]))
+
+    def _execute(self, data: Any, prediction: Any) -> None:  # noqa: ANN101, ANN401
+        # the worker is the only thread that uses the wrapped decorator, so the model can be replaced on each call
+        decorator = self.__dict__["_decorator"]
+        decorator.set_model(_RecordedPrediction(self.__dict__["_model"], prediction))
+        decorator.predict(data=data)
+
+    def predict(self, data: Any) -> Any:  # noqa: ANN101, ANN401
+        """Make a prediction with the model and add the side-effect decorator to the queue of the worker."""
+        prediction = self.__dict__["_model"].predict(data=data)
+        self.__dict__["_worker"].submit(self._execute, data, prediction)
+        return prediction
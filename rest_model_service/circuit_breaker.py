@@ -0,0 +1,272 @@
+"""Circuit breakers that reject the predictions of a failing model."""
+import logging
+from math import ceil
+from collections import deque
+from threading import Lock
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import Response
+
+from rest_model_service.schemas import CircuitState, Error
+from rest_model_service.content_types import create_response
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+circuit_state = metrics.gauge("circuit_breaker_state",
+                              "State of the circuit breaker of a model, 0 when closed, 1 when half-open and 2 when "
+                              "open.",
+                              ["model"],
+                              multiprocess_mode="max")
+circuit_transitions = metrics.counter("circuit_breaker_transitions_total",
+                                      "Number of times that the circuit breaker of a model changed to a state.",
+                                      ["model", "state"])
+circuit_rejections = metrics.counter("circuit_breaker_rejected_total",
+                                     "Number of prediction requests rejected by the circuit breaker of a model.",
+                                     ["model"])
+
+
+class CircuitBreaker(object):
+    """Circuit breaker of a model, it trips when the model's predictions fail or are slow.
+
+    Note:
+        The breaker is closed while the model is working, the outcome of the most recent predictions is kept in a
+        window. Once the window holds at least "minimum_requests" predictions, the breaker opens if the share of the
+        predictions that raised an error, or the share of the predictions that took longer than the latency threshold,
+        reaches its threshold. Errors raised by the schema validation of the model are not failures of the model.
+
+        While the breaker is open, requests are rejected before they wait for a thread of the threadpool. After
+        "open_seconds", the breaker is half-open and lets "half_open_requests" trial requests through. It closes again
+        if they all succeed in time and opens again as soon as one of them fails or is slow. A prediction that hangs is
+        counted when it completes, so the breaker can only open on the predictions that completed.
+
+    """
+
+    def __init__(self, qualified_name: str, window_size: int = 20, minimum_requests: int = 10,  # noqa: ANN101
+                 error_rate_threshold: float = 0.5, latency_threshold_seconds: Optional[float] = None,
+                 slow_rate_threshold: float = 0.5, open_seconds: float = 30.0, half_open_requests: int = 1) -> None:
+        """Initialize the circuit breaker.
+
+        Args:
+            qualified_name: Qualified name of the model.
+            window_size: Number of the most recent predictions that the error rate and the slow call rate are computed
+                over.
+            minimum_requests: Minimum number of predictions in the window before the breaker can open.
+            error_rate_threshold: Share of the predictions in the window that raised an error at which the breaker
+                opens.
+            latency_threshold_seconds: Duration at which a prediction is slow, in seconds, the latency is not checked if
+                None.
+            slow_rate_threshold: Share of the predictions in the window that were slow at which the breaker opens.
+            open_seconds: Time that the breaker stays open before it lets trial requests through, in seconds.
+            half_open_requests: Number of trial requests that must succeed for the breaker to close again.
+
+        """
+        self.qualified_name = qualified_name
+        self.minimum_requests = min(minimum_requests, window_size)
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold_seconds = latency_threshold_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_requests = half_open_requests
+        self.state = CircuitState.CLOSED
+
+        self._lock = Lock()
+        # each outcome holds whether the prediction failed and whether it was slow
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._trials_in_flight = 0
+        self._trial_successes = 0
+
+        self._circuit_state = circuit_state.labels(model=qualified_name)
+        self._circuit_rejections = circuit_rejections.labels(model=qualified_name)
+        self._circuit_state.set(STATE_VALUES[self.state])
+
+    def acquire(self) -> Optional[bool]:  # noqa: ANN101
+        """Ask the breaker to let a prediction request through.
+
+        Returns:
+            None if the request is rejected, True if it is a trial request, which must be passed to release() once it is
+            answered, and False otherwise.
+
+        """
+        # reading the state without the lock, so that requests to a working model do not contend for it
+        if self.state is CircuitState.CLOSED:
+            return False
+
+        with self._lock:
+            if self.state is CircuitState.OPEN and monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(CircuitState.HALF_OPEN)
+            if self.state is CircuitState.CLOSED:
+                return False
+            if self.state is CircuitState.HALF_OPEN \
+                    and self._trials_in_flight + self._trial_successes < self.half_open_requests:
+                self._trials_in_flight += 1
+                return True
+
+        self._circuit_rejections.inc()
+        return None
+
+    def release(self, trial: Optional[bool]) -> None:  # noqa: ANN101
+        """Record that a request let through by acquire() was answered.
+
+        Args:
+            trial: Value returned by acquire() for the request.
+
+        """
+        if trial:
+            with self._lock:
+                self._trials_in_flight = max(self._trials_in_flight - 1, 0)
+
+    def record(self, success: bool, duration: float, trial: Optional[bool] = False) -> None:  # noqa: ANN101
+        """Record the outcome of a prediction.
+
+        Args:
+            success: Whether the prediction succeeded.
+            duration: Time spent making the prediction, in seconds.
+            trial: Value returned by acquire() for the request of the prediction.
+
+        """
+        failed = not success
+        slow = self.latency_threshold_seconds is not None and duration >= self.latency_threshold_seconds
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN:
+                if not trial:
+                    # predictions that were let through before the breaker opened say nothing about the trial requests
+                    return
+                if failed or slow:
+                    self._transition(CircuitState.OPEN)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_requests:
+                        self._transition(CircuitState.CLOSED)
+                return
+            if self.state is CircuitState.OPEN:
+                # predictions that started before the breaker opened say nothing about the trial requests
+                return
+
+            if len(self._outcomes) == self._outcomes.maxlen:
+                oldest_failed, oldest_slow = self._outcomes[0]
+                self._failures -= oldest_failed
+                self._slow -= oldest_slow
+            self._outcomes.append((failed, slow))
+            self._failures += failed
+            self._slow += slow
+
+            count = len(self._outcomes)
+            if count >= self.minimum_requests and (self._failures / count >= self.error_rate_threshold
+                                                   or self._slow / count >= self.slow_rate_threshold):
+                self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:  # noqa: ANN101
+        """Change the state of the breaker, the lock must be held by the caller."""
+        if state is CircuitState.OPEN:
+            self._opened_at = monotonic()
+            logger.warning("Opened the circuit breaker of model '%s', failed predictions: %s, slow predictions: %s, "
+                           "out of %s.", self.qualified_name, self._failures, self._slow, len(self._outcomes))
+        else:
+            logger.info("Changed the state of the circuit breaker of model '%s' to %s.", self.qualified_name,
+                        state.value)
+        self.state = state
+        self._outcomes.clear()
+        self._failures = 0
+        self._slow = 0
+        self._trials_in_flight = 0
+        self._trial_successes = 0
+        self._circuit_state.set(STATE_VALUES[state])
+        circuit_transitions.labels(model=self.qualified_name, state=state.value).inc()
+
+    def get_state(self) -> CircuitState:  # noqa: ANN101
+        """Return the state of the breaker, an open breaker is half-open once it lets trial requests through."""
+        with self._lock:
+            if self.state is CircuitState.OPEN and monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(CircuitState.HALF_OPEN)
+            return self.state
+
+    def get_retry_after(self) -> int:  # noqa: ANN101
+        """Return the number of seconds until the breaker lets trial requests through, at least one."""
+        with self._lock:
+            remaining = self.open_seconds - (monotonic() - self._opened_at) \
+                if self.state is CircuitState.OPEN else 0.0
+        return max(int(ceil(remaining)), 1)
+
+    def get_error(self) -> Error:  # noqa: ANN101
+        """Return the error returned for the requests that the breaker rejects."""
+        return Error(type="ServiceUnavailable",
+                     messages=["Model '{}' is unavailable because its circuit breaker is open.".format(
+                         self.qualified_name)])
+
+    def __repr__(self) -> str:  # noqa: ANN101
+        """Return a string describing the circuit breaker."""
+        return "{}({}, {})".format(self.__class__.__name__, self.qualified_name, self.state.value)
+
+
+def create_rejected_response(request: Request, circuit_breaker: CircuitBreaker) -> Response:
+    """Create the 503 response to a prediction request rejected by a circuit breaker.
+
+    Args:
+        request: Prediction request, the response is in the media type that it accepts.
+        circuit_breaker: Circuit breaker that rejected the request.
+
+    Returns:
+        Response with the error and a Retry-After header.
+
+    """
+    response = create_response(request, 503, circuit_breaker.get_error().model_dump())
+    response.headers["Retry-After"] = str(circuit_breaker.get_retry_after())
+    return response
+
+
+class CircuitBreakerManager(object):
+    """Keeps the circuit breaker of each model, singleton."""
+
+    _lock = Lock()
+
+    def __new__(cls, *args: Tuple, **kwargs: Dict):  # noqa: D102, ANN101, ANN204
+        """Create new CircuitBreakerManager instance, after instance is first created it will always be returned."""
+        if not hasattr(cls, "_instance"):
+            with cls._lock:
+                cls._instance = super(CircuitBreakerManager, cls).__new__(cls, *args, **kwargs)
+                cls._instance._is_initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Construct CircuitBreakerManager object."""
+        if not self._is_initialized:  # pytype: disable=attribute-error
+            self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+            self._circuit_breakers_lock = Lock()
+            self._is_initialized = True
+
+    @classmethod
+    def clear_instance(cls) -> None:  # noqa: ANN102
+        """Clear singleton instance from class."""
+        if hasattr(cls, "_instance"):
+            del cls._instance
+
+    def add_circuit_breaker(self, circuit_breaker: CircuitBreaker) -> None:  # noqa: ANN101
+        """Add the circuit breaker of a model, replacing the breaker that the model had before.
+
+        Args:
+            circuit_breaker: Circuit breaker of the model.
+
+        """
+        with self._circuit_breakers_lock:
+            self._circuit_breakers[circuit_breaker.qualified_name] = circuit_breaker
+
+    def get_circuit_breaker(self, qualified_name: str) -> Optional[CircuitBreaker]:  # noqa: ANN101
+        """Get the circuit breaker of a model.
+
+        Args:
+            qualified_name: Qualified name of the model.
+
+        Returns:
+            Circuit breaker of the model, or None if the model does not have one.
+
+        """
+        with self._circuit_breakers_lock:
+            return self._circuit_breakers.get(qualified_name)
@@ -1,5 +1,5 @@
 """Configuration for the service."""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal, Union
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +9,16 @@ class ModelDecorator(BaseModel):
     class_path: str = Field(description="Class path of the decorator class.")
     configuration: Optional[Dict[str, Any]] = Field(default=None, description="Configuration to initialize decorator "
                                                                               "instance.")
+    asynchronous: bool = Field(default=False, description="Whether the decorator only has side effects and is "
+                                                          "executed in a background worker after the prediction is "
+                                                          "made.")
+    queue_size: int = Field(default=1000, description="Maximum number of predictions waiting to be processed by an "
+                                                      "asynchronous decorator.")
+    overflow_policy: Literal["drop", "block"] = Field(default="drop", description="What to do when the queue of an "
+                                                                                  "asynchronous decorator is full, "
+                                                                                  "`drop` discards the prediction "
+                                                                                  "and `block` waits for space in "
+                                                                                  "the queue.")
 
 
 class MetricsConfiguration(BaseModel):
@@ -45,6 +55,164 @@ class MetricsConfiguration(BaseModel):
                                                                "inprogress label? Ignored unless "
                                                                "`should_instrument_requests_inprogress` is `True`. "
                                                                "Defaults to `False`.")
+    multiprocess_directory: Optional[str] = Field(default=None,
+                                                  description="Directory where the worker processes started by the "
+                                                              "`serve_model_service` command write their metrics, "
+                                                              "enables the aggregation of metrics across workers. The "
+                                                              "directory is emptied when the service starts.")
+    scrape_cache_seconds: float = Field(default=0.0, description="Time to reuse the metrics rendered for a scrape, in "
+                                                                 "seconds.")
+
+
+class CompressionConfiguration(BaseModel):
+    """Configuration for compression of responses and request bodies."""
+
+    enabled: bool = Field(default=False, description="Enable compression.")
+    encodings: List[str] = Field(default=["gzip"], description="Content encodings to compress responses with, in "
+                                                               "order of preference. Supported encodings are "
+                                                               "`gzip`, `zstd` and `br`.")
+    minimum_size: int = Field(default=1024, description="Minimum size of a response body to compress it, in bytes.")
+    levels: Dict[str, int] = Field(default={}, description="Compression levels, keyed by content encoding.")
+    excluded_handlers: List[str] = Field(default=[], description="List of strings that will be compiled to regex "
+                                                                 "patterns. Responses to requests with paths that "
+                                                                 "match are never compressed.")
+    decompress_requests: bool = Field(default=True, description="Should request bodies with a `Content-Encoding` "
+                                                                "header be decompressed?")
+    max_request_size: int = Field(default=104857600, description="Maximum size of a request body, "
+                                                                 "compressed and decompressed, in bytes.")
+
+
+class MonitoringConfiguration(BaseModel):
+    """Configuration for monitoring of the event loop and the threadpool."""
+
+    enabled: bool = Field(default=False, description="Enable monitoring.")
+    interval_seconds: float = Field(default=0.5, description="Time between measurements, in seconds.")
+    lag_threshold_seconds: Optional[float] = Field(default=None, description="Event loop lag above which the service "
+                                                                             "is saturated, in seconds.")
+    waiting_tasks_threshold: Optional[int] = Field(default=None, description="Number of tasks waiting for a thread "
+                                                                             "of the threadpool above which the "
+                                                                             "service is saturated.")
+    sustained_seconds: float = Field(default=5.0, description="Time that the service must stay saturated before it "
+                                                              "refuses traffic, and not saturated before it accepts "
+                                                              "traffic again, in seconds.")
+    threadpool_size: Optional[int] = Field(default=None, description="Maximum number of threads of the threadpool "
+                                                                     "that runs the models.")
+
+
+class ShadowConfiguration(BaseModel):
+    """Settings for mirroring the predictions of a model to a candidate model."""
+
+    qualified_name: str = Field(description="Qualified name of the candidate model, the model must be loaded by the "
+                                            "service.")
+    sample_rate: float = Field(default=1.0, ge=0.0, le=1.0, description="Fraction of the predictions that are "
+                                                                        "mirrored to the candidate model.")
+    queue_size: int = Field(default=1000, description="Maximum number of predictions waiting to be mirrored to the "
+                                                      "candidate model, predictions are dropped when the queue is "
+                                                      "full.")
+
+
+class CircuitBreakerConfiguration(BaseModel):
+    """Settings for the circuit breaker of a model."""
+
+    window_size: int = Field(default=20, ge=1, description="Number of the most recent predictions that the error rate "
+                                                           "and the slow call rate are computed over.")
+    minimum_requests: int = Field(default=10, ge=1, description="Minimum number of predictions in the window before "
+                                                                "the circuit breaker can open.")
+    error_rate_threshold: float = Field(default=0.5, gt=0.0, le=1.0, description="Share of the predictions in the "
+                                                                                 "window that raised an error at "
+                                                                                 "which the circuit breaker opens.")
+    latency_threshold_seconds: Optional[float] = Field(default=None, gt=0.0, description="Duration at which a "
+                                                                                         "prediction is slow, in "
+                                                                                         "seconds, the latency is not "
+                                                                                         "checked if not set.")
+    slow_rate_threshold: float = Field(default=0.5, gt=0.0, le=1.0, description="Share of the predictions in the "
+                                                                                "window that were slow at which the "
+                                                                                "circuit breaker opens.")
+    open_seconds: float = Field(default=30.0, gt=0.0, description="Time that the circuit breaker stays open before "
+                                                                  "it lets trial requests through, in seconds.")
+    half_open_requests: int = Field(default=1, ge=1, description="Number of trial requests that must succeed for the "
+                                                                 "circuit breaker to close again.")
+
+
+class JobsConfiguration(BaseModel):
+    """Configuration for asynchronous jobs."""
+
+    enabled: bool = Field(default=False, description="Enable the job endpoints.")
+    queue_size: int = Field(default=100, description="Maximum number of jobs waiting to be executed, jobs submitted "
+                                                     "when the queue is full are rejected.")
+    workers: int = Field(default=4, description="Number of jobs that are executed at the same time.")
+    result_ttl_seconds: float = Field(default=600.0, description="Time that the result of a finished job is kept, in "
+                                                                 "seconds.")
+    max_result_bytes: int = Field(default=104857600, description="Maximum size of the results that are kept, in "
+                                                                 "bytes. The oldest results are removed first.")
+
+
+class WebSocketConfiguration(BaseModel):
+    """Configuration for the WebSocket prediction endpoint."""
+
+    enabled: bool = Field(default=False, description="Enable the WebSocket prediction endpoint.")
+    max_in_flight: int = Field(default=32, ge=1, description="Maximum number of requests of a connection that are "
+                                                             "being predicted or waiting for their response, no more "
+                                                             "messages are read from the connection until a response "
+                                                             "is sent.")
+
+
+class ProfilingConfiguration(BaseModel):
+    """Configuration for the profiling endpoint."""
+
+    enabled: bool = Field(default=False, description="Enable the profiling endpoint.")
+    token_env_var: str = Field(default="PROFILING_TOKEN", description="Name of the environment variable that holds "
+                                                                      "the token that requests to the profiling "
+                                                                      "endpoint must have.")
+    max_seconds: float = Field(default=60.0, description="Maximum duration of a profile, in seconds.")
+    sampling_interval_seconds: float = Field(default=0.01, gt=0.0, description="Time between two samples of the "
+                                                                               "stacks of a CPU profile, in seconds.")
+    memory_frames: int = Field(default=25, ge=1, description="Number of frames of the tracebacks recorded by a "
+                                                             "memory profile.")
+
+
+class MemoryConfiguration(BaseModel):
+    """Configuration for the accounting of the memory used by the models."""
+
+    budget_bytes: Optional[int] = Field(default=None, description="Memory budget of the service, in bytes. The "
+                                                                  "service fails to start if its resident memory is "
+                                                                  "above the budget after loading a model or a "
+                                                                  "decorator.")
+    sample_interval_seconds: Optional[float] = Field(default=None, gt=0.0,
+                                                     description="Time between two samples of the memory allocated "
+                                                                 "by each model, in seconds. Sampling traces the "
+                                                                 "allocations of the process with tracemalloc, it is "
+                                                                 "disabled if not set.")
+    traced_frames: int = Field(default=10, ge=1, description="Number of frames of the tracebacks recorded by "
+                                                             "tracemalloc when sampling is enabled.")
+
+
+class TracingConfiguration(BaseModel):
+    """Configuration for distributed tracing."""
+
+    enabled: bool = Field(default=False, description="Enable tracing.")
+    service_name: Optional[str] = Field(default=None, description="Name of the service in the exported spans, the "
+                                                                  "service title if not set.")
+    head_sample_rate: float = Field(default=0.01, ge=0.0, le=1.0, description="Fraction of the traces started by the "
+                                                                              "service that are sampled when they "
+                                                                              "start. Traces started by a caller "
+                                                                              "follow the caller's decision.")
+    tail_latency_threshold_seconds: Optional[float] = Field(default=None,
+                                                            description="Duration above which a trace that was not "
+                                                                        "sampled when it started is exported, in "
+                                                                        "seconds.")
+    tail_sample_errors: bool = Field(default=False, description="Whether traces that were not sampled when they "
+                                                                "started are exported if they end with a 5xx status "
+                                                                "code.")
+    max_buffered_traces: int = Field(default=1000, description="Maximum number of traces kept in memory until they "
+                                                               "end, for tail sampling.")
+    exporter: Literal["otlp", "file"] = Field(default="otlp", description="Where the spans are exported, `otlp` to "
+                                                                          "send them to a collector or `file` to "
+                                                                          "write them to a file.")
+    endpoint: str = Field(default="http://localhost:4318/v1/traces", description="URL of the OTLP/HTTP traces "
+                                                                                 "endpoint of the collector.")
+    file_path: str = Field(default="traces.jsonl", description="Path of the file that the spans are appended to, as "
+                                                               "one JSON object on each line.")
 
 
 class Model(BaseModel):
@@ -56,6 +224,71 @@ class Model(BaseModel):
                                                                                  "model.")
     configuration: Optional[Dict[str, Any]] = Field(default=None, description="Configuration to initialize model "
                                                                               "instance.")
+    columnar: bool = Field(default=False, description="Whether the model accepts Apache Arrow tables as input, "
+                                                      "enables Arrow stream and Parquet bodies in the prediction "
+                                                      "endpoint.")
+    coalesce_predictions: bool = Field(default=False, description="Whether concurrent predictions with identical "
+                                                                  "inputs share a single call to the model's "
+                                                                  "predict() method. Results are not retained after "
+                                                                  "the call completes.")
+    profile_decorators: bool = Field(default=False, description="Whether to record the time spent and the number of "
+                                                                "calls in each decorator and in the model.")
+    shadow: Optional[ShadowConfiguration] = Field(default=None, description="Candidate model that receives a "
+                                                                            "copy of the model's predictions in the "
+                                                                            "background.")
+    circuit_breaker: Optional[CircuitBreakerConfiguration] = Field(default=None, description="Circuit breaker that "
+                                                                                             "rejects the model's "
+                                                                                             "predictions while it "
+                                                                                             "is failing.")
+
+
+class PipelineStepConfiguration(BaseModel):
+    """Settings for a step of a model pipeline."""
+
+    name: str = Field(description="Name of the step, unique in the pipeline.")
+    qualified_name: str = Field(description="Qualified name of the model that makes the prediction of the step, the "
+                                            "model must be loaded by the service.")
+    inputs: List[str] = Field(default=["input"], min_length=1, description="Names of the steps whose predictions "
+                                                                           "are merged into the input of the model, "
+                                                                           "`input` is the input of the pipeline.")
+
+
+class PipelineConfiguration(BaseModel):
+    """Settings for a pipeline that composes the models of the service into a directed acyclic graph."""
+
+    qualified_name: str = Field(description="Qualified name of the pipeline, the endpoint is created at "
+                                            "/api/models/{qualified_name}/prediction.")
+    display_name: Optional[str] = Field(default=None, description="Display name of the pipeline.")
+    description: str = Field(default="", description="Description of the pipeline.")
+    version: str = Field(default="0.1.0", description="Version of the pipeline.")
+    steps: List[PipelineStepConfiguration] = Field(min_length=1, description="Steps of the pipeline.")
+    outputs: Optional[List[str]] = Field(default=None, description="Names of the steps whose predictions are "
+                                                                   "returned, the last step if not provided.")
+    max_concurrency: int = Field(default=4, description="Number of threads that run the steps of the pipeline, "
+                                                        "shared by all the predictions of the pipeline.")
+
+
+class TrafficSplitVariant(BaseModel):
+    """Settings for a model that receives part of the traffic of a traffic split."""
+
+    qualified_name: str = Field(description="Qualified name of the model, the model must be loaded by the service.")
+    weight: float = Field(default=1.0, ge=0.0, description="Weight of the model, the model receives its weight "
+                                                           "divided by the sum of the weights of the traffic.")
+
+
+class TrafficSplitConfiguration(BaseModel):
+    """Settings for an endpoint that spreads its predictions across several models."""
+
+    qualified_name: str = Field(description="Name of the traffic split, the endpoint is created at "
+                                            "/api/models/{qualified_name}/prediction.")
+    variants: List[TrafficSplitVariant] = Field(min_length=1, description="Models that receive the traffic. The "
+                                                                          "models must have the same input schema.")
+    sticky_header: Optional[str] = Field(default="X-Routing-Key", description="Request header holding a key, "
+                                                                              "requests with the same key are sent "
+                                                                              "to the same model.")
+    runtime_updates: bool = Field(default=False, description="Whether the weights can be changed while the service "
+                                                             "is running, through a PUT request to "
+                                                             "/api/models/{qualified_name}/traffic_split.")
 
 
 class ServiceConfiguration(BaseModel):
@@ -65,5 +298,34 @@ class ServiceConfiguration(BaseModel):
     version: str = "0.1.0"
     description: str = ""
     models: List[Model] = Field(default=[], description="Model configuration.")
-    logging: Optional[Dict] = Field(default=None, description="Logging configuration.")
+    logging: Optional[Union[Dict, Literal["structured"]]] = Field(default=None,
+                                                                  description="Logging configuration, in the "
+                                                                              "logging package's configuration "
+                                                                              "dictionary schema, or `structured` "
+                                                                              "to use the built-in structured "
+                                                                              "logging configuration.")
     metrics: Optional[MetricsConfiguration] = Field(default=None, description="Metrics configuration.")
+    compression: Optional[CompressionConfiguration] = Field(default=None, description="Compression configuration.")
+    prediction_dispatcher: bool = Field(default=False, description="Whether the predictions of all models are "
+                                                                   "handled by a single route that finds the model "
+                                                                   "by its qualified name, instead of a route for "
+                                                                   "each model.")
+    pipelines: Optional[List[PipelineConfiguration]] = Field(default=None, description="Pipelines that compose "
+                                                                                       "the models into a directed "
+                                                                                       "acyclic graph.")
+    traffic_splits: Optional[List[TrafficSplitConfiguration]] = Field(default=None,
+                                                                      description="Endpoints that spread their "
+                                                                                  "predictions across several "
+                                                                                  "models.")
+    jobs: Optional[JobsConfiguration] = Field(default=None, description="Asynchronous jobs configuration.")
+    websocket: Optional[WebSocketConfiguration] = Field(default=None, description="WebSocket prediction endpoint "
+                                                                                  "configuration.")
+    monitoring: Optional[MonitoringConfiguration] = Field(default=None, description="Monitoring configuration.")
+    tracing: Optional[TracingConfiguration] = Field(default=None, description="Tracing configuration.")
+    memory: Optional[MemoryConfiguration] = Field(default=None, description="Memory accounting configuration.")
+    profiling: Optional[ProfilingConfiguration] = Field(default=None, description="Profiling endpoint "
+                                                                                  "configuration.")
+    openapi_file: Optional[str] = Field(default=None, description="Path of an OpenAPI document generated by the "
+                                                                  "`generate_openapi` command, it is returned by the "
+                                                                  "service if it was generated from the same "
+                                                                  "configuration.")
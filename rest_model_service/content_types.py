@@ -0,0 +1,528 @@
+"""Decoding of request bodies and encoding of response bodies in media types other than JSON."""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+from enum import Enum
+import io
+import typing
+import annotated_types
+from pydantic import BaseModel, Field, ValidationError
+from pydantic.fields import FieldInfo
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+NPY_MEDIA_TYPE = "application/x-npy"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def parse_media_type(header: Optional[str]) -> Optional[str]:
+    """Return the media type in a Content-Type header, without any parameters.
+
+    Args:
+        header: Value of the Content-Type header, can be None.
+
+    Returns:
+        Lowercase media type, or None if the header is empty.
+
+    """
+    if header is None:
+        return None
+    media_type = header.split(";")[0].strip().lower()
+    if media_type == "application/x-msgpack":
+        return MSGPACK_MEDIA_TYPE
+    return media_type if media_type != "" else None
+
+
+def negotiate_media_type(accept: Optional[str], available: List[str], default: str) -> Optional[str]:
+    """Pick the media type for a response from the Accept header of a request.
+
+    Args:
+        accept: Value of the Accept header, can be None.
+        available: Media types that can be produced for the response.
+        default: Media type to use when the client accepts anything.
+
+    Returns:
+        The media type with the highest quality value that is available, or None if the client does not accept
+        any of the available media types.
+
+    """
+    if accept is None or accept.strip() == "":
+        return default
+
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0.0 and parts[0] != "":
+            candidates.append((-quality, position, parts[0].lower()))
+
+    for _, _, media_range in sorted(candidates):
+        media_range = parse_media_type(media_range)
+        if media_range in ("*/*", default) or (media_range.endswith("/*") and
+                                               default.startswith(media_range[:-1])):
+            return default
+        if media_range in available:
+            return media_range
+        if media_range.endswith("/*"):
+            match = next((media_type for media_type in available if media_type.startswith(media_range[:-1])), None)
+            if match is not None:
+                return match
+    return None
+
+
+class MediaTypeCodec(object):
+    """Base class for codecs that decode prediction requests and encode prediction responses in a media type."""
+
+    media_type: str = None
+    can_encode: bool = True
+
+    def decode(self, body: bytes, input_schema: Type[BaseModel]) -> Any:  # noqa: ANN101
+        """Decode the body of a request into the data that is passed to the model."""
+        raise NotImplementedError()
+
+    def encode(self, content: Any) -> bytes:  # noqa: ANN101, ANN401
+        """Encode the content of a response."""
+        raise NotImplementedError()
+
+
+def to_jsonable(content: Any) -> Any:  # noqa: ANN401
+    """Convert the result of a prediction to an object that can be serialized as JSON.
+
+    Args:
+        content: A pydantic object, a list of pydantic objects, or an Arrow table or record batch.
+
+    Returns:
+        Dictionary or list of dictionaries.
+
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump()
+    if numpy is not None and isinstance(content, numpy.ndarray):
+        return content.tolist()
+    if pyarrow is not None and isinstance(content, (pyarrow.Table, pyarrow.RecordBatch)):
+        return content.to_pylist()
+    if isinstance(content, list):
+        return [item.model_dump() if isinstance(item, BaseModel) else item for item in content]
+    return content
+
+
+def to_arrow_table(content: Any) -> "pyarrow.Table":  # noqa: ANN401
+    """Convert the result of a prediction to an Arrow table.
+
+    Args:
+        content: A pydantic object, a list of pydantic objects, or an Arrow table or record batch.
+
+    Returns:
+        Arrow table with one row per prediction.
+
+    """
+    if isinstance(content, pyarrow.Table):
+        return content
+    if isinstance(content, pyarrow.RecordBatch):
+        return pyarrow.Table.from_batches([content])
+    if not isinstance(content, list):
+        content = [content]
+    return pyarrow.Table.from_pylist([item.model_dump(mode="json") if isinstance(item, BaseModel) else item
+                                      for item in content])
+
+
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:  # noqa: ANN401
+    """Return the type inside an Optional annotation and whether the annotation allows None."""
+    if typing.get_origin(annotation) is Union:
+        arguments = [argument for argument in typing.get_args(annotation) if argument is not type(None)]
+        if len(arguments) == 1:
+            return arguments[0], len(arguments) != len(typing.get_args(annotation))
+    return annotation, False
+
+
+def _arrow_type_check(annotation: Any) -> Optional[Tuple[str, Any]]:  # noqa: ANN401
+    """Return a description and a predicate that checks an Arrow type against a python annotation."""
+    if annotation is bool:
+        return "boolean", pyarrow.types.is_boolean
+    if annotation is int:
+        return "integer", pyarrow.types.is_integer
+    if annotation is float:
+        return "numeric", lambda arrow_type: pyarrow.types.is_floating(arrow_type) or \
+            pyarrow.types.is_integer(arrow_type)
+    if annotation is str or (isinstance(annotation, type) and issubclass(annotation, str)):
+        return "string", lambda arrow_type: pyarrow.types.is_string(arrow_type) or \
+            pyarrow.types.is_large_string(arrow_type) or \
+            (pyarrow.types.is_dictionary(arrow_type) and pyarrow.types.is_string(arrow_type.value_type))
+    return None
+
+
+_BOUND_CHECKS = [
+    (annotated_types.Gt, "gt", "greater_than", "greater than", lambda minimum, maximum, value: minimum > value),
+    (annotated_types.Ge, "ge", "greater_than_equal", "greater than or equal to",
+     lambda minimum, maximum, value: minimum >= value),
+    (annotated_types.Lt, "lt", "less_than", "less than", lambda minimum, maximum, value: maximum < value),
+    (annotated_types.Le, "le", "less_than_equal", "less than or equal to",
+     lambda minimum, maximum, value: maximum <= value)
+]
+
+
+def check_table_schema(table: "pyarrow.Table", input_schema: Type[BaseModel]) -> None:
+    """Check the columns of an Arrow table against the fields of a model's input schema.
+
+    Args:
+        table: Arrow table containing one row per prediction request.
+        input_schema: Pydantic model that describes a single row of the table.
+
+    Raises:
+        RequestValidationError: Raised if a column is missing, has the wrong type, contains null values, or contains
+            values that do not fit the bounds and choices declared in the input schema.
+
+    Note:
+        The checks are done on whole columns with Arrow compute functions, the rows of the table are never converted
+        to pydantic objects.
+
+    """
+    errors = []
+    for field_name, field in input_schema.model_fields.items():
+        column_name = field.alias if field.alias is not None else field_name
+        location = ("body", column_name)
+
+        if column_name not in table.column_names:
+            if field.is_required():
+                errors.append({"type": "missing", "loc": location, "msg": "Column required"})
+            continue
+
+        column = table.column(column_name)
+        annotation, nullable = _unwrap_optional(field.annotation)
+
+        type_check = _arrow_type_check(annotation)
+        if type_check is not None and not type_check[1](column.type):
+            errors.append({"type": "column_type", "loc": location,
+                           "msg": "Column should be a {} column, found '{}'".format(type_check[0], column.type)})
+            continue
+
+        if column.null_count > 0 and not nullable:
+            errors.append({"type": "null_values", "loc": location, "msg": "Column should not contain null values"})
+            continue
+
+        if isinstance(annotation, type) and issubclass(annotation, Enum):
+            choices = pyarrow.array([choice.value for choice in annotation])
+            if not pyarrow.compute.all(pyarrow.compute.is_in(column.cast(pyarrow.string()),
+                                                             value_set=choices)).as_py():
+                errors.append({"type": "enum", "loc": location,
+                               "msg": "Column values should be one of {}".format(
+                                   ", ".join("'{}'".format(choice.value) for choice in annotation))})
+            continue
+
+        bounds = [(metadata, check) for metadata in field.metadata for check in _BOUND_CHECKS
+                  if isinstance(metadata, check[0])]
+        if len(bounds) > 0 and len(column) > column.null_count:
+            minimum_maximum = pyarrow.compute.min_max(column)
+            minimum = minimum_maximum["min"].as_py()
+            maximum = minimum_maximum["max"].as_py()
+            for metadata, (_, attribute, error_type, description, check) in bounds:
+                value = getattr(metadata, attribute)
+                if not check(minimum, maximum, value):
+                    errors.append({"type": error_type, "loc": location,
+                                   "msg": "Column values should be {} {}".format(description, value)})
+
+    if len(errors) > 0:
+        raise RequestValidationError(errors)
+
+
+class ArrowStreamCodec(MediaTypeCodec):
+    """Codec for the Apache Arrow IPC streaming format."""
+
+    media_type = ARROW_STREAM_MEDIA_TYPE
+
+    def decode(self, body: bytes, input_schema: Type[BaseModel]) -> "pyarrow.Table":  # noqa: ANN101
+        """Decode an Arrow stream into a table, the table's buffers point into the request body without copying."""
+        try:
+            table = pyarrow.ipc.open_stream(pyarrow.py_buffer(body)).read_all()
+        except pyarrow.ArrowInvalid as e:
+            raise RequestValidationError([{"type": "arrow_invalid", "loc": ("body",), "msg": str(e)}])
+        check_table_schema(table, input_schema)
+        return table
+
+    def encode(self, content: Any) -> bytes:  # noqa: ANN101, ANN401
+        """Encode predictions as an Arrow stream."""
+        table = to_arrow_table(content)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class ParquetCodec(MediaTypeCodec):
+    """Codec for the Apache Parquet file format."""
+
+    media_type = PARQUET_MEDIA_TYPE
+
+    def decode(self, body: bytes, input_schema: Type[BaseModel]) -> "pyarrow.Table":  # noqa: ANN101
+        """Decode a Parquet file into an Arrow table."""
+        try:
+            table = pyarrow.parquet.read_table(pyarrow.BufferReader(body))
+        except pyarrow.ArrowInvalid as e:
+            raise RequestValidationError([{"type": "parquet_invalid", "loc": ("body",), "msg": str(e)}])
+        check_table_schema(table, input_schema)
+        return table
+
+    def encode(self, content: Any) -> bytes:  # noqa: ANN101, ANN401
+        """Encode predictions as a Parquet file."""
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(to_arrow_table(content), sink)
+        return sink.getvalue().to_pybytes()
+
+
+def tensor_field(dtype: str, shape: Sequence[Optional[int]], **kwargs: Any) -> FieldInfo:  # noqa: ANN401
+    """Create a field for a schema that declares the field as a tensor.
+
+    Args:
+        dtype: NumPy data type of the tensor, for example "float32".
+        shape: Shape of the tensor, dimensions that can have any size are set to None.
+        kwargs: Keyword arguments passed to pydantic's Field() function.
+
+    Returns:
+        Pydantic FieldInfo object.
+
+    Note:
+        A model opts in to binary tensor requests by declaring exactly one tensor field in its input schema. The
+        dtype and shape are added to the field's JSON Schema under the "x-tensor" key.
+
+    """
+    json_schema_extra = dict(kwargs.pop("json_schema_extra", None) or {})
+    json_schema_extra["x-tensor"] = {"dtype": dtype, "shape": list(shape)}
+    return Field(json_schema_extra=json_schema_extra, **kwargs)
+
+
+def get_tensor_field(schema: Type[BaseModel]) -> Optional[Tuple[str, Dict]]:
+    """Find the tensor field declared in a schema.
+
+    Args:
+        schema: Pydantic model class.
+
+    Returns:
+        Tuple with the name and the tensor specification of the field, or None if the schema does not declare
+        exactly one tensor field.
+
+    """
+    tensor_fields = [(field_name, field.json_schema_extra["x-tensor"])
+                     for field_name, field in schema.model_fields.items()
+                     if isinstance(field.json_schema_extra, dict) and "x-tensor" in field.json_schema_extra]
+    return tensor_fields[0] if len(tensor_fields) == 1 else None
+
+
+class NumpyCodec(MediaTypeCodec):
+    """Codec for the NumPy .npy format.
+
+    Note:
+        The request body is decoded into an array whose memory is the body itself, the array is read-only. The array
+        is set in the tensor field of the input schema without pydantic validation, the other fields of the schema
+        get their default values.
+
+    """
+
+    media_type = NPY_MEDIA_TYPE
+
+    def __init__(self, input_field: Tuple[str, Dict],  # noqa: ANN101
+                 output_field: Optional[Tuple[str, Dict]] = None) -> None:
+        """Initialize the codec.
+
+        Args:
+            input_field: Name and tensor specification of the tensor field in the input schema.
+            output_field: Name and tensor specification of the tensor field in the output schema, if there is one.
+
+        """
+        self._input_field_name, specification = input_field
+        self._dtype = numpy.dtype(specification["dtype"])
+        self._shape = [dimension if dimension is not None and dimension >= 0 else None
+                       for dimension in specification["shape"]]
+        self._output_field_name = output_field[0] if output_field is not None else None
+        self.can_encode = output_field is not None
+
+    def decode(self, body: bytes, input_schema: Type[BaseModel]) -> BaseModel:  # noqa: ANN101
+        """Decode a .npy body into an array and check its dtype and shape against the tensor field."""
+        location = ("body", self._input_field_name)
+        stream = io.BytesIO(body)
+        try:
+            version = numpy.lib.format.read_magic(stream)
+            if version == (1, 0):
+                shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(stream)
+            else:
+                shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(stream)
+        except ValueError as e:
+            raise RequestValidationError([{"type": "npy_invalid", "loc": ("body",), "msg": str(e)}])
+
+        errors = []
+        if dtype != self._dtype:
+            errors.append({"type": "tensor_dtype", "loc": location,
+                           "msg": "Tensor should have dtype '{}', found '{}'".format(self._dtype.str, dtype.str)})
+        if len(shape) != len(self._shape) or any(expected is not None and expected != actual
+                                                 for expected, actual in zip(self._shape, shape)):
+            errors.append({"type": "tensor_shape", "loc": location,
+                           "msg": "Tensor should have shape {}, found {}".format(
+                               tuple(self._shape), tuple(shape))})
+        if len(errors) > 0:
+            raise RequestValidationError(errors)
+
+        count = int(numpy.prod(shape)) if len(shape) > 0 else 1
+        if len(body) - stream.tell() < count * dtype.itemsize:
+            raise RequestValidationError([{"type": "npy_invalid", "loc": ("body",),
+                                           "msg": "Body is shorter than the array declared in the header"}])
+
+        array = numpy.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+        array = array.reshape(shape, order="F" if fortran_order else "C")
+        return input_schema.model_construct(**{self._input_field_name: array})
+
+    def encode(self, content: Any) -> bytes:  # noqa: ANN101, ANN401
+        """Encode the tensor field of a prediction in the .npy format."""
+        array = getattr(content, self._output_field_name) if isinstance(content, BaseModel) else content
+        stream = io.BytesIO()
+        numpy.lib.format.write_array(stream, numpy.asarray(array, dtype=self._dtype), allow_pickle=False)
+        return stream.getvalue()
+
+
+class MessagePackCodec(MediaTypeCodec):
+    """Codec for the MessagePack format."""
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def decode(self, body: bytes, input_schema: Type[BaseModel]) -> BaseModel:  # noqa: ANN101
+        """Decode a MessagePack body and validate it against the input schema."""
+        try:
+            return input_schema.model_validate(msgpack.unpackb(body))
+        except ValidationError as e:
+            raise RequestValidationError([{"type": error["type"], "loc": ("body",) + tuple(error["loc"]),
+                                           "msg": error["msg"]} for error in e.errors()])
+        except (ValueError, msgpack.ExtraData) as e:
+            raise RequestValidationError([{"type": "msgpack_invalid", "loc": ("body",), "msg": str(e)}])
+
+    def encode(self, content: Any) -> bytes:  # noqa: ANN101, ANN401
+        """Encode content in the MessagePack format."""
+        return msgpack.packb(to_jsonable(content))
+
+
+def get_default_codecs() -> Dict[str, MediaTypeCodec]:
+    """Create the codecs that are supported by every endpoint in addition to JSON.
+
+    Returns:
+        Dictionary of codecs keyed by media type, MessagePack is included if the optional dependency is installed.
+
+    """
+    return {MSGPACK_MEDIA_TYPE: MessagePackCodec()} if msgpack is not None else {}
+
+
+DEFAULT_CODECS = get_default_codecs()
+
+
+def create_response(request: Request, status_code: int, content: Any,  # noqa: ANN401
+                    codecs: Optional[Dict[str, MediaTypeCodec]] = None) -> Response:
+    """Create a response in the media type negotiated with the Accept header of the request.
+
+    Args:
+        request: Request that is being responded to.
+        status_code: Status code of the response.
+        content: Content of the response.
+        codecs: Codecs that can be used to encode the response, the default codecs are used if not provided.
+
+    Returns:
+        Response object, a JSONResponse if the client does not ask for one of the codecs' media types.
+
+    """
+    codecs = codecs if codecs is not None else DEFAULT_CODECS
+    if len(codecs) > 0:
+        available = [JSON_MEDIA_TYPE] + [media_type for media_type, codec in codecs.items() if codec.can_encode]
+        request_media_type = parse_media_type(request.headers.get("content-type"))
+        default = request_media_type if request_media_type in available else JSON_MEDIA_TYPE
+        media_type = negotiate_media_type(request.headers.get("accept"), available, default)
+        if media_type is not None and media_type != JSON_MEDIA_TYPE:
+            return Response(status_code=status_code, content=codecs[media_type].encode(content),
+                            media_type=media_type)
+    return JSONResponse(status_code=status_code, content=to_jsonable(content))
+
+
+def get_openapi_response_content(codecs: Optional[Dict[str, MediaTypeCodec]] = None) -> Dict:
+    """Build the OpenAPI content entries for the media types that a response can be encoded in, other than JSON.
+
+    Args:
+        codecs: Codecs that can be used to encode the response, the default codecs are used if not provided.
+
+    Returns:
+        Dictionary of OpenAPI media type objects, keyed by media type.
+
+    """
+    codecs = codecs if codecs is not None else DEFAULT_CODECS
+    return {media_type: {"schema": {"type": "string", "format": "binary"}}
+            for media_type, codec in codecs.items() if codec.can_encode}
+
+
+def get_codecs(input_schema: Type[BaseModel], output_schema: Type[BaseModel],
+               columnar: bool = False) -> Dict[str, MediaTypeCodec]:
+    """Create the codecs that a prediction endpoint supports in addition to JSON.
+
+    Args:
+        input_schema: Input schema of the model, binary tensor requests are supported if it declares a tensor field.
+        output_schema: Output schema of the model, binary tensor responses are supported if it declares a tensor
+            field.
+        columnar: Whether the model accepts Arrow tables as input.
+
+    Returns:
+        Dictionary of codecs keyed by media type.
+
+    Raises:
+        RuntimeError: Raised if the optional dependencies needed by a codec are not installed.
+
+    """
+    codecs = get_default_codecs()
+    if columnar:
+        if pyarrow is None:
+            raise RuntimeError("Cannot accept columnar input because optional dependency 'arrow' is not installed.")
+        codecs[ARROW_STREAM_MEDIA_TYPE] = ArrowStreamCodec()
+        codecs[PARQUET_MEDIA_TYPE] = ParquetCodec()
+
+    input_tensor_field = get_tensor_field(input_schema)
+    if input_tensor_field is not None:
+        if numpy is None:
+            raise RuntimeError("Cannot accept tensor input because optional dependency 'tensor' is not installed.")
+        codecs[NPY_MEDIA_TYPE] = NumpyCodec(input_tensor_field, get_tensor_field(output_schema))
+    return codecs
+
+
+def get_openapi_content(codecs: Dict[str, MediaTypeCodec]) -> Tuple[Dict, Dict]:
+    """Build OpenAPI request body and response content entries for the media types supported by the codecs.
+
+    Args:
+        codecs: Dictionary of codecs keyed by media type.
+
+    Returns:
+        Tuple with the "openapi_extra" and "responses" entries for a route.
+
+    """
+    request_content = {media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in codecs}
+    response_content = get_openapi_response_content(codecs)
+    openapi_extra = {"requestBody": {"content": request_content}} if len(request_content) > 0 else None
+    responses = {200: {"content": response_content}} if len(response_content) > 0 else {}
+    return openapi_extra, responses
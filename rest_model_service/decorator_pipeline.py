@@ -0,0 +1,236 @@
+"""Prediction pipeline for a model and the stack of decorators attached to it."""
+from typing import Any, Callable, Dict, List
+from threading import Lock, local
+from time import perf_counter, thread_time
+
+from ml_base import MLModel
+from ml_base.decorator import MLModelDecorator
+
+from rest_model_service import metrics
+from rest_model_service import tracing
+
+
+decorator_duration = metrics.histogram("model_decorator_duration_seconds",
+                                       "Time spent in the predict() method of each decorator and model, excluding "
+                                       "the time spent in the layers that it wraps.",
+                                       ["model", "decorator"])
+decorator_cpu = metrics.histogram("model_decorator_cpu_seconds",
+                                  "CPU time of the thread that ran the predict() method of each decorator and model, "
+                                  "excluding the CPU time spent in the layers that it wraps.",
+                                  ["model", "decorator"])
+prediction_cpu = metrics.histogram("model_prediction_cpu_seconds",
+                                   "CPU time of the thread that made a prediction with a model and its decorators, "
+                                   "in seconds.",
+                                   ["model", "version"],
+                                   buckets=[0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                                            0.25, 0.5, 1.0, 2.5, 5.0, 10.0])
+
+_local = local()
+
+
+class LayerProfile(object):
+    """Timing, CPU time and call counts of a single layer of a decorator pipeline."""
+
+    def __init__(self, name: str) -> None:  # noqa: ANN101
+        """Initialize the profile.
+
+        Args:
+            name: Name of the layer, the class name of the decorator or model.
+
+        """
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.self_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.self_cpu_seconds = 0.0
+        self._lock = Lock()
+
+    def record(self, total_seconds: float, self_seconds: float, error: bool,  # noqa: ANN101
+               cpu_seconds: float = 0.0, self_cpu_seconds: float = 0.0) -> None:
+        """Record a call to the layer."""
+        with self._lock:
+            self.calls += 1
+            self.errors += 1 if error else 0
+            self.total_seconds += total_seconds
+            self.self_seconds += self_seconds
+            self.cpu_seconds += cpu_seconds
+            self.self_cpu_seconds += self_cpu_seconds
+
+    def to_dict(self) -> Dict[str, Any]:  # noqa: ANN101
+        """Return the profile as a dictionary."""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_seconds": self.total_seconds,
+            "self_seconds": self.self_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "self_cpu_seconds": self.self_cpu_seconds
+        }
+
+
+def _profile(function: Callable, profile: LayerProfile, histogram: Any,  # noqa: ANN401
+             cpu_histogram: Any) -> Callable:  # noqa: ANN401
+    """Wrap the predict() method of a layer to record its timing and the CPU time of the thread."""
+    def profiled_predict(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        # each call on the stack accumulates the time and CPU time spent in the layers it wraps, to compute its own
+        # self time
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append([0.0, 0.0])
+        error = False
+        start = perf_counter()
+        cpu_start = thread_time()
+        try:
+            return function(*args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            cpu_elapsed = thread_time() - cpu_start
+            elapsed = perf_counter() - start
+            wrapped_seconds, wrapped_cpu_seconds = stack.pop()
+            self_seconds = elapsed - wrapped_seconds
+            self_cpu_seconds = max(cpu_elapsed - wrapped_cpu_seconds, 0.0)
+            if len(stack) > 0:
+                stack[-1][0] += elapsed
+                stack[-1][1] += cpu_elapsed
+            profile.record(elapsed, self_seconds, error, cpu_elapsed, self_cpu_seconds)
+            histogram.observe(self_seconds)
+            cpu_histogram.observe(self_cpu_seconds)
+
+    profiled_predict.__wrapped__ = function
+    return profiled_predict
+
+
+def _forwards_predict(layer: MLModel) -> bool:
+    """Return True if the predict() method of a layer only forwards the call to the layer that it wraps."""
+    return isinstance(layer, MLModelDecorator) and "predict" not in layer.__dict__ \
+        and type(layer).predict is MLModelDecorator.predict
+
+
+class _WrappedLayer(MLModelDecorator):
+    """Stands in for the layer wrapped by a decorator, its predict() method is the next step of a composed chain.
+
+    Note:
+        Every other attribute is read from and written to the wrapped layer, so the decorator sees the same state as
+        when it calls the layer directly.
+
+    """
+
+    def __init__(self, layer: MLModel, predict: Callable) -> None:  # noqa: ANN101
+        super().__init__(layer)
+        # the instance dictionary is read before the predict() method of the class
+        self.__dict__["predict"] = predict
+
+
+def _compose(decorator: MLModelDecorator, next_predict: Callable) -> Callable:
+    """Return the predict() method of a decorator, calling the next step of a chain instead of the layer it wraps.
+
+    Note:
+        The method is bound to a copy of the decorator that wraps a stand-in for the wrapped layer. The decorator
+        itself is not changed, so it can be shared by other pipelines and callers of its predict() method. The
+        copy is an instance of the decorator's class, so that the methods, properties and super() calls of the class
+        work in its predict() method.
+
+    """
+    composed = object.__new__(type(decorator))
+    composed.__dict__.update(decorator.__dict__)
+    composed.__dict__["_model"] = _WrappedLayer(decorator.__dict__["_model"], next_predict)
+    return composed.predict
+
+
+class DecoratorPipeline(object):
+    """Precomposed prediction pipeline for a model and its decorators.
+
+    Note:
+        The pipeline is built once when the model is loaded. It resolves the properties of the decorated model, like
+        the qualified name and the input and output schemas, a single time instead of walking the stack of decorators
+        on every request. The chain of predict() methods is precomposed: decorators that do not override predict()
+        only forward the call, so the layer that wraps them, and the pipeline itself, call the next layer that does
+        some work directly. The CPU time of the thread that makes each prediction is recorded for the model. If
+        profiling is enabled, the predict() method of every decorator and of the model is wrapped to record call
+        counts, the time and the CPU time spent in each layer.
+
+        If tracing is enabled when the pipeline is built, the predict() method of every decorator and of the model is
+        wrapped to trace each call as a span. Every layer is then called, so that it appears in the profile or the
+        trace.
+
+        The chain is held by the pipeline, the decorators and the model are not changed, so calling predict() on
+        the decorated model directly skips the profiling and tracing of the pipeline.
+
+        CPU time is measured with time.thread_time(), so it only includes the CPU time of the thread that calls the
+        model. It excludes the time spent waiting for I/O, locks, or a thread of the threadpool. CPU time of threads
+        started by the model, like the threads of a model pipeline, is not included.
+
+    """
+
+    def __init__(self, model: MLModel, profile: bool = False) -> None:  # noqa: ANN101
+        """Initialize the pipeline.
+
+        Args:
+            model: Model instance, possibly wrapped by decorators.
+            profile: Whether to record timing and call counts of each layer.
+
+        """
+        self.model = model
+
+        # resolving the properties of the decorated model once
+        self.qualified_name = model.qualified_name
+        self.display_name = model.display_name
+        self.description = model.description
+        self.version = model.version
+        self.input_schema = model.input_schema
+        self.output_schema = model.output_schema
+        self._prediction_cpu = prediction_cpu.labels(model=self.qualified_name, version=str(self.version))
+
+        # walking the stack of decorators from the outermost decorator to the model
+        self.layers: List[MLModel] = [model]
+        while isinstance(self.layers[-1], MLModelDecorator):
+            self.layers.append(self.layers[-1].__dict__["_model"])
+
+        trace = tracing.is_enabled()
+        profiles: List[LayerProfile] = []
+
+        # composing the chain from the model outwards, each decorator that does some work calls the next one that
+        # does, decorators that only forward predict() are skipped unless every layer is profiled or traced
+        next_predict = None
+        for layer in reversed(self.layers):
+            if isinstance(layer, MLModelDecorator):
+                if _forwards_predict(layer) and not (profile or trace):
+                    continue
+                layer_predict = _compose(layer, next_predict)
+            else:
+                layer_predict = layer.predict
+
+            if profile:
+                layer_profile = LayerProfile(type(layer).__name__)
+                histogram = decorator_duration.labels(model=self.qualified_name, decorator=layer_profile.name)
+                cpu_histogram = decorator_cpu.labels(model=self.qualified_name, decorator=layer_profile.name)
+                layer_predict = _profile(layer_predict, layer_profile, histogram, cpu_histogram)
+                profiles.insert(0, layer_profile)
+
+            if trace:
+                name = "{} {}".format("decorator" if isinstance(layer, MLModelDecorator) else "model",
+                                      type(layer).__name__)
+                layer_predict = tracing.wrap(layer_predict, name)
+
+            next_predict = layer_predict
+
+        self.profiles = profiles
+        self._predict = next_predict
+
+    def predict(self, data: Any) -> Any:  # noqa: ANN101, ANN401
+        """Make a prediction with the decorated model."""
+        cpu_start = thread_time()
+        try:
+            return self._predict(data)
+        finally:
+            self._prediction_cpu.observe(thread_time() - cpu_start)
+
+    def get_profile(self) -> List[Dict[str, Any]]:  # noqa: ANN101
+        """Return the timing, CPU time and call counts of each layer, from the outermost decorator to the model."""
+        return [profile.to_dict() for profile in self.profiles]
@@ -1,13 +1,14 @@
 """Exception handler."""
 import logging
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 
 from rest_model_service.schemas import Error
+from rest_model_service.content_types import create_response
 
 
-async def validation_exception_handler(request: Request, exception: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exception: RequestValidationError) -> Response:
     """Exception handler."""
     logger = logging.getLogger(__name__)
 
@@ -30,4 +31,4 @@ async def validation_exception_handler(request: Request, exception: RequestValid
     logger.error(msg="Request validation error.", extra=extra)
 
     error = Error(type="ValidationError", messages=messages).model_dump()
-    return JSONResponse(status_code=400, content=error)
+    return create_response(request, 400, error)
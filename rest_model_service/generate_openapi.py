@@ -5,7 +5,7 @@ import traceback
 import argparse
 import yaml
 
-from rest_model_service.helpers import create_app
+from rest_model_service.helpers import create_app, get_configuration_hash
 from rest_model_service.configuration import ServiceConfiguration
 
 
@@ -15,6 +15,9 @@ def main() -> None:
     argument_parser.add_argument("--configuration_file",  type=str, help="Path of configuration file.",
                                  default="rest_config.yaml")
     argument_parser.add_argument("--output_file", type=str, help="Path of output file.", default="openapi.yaml")
+    argument_parser.add_argument("--schema_only", action="store_true",
+                                 help="Generate the document from the classes of the models and decorators, without "
+                                      "initializing them.")
 
     args = argument_parser.parse_args()
 
@@ -23,13 +26,18 @@ def main() -> None:
             configuration_dict = yaml.full_load(file)
         configuration = ServiceConfiguration(**configuration_dict)
 
+        # the OpenAPI document is generated from scratch even if the configuration points to a generated document
+        configuration.openapi_file = None
+
         # create application object, waiting for model creation to finish in order to have all the model endpoints in
         # the OpenAPI document
-        app = create_app(configuration, wait_for_model_creation=True)
+        app = create_app(configuration, wait_for_model_creation=True, schema_only=args.schema_only)
 
-        # save OpenAPI document
+        # save OpenAPI document, with the hash of the configuration so that the service can reuse it
+        document = app.openapi()
+        document["info"]["x-configuration-hash"] = get_configuration_hash(configuration)
         with open(args.output_file, "w") as file:
-            yaml.dump(app.openapi(), file)
+            yaml.dump(document, file)
     except Exception:
         traceback.print_exc()
         sys.exit(os.EX_SOFTWARE)
@@ -1,19 +1,50 @@
 """Helper functions."""
+import os
 import logging
-from typing import Type
+import hashlib
+import tracemalloc
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Type
 import importlib
+from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor, Future
-import logging.config
+import yaml
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from ml_base import MLModel
 from ml_base.utilities import ModelManager
 
+from rest_model_service import __version__
+
 from rest_model_service.status_manager import StatusManager, HealthStatus, StartupStatus, ReadinessStatus
-from rest_model_service.configuration import ServiceConfiguration
-from rest_model_service.routes import PredictionController  # noqa: F401,E402
+from rest_model_service.configuration import ServiceConfiguration, Model
+from rest_model_service.routes import PredictionController, PredictionRoute, PredictionDispatcher, \
+    DISPATCHER_PATH  # noqa: F401,E402
 from rest_model_service.exception_handlers import validation_exception_handler
-from rest_model_service.schemas import Error
+from rest_model_service.schemas import Error, TrafficSplitWeights, JobDetails
+from rest_model_service.content_types import get_codecs, get_openapi_content, get_openapi_response_content
+from rest_model_service.middleware import CompressionMiddleware
+from rest_model_service.background import AsynchronousDecorator, BackgroundWorker
+from rest_model_service.structured_logging import get_structured_logging_configuration, configure_logging
 from rest_model_service.routes import router
+from rest_model_service import metrics
+from rest_model_service.artifacts import ArtifactStore
+from rest_model_service.monitoring import RuntimeMonitor
+from rest_model_service.shadow import ShadowModel
+from rest_model_service.traffic_split import TrafficSplitController
+from rest_model_service.model_pipeline import ModelPipeline, PipelineStep
+from rest_model_service.jobs import JobManager, JobController
+from rest_model_service.websocket import WebSocketEndpoint
+from rest_model_service.profiling import Profiler
+from rest_model_service.memory import MemoryAccounting, MemorySampler
+from rest_model_service.circuit_breaker import CircuitBreaker, CircuitBreakerManager
+from rest_model_service import tracing
+
+try:
+    from prometheus_fastapi_instrumentator import Instrumentator
+except ImportError:
+    Instrumentator = None
 
 
 logger = logging.getLogger(__name__)
@@ -39,13 +70,143 @@ def load_type(class_path: str) -> Type:
     return _class
 
 
-def create_app(configuration: ServiceConfiguration, wait_for_model_creation: bool = False) -> FastAPI:
+def load_configuration(file_path: str) -> ServiceConfiguration:
+    """Load the configuration of the service from a YAML file.
+
+    Args:
+        file_path: Path of the configuration file.
+
+    Returns:
+        ServiceConfiguration object.
+
+    Raises:
+        ValueError: Raised if the configuration file does not exist.
+
+    """
+    if not (os.path.exists(file_path) and os.path.isfile(file_path)):
+        raise ValueError("Could not find configuration file '{}', service has no models loaded.".format(file_path))
+
+    with open(file_path) as file:
+        configuration_dict = yaml.full_load(file)
+
+    return ServiceConfiguration(**configuration_dict)
+
+
+def instrument_app(app: FastAPI, configuration: ServiceConfiguration) -> None:
+    """Add metrics to the app, if metrics are enabled in the configuration.
+
+    Args:
+        app: FastAPI app to instrument.
+        configuration: Configuration of the service.
+
+    Raises:
+        RuntimeError: Raised if metrics are enabled and the "metrics" optional dependencies are not installed.
+
+    """
+    if configuration.metrics is None or not configuration.metrics.enabled:
+        return
+
+    if Instrumentator is None:
+        logger.critical("Cannot enable metrics because optional dependency 'metrics' is not installed.")
+        raise RuntimeError("Cannot start service with metrics without optional dependencies.")
+
+    instrumentator = Instrumentator(**configuration.metrics.model_dump(
+        exclude={"enabled", "multiprocess_directory", "scrape_cache_seconds"})).instrument(app)
+
+    # aggregating the metrics of the worker processes, or reusing the rendered metrics between scrapes
+    if metrics.is_multiprocess() or configuration.metrics.scrape_cache_seconds > 0.0:
+        app.add_api_route("/metrics", metrics.MetricsEndpoint(cache_seconds=configuration.metrics.scrape_cache_seconds),
+                          methods=["GET"], include_in_schema=False)
+    else:
+        instrumentator.expose(app, include_in_schema=False)
+
+
+def get_configuration_hash(configuration: ServiceConfiguration) -> str:
+    """Get a hash of the configuration of the service and of the version of the package.
+
+    Args:
+        configuration: Configuration of the service.
+
+    Returns:
+        Hexadecimal SHA-256 hash.
+
+    """
+    content = "{}\n{}".format(__version__, configuration.model_dump_json(exclude={"openapi_file"}))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def load_openapi_document(file_path: str, configuration: ServiceConfiguration) -> Optional[Dict[str, Any]]:
+    """Load an OpenAPI document generated by the generate_openapi command.
+
+    Args:
+        file_path: Path of the OpenAPI document, in YAML or JSON format.
+        configuration: Configuration of the service.
+
+    Returns:
+        The OpenAPI document, or None if the file does not exist, is not a valid document or was generated from a
+        different configuration.
+
+    """
+    if not os.path.isfile(file_path):
+        logger.warning("OpenAPI document %s not found, the document will be generated.", file_path)
+        return None
+
+    try:
+        with open(file_path) as file:
+            document = yaml.safe_load(file)
+    except yaml.YAMLError:
+        document = None
+
+    if not isinstance(document, dict) or not isinstance(document.get("info"), dict):
+        logger.warning("OpenAPI document %s is not a valid document, the document will be generated.", file_path)
+        return None
+
+    if document["info"].get("x-configuration-hash") != get_configuration_hash(configuration):
+        logger.warning("OpenAPI document %s was generated from a different configuration, the document will be "
+                       "generated.", file_path)
+        return None
+    return document
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start the background tasks of the service when it starts, and stop them when it shuts down.
+
+    Args:
+        app: FastAPI app.
+
+    """
+    runtime_monitor = getattr(app.state, "runtime_monitor", None)
+    if runtime_monitor is not None:
+        await runtime_monitor.start()
+    memory_sampler = getattr(app.state, "memory_sampler", None)
+    if memory_sampler is not None:
+        memory_sampler.start()
+    try:
+        yield
+    finally:
+        if runtime_monitor is not None:
+            await runtime_monitor.stop()
+        if memory_sampler is not None:
+            memory_sampler.stop()
+        if getattr(app.state, "tracing", False):
+            tracing.shutdown()
+        job_manager = getattr(app.state, "job_manager", None)
+        if job_manager is not None:
+            job_manager.close()
+
+
+def create_app(configuration: ServiceConfiguration, wait_for_model_creation: bool = False,
+               schema_only: bool = False) -> FastAPI:
     """Create instance of FastAPI app and return it.
 
     Args:
         configuration: Configuration used to create service.
         wait_for_model_creation: Whether to wait for models to finish instantiating before returning. Defaults to false
             to allow for asynchronous model creation in a separate thread.
+        schema_only: Whether to create the models and decorators without initializing them. The app has the same
+            OpenAPI document but the models can not make predictions, this is useful for generating the OpenAPI
+            document without loading the models.
 
     Returns:
         FastAPI application object.
@@ -57,14 +218,21 @@ def create_app(configuration: ServiceConfiguration, wait_for_model_creation: boo
 
     """
     # setting up the logging configuration
-    if configuration.logging is not None:
-        logging.config.dictConfig(configuration.logging)
+    if configuration.logging == "structured":
+        configure_logging(get_structured_logging_configuration())
+    elif configuration.logging is not None:
+        configure_logging(configuration.logging)
 
-    logger.info("Creating FastAPI app for: '{}'.".format(configuration.service_title))
+    logger.info("Creating FastAPI app for: '%s'.", configuration.service_title)
 
     app: FastAPI = FastAPI(title=configuration.service_title,
                            description=configuration.description,
-                           version=configuration.version)
+                           version=configuration.version,
+                           lifespan=lifespan)
+
+    # monitoring the event loop and the threadpool if monitoring is enabled
+    if configuration.monitoring is not None and configuration.monitoring.enabled:
+        app.state.runtime_monitor = RuntimeMonitor(**configuration.monitoring.model_dump(exclude={"enabled"}))
 
     # adding a custom exception handler for validation errors
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -72,6 +240,72 @@ def create_app(configuration: ServiceConfiguration, wait_for_model_creation: boo
     # adding common endpoints to the app
     app.include_router(router)
 
+    # handling the predictions of all models from a single route if the prediction dispatcher is enabled
+    if configuration.prediction_dispatcher:
+        dispatcher = PredictionDispatcher()
+        app.state.prediction_dispatcher = dispatcher
+        app.router.add_route(DISPATCHER_PATH, dispatcher.dispatch, methods=["POST"], include_in_schema=False)
+        app.openapi = lambda: dispatcher.get_openapi(app)
+
+    # executing predictions as jobs in the background if jobs are enabled, the endpoints that submit jobs for each model
+    # are added when the models are loaded
+    if configuration.jobs is not None and configuration.jobs.enabled:
+        job_manager = JobManager(**configuration.jobs.model_dump(exclude={"enabled"}))
+        app.state.job_manager = job_manager
+        app.router.add_api_route("/api/jobs/{job_id}", job_manager.get_job_endpoint, methods=["GET"],
+                                 response_model=JobDetails, responses={404: {}})
+        app.router.add_api_route("/api/jobs/{job_id}", job_manager.cancel_job_endpoint, methods=["DELETE"],
+                                 response_model=JobDetails, responses={404: {}})
+        app.router.add_api_route("/api/jobs/{job_id}/result", job_manager.get_result_endpoint, methods=["GET"],
+                                 responses={
+                                     202: {"model": JobDetails},
+                                     404: {},
+                                     409: {"model": Error},
+                                     500: {"model": Error}
+                                 })
+
+    # making predictions with any model over a WebSocket connection if the WebSocket endpoint is enabled, the models are
+    # added to the endpoint when they are loaded
+    if configuration.websocket is not None and configuration.websocket.enabled:
+        websocket_endpoint = WebSocketEndpoint(**configuration.websocket.model_dump(exclude={"enabled"}))
+        app.state.websocket_endpoint = websocket_endpoint
+        app.router.add_api_websocket_route("/api/models/predictions/ws", websocket_endpoint.handle)
+
+    # sampling the memory allocated by the models if memory sampling is enabled, the sampler is started in each worker
+    # process by the lifespan of the app
+    if configuration.memory is not None and configuration.memory.sample_interval_seconds is not None:
+        app.state.memory_sampler = MemorySampler(configuration.memory.sample_interval_seconds)
+
+    # capturing profiles of the running service if the profiling endpoint is enabled, it is left out of the OpenAPI
+    # document because it is not part of the contract of the models
+    if configuration.profiling is not None and configuration.profiling.enabled:
+        profiler = Profiler(**configuration.profiling.model_dump(exclude={"enabled"}))
+        app.router.add_api_route("/api/admin/profile", profiler.profile_endpoint, methods=["GET"],
+                                 include_in_schema=False)
+
+    # using the OpenAPI document generated ahead of time, if it was generated from the same configuration
+    if configuration.openapi_file is not None:
+        openapi_document = load_openapi_document(configuration.openapi_file, configuration)
+        if openapi_document is not None:
+            app.openapi_schema = openapi_document
+            app.openapi = lambda: openapi_document
+
+    # compressing responses and decompressing request bodies if compression is enabled
+    if configuration.compression is not None and configuration.compression.enabled:
+        app.add_middleware(CompressionMiddleware, **configuration.compression.model_dump(exclude={"enabled"}))
+
+    # tracing the requests if tracing is enabled, tracing is enabled before the models are loaded because the decorator
+    # pipelines of the models trace their layers only if it is enabled when they are built, the middleware is added
+    # last so that its span includes the other middleware
+    if configuration.tracing is not None and configuration.tracing.enabled:
+        service_name = configuration.tracing.service_name or configuration.service_title
+        tracing.configure(service_name, **configuration.tracing.model_dump(exclude={"enabled", "service_name"}))
+        app.state.tracing = True
+        app.add_middleware(tracing.TracingMiddleware)
+    else:
+        # disabling the tracing enabled by an app that was created before in the same process
+        tracing.shutdown()
+
     # setting the health, startup, and readiness status of the application, the app remains in the "HEALTHY",
     # "REFUSING_TRAFFIC", and "NOT_STARTED" state until all models and decorators are initialized.
     health_status_manager = StatusManager()
@@ -81,16 +315,19 @@ def create_app(configuration: ServiceConfiguration, wait_for_model_creation: boo
 
     # creating models and decorators in a separate thread
     executor = ThreadPoolExecutor(max_workers=1)
-    future = executor.submit(build_models, app, configuration)
+    future = executor.submit(build_models, app, configuration, schema_only)
 
     # add the set_service_status callback
     future.add_done_callback(set_service_status)
-    executor.shutdown(wait=False)  # shutting down the executor asynchronously after the task finishes
 
     # if waiting for model creation, then wait for result here instead of returning app object immediately
-    # this is useful for creating the app object for tests and for getting the full OpenAPI spec from the app
+    # this is useful for creating the app object for tests and for getting the full OpenAPI spec from the app, the
+    # thread of the executor is also finished so that the process can be forked safely after this function returns
     if wait_for_model_creation:
+        executor.shutdown(wait=True)
         _ = future.result()
+    else:
+        executor.shutdown(wait=False)  # shutting down the executor asynchronously after the task finishes
 
     return app
 
@@ -122,12 +359,90 @@ def set_service_status(future: Future) -> None:
         health_status_manager.set_startup_status(StartupStatus.STARTED)
 
 
-def build_models(app: FastAPI, configuration: ServiceConfiguration) -> None:
+def create_controller(model: MLModel, model_configuration: Model) -> PredictionController:
+    """Create the controller that makes the predictions of a model.
+
+    Args:
+        model: Model instance, with its decorators attached.
+        model_configuration: Configuration of the model.
+
+    Returns:
+        Controller of the model, with the codecs of the media types that the model supports and its circuit breaker.
+
+    """
+    controller = PredictionController(model=model,
+                                      coalesce=model_configuration.coalesce_predictions,
+                                      profile=model_configuration.profile_decorators)
+    pipeline = controller.pipeline
+    controller.codecs = get_codecs(pipeline.input_schema, pipeline.output_schema,
+                                   columnar=model_configuration.columnar)
+    if model_configuration.circuit_breaker is not None:
+        controller.circuit_breaker = CircuitBreaker(controller.qualified_name,
+                                                    **model_configuration.circuit_breaker.model_dump())
+        CircuitBreakerManager().add_circuit_breaker(controller.circuit_breaker)
+    return controller
+
+
+def add_prediction_route(app: FastAPI, controller: Callable, output_schema: Type[BaseModel],
+                         description: str) -> None:
+    """Add the prediction endpoint of a controller to an app, and its job and WebSocket endpoints if enabled.
+
+    Args:
+        app: FastAPI app to add the endpoint to.
+        controller: Controller that makes the predictions, the endpoint is named after its qualified name.
+        output_schema: Schema of the response body.
+        description: Description of the endpoint.
+
+    """
+    controller.__call__.__annotations__["data"] = controller.input_schema
+
+    openapi_extra, responses = get_openapi_content(controller.codecs)
+    if controller.circuit_breaker is not None:
+        responses[503] = {"model": Error, "content": get_openapi_response_content()}
+    path = "/api/models/{}/prediction".format(controller.qualified_name)
+    route_options = dict(methods=["POST"],
+                         response_model=output_schema,
+                         description=description,
+                         responses={
+                             **responses,
+                             400: {"model": Error, "content": get_openapi_response_content()},
+                             500: {"model": Error, "content": get_openapi_response_content()}
+                         },
+                         openapi_extra=openapi_extra)
+
+    # with the prediction dispatcher, the model's route is only used to generate the OpenAPI document
+    dispatcher = getattr(app.state, "prediction_dispatcher", None)
+    if dispatcher is not None:
+        dispatcher.add_controller(controller, APIRoute(path, controller, **route_options))
+    else:
+        app.router.add_api_route(path, controller, **route_options, route_class_override=PredictionRoute)
+
+    # adding the endpoint that submits the predictions of the controller as jobs, if jobs are enabled
+    job_manager = getattr(app.state, "job_manager", None)
+    if job_manager is not None and isinstance(controller, PredictionController):
+        job_controller = JobController(controller, job_manager)
+        JobController.__call__.__annotations__["data"] = controller.input_schema
+        job_responses = {429: {"model": Error}}
+        if controller.circuit_breaker is not None:
+            job_responses[503] = {"model": Error}
+        app.router.add_api_route("/api/models/{}/jobs".format(controller.qualified_name), job_controller,
+                                 methods=["POST"], status_code=202, response_model=JobDetails,
+                                 responses=job_responses)
+
+    # making the predictions of the controller available on the WebSocket endpoint, if it is enabled
+    websocket_endpoint = getattr(app.state, "websocket_endpoint", None)
+    if websocket_endpoint is not None and isinstance(controller, PredictionController):
+        websocket_endpoint.add_controller(controller)
+
+
+def build_models(app: FastAPI, configuration: ServiceConfiguration, schema_only: bool = False) -> None:
     """Instantiate models and decorators, adding endpoints if necessary.
 
     Args:
         app: FastAPI app to modify by adding model endpoints.
         configuration: Configuration to use to instantiate models and decorators.
+        schema_only: Whether to create the models and decorators without calling their __init__ methods, only the
+            properties of the models that are class attributes are available.
 
     Returns:
         Optional exception object, if an exception is raised it is returned to the caller.
@@ -140,20 +455,37 @@ def build_models(app: FastAPI, configuration: ServiceConfiguration) -> None:
     """
     # loading the models into the ModelManager singleton instance
     model_manager = ModelManager()
+    memory_accounting = MemoryAccounting()
+    budget_bytes = configuration.memory.budget_bytes if configuration.memory is not None else None
+
+    # tracing the allocations before the models are constructed so that the memory they hold is sampled
+    if configuration.memory is not None and configuration.memory.sample_interval_seconds is not None \
+            and not schema_only and not tracemalloc.is_tracing():
+        tracemalloc.start(configuration.memory.traced_frames)
+    model_configurations: Dict[str, Model] = {}
+    controllers: Dict[str, PredictionController] = {}
+    shadowed_controllers = []
 
     for model_configuration in configuration.models:
         # loading the model's class
         model_class = load_type(model_configuration.class_path)
 
-        # instantiating the model object from the class
-        if model_configuration.configuration is not None:
+        # instantiating the model object from the class, the __init__ method is not called if only the schemas of the
+        # model are needed because it usually loads the model parameters
+        # the growth of the resident memory while the model is constructed is recorded as the memory used by the model
+        memory_started = memory_accounting.load_started()
+        if schema_only:
+            model_instance = model_class.__new__(model_class)
+        elif model_configuration.configuration is not None:
             model_instance = model_class(**model_configuration.configuration)
         else:
             model_instance = model_class()
+        memory_accounting.load_completed(model_instance.qualified_name, model_class, memory_started)
+        memory_accounting.check_budget(budget_bytes, model_instance.qualified_name)
 
         # adding the model instance to the ModelManager
         model_manager.add_model(model_instance)
-        logger.info("Loaded {} model.".format(model_instance.qualified_name))
+        logger.info("Loaded %s model.", model_instance.qualified_name)
 
         decorators = model_configuration.decorators if model_configuration.decorators is not None else []
         # initializing decorators for the model
@@ -162,34 +494,119 @@ def build_models(app: FastAPI, configuration: ServiceConfiguration) -> None:
             decorator_class = load_type(decorator.class_path)
 
             # instantiating the decorator object from the class
-            if decorator.configuration is not None:
+            memory_started = memory_accounting.load_started()
+            if schema_only:
+                decorator_instance = decorator_class.__new__(decorator_class)
+                decorator_instance.__dict__["_model"] = None
+                decorator_instance.__dict__["_configuration"] = decorator.configuration or {}
+            elif decorator.configuration is not None:
                 decorator_instance = decorator_class(**decorator.configuration)
             else:
                 decorator_instance = decorator_class()
+            memory_accounting.load_completed(model_instance.qualified_name, decorator_class, memory_started)
+            memory_accounting.check_budget(budget_bytes, model_instance.qualified_name)
+
+            # executing side-effect decorators in a background worker, outside of the request path
+            if decorator.asynchronous:
+                worker = BackgroundWorker("{}.{}".format(model_instance.qualified_name, decorator_class.__name__),
+                                          queue_size=decorator.queue_size,
+                                          overflow_policy=decorator.overflow_policy)
+                decorator_instance = AsynchronousDecorator(decorator_instance, worker)
 
             # adding the decorator to the model in the ModelManager
             model_manager.add_decorator(model_instance.qualified_name, decorator_instance)
 
-            logger.info("Added {} decorator to {} model.".format(decorator_class.__name__,
-                                                                 model_instance.qualified_name))
+            logger.info("Added %s decorator to %s model.", decorator_class.__name__, model_instance.qualified_name)
 
         # retrieving the model instance from the ModelManager again to make sure it also has the decorators attached
         model = model_manager.get_model(model_instance.qualified_name)
 
+        model_configurations[model.qualified_name] = model_configuration
+
         # creating an endpoint for each model, if the configuration allows it
         if model_configuration.create_endpoint:
-            controller = PredictionController(model=model)
-            controller.__call__.__annotations__["data"] = model.input_schema
-
-            app.add_api_route("/api/models/{}/prediction".format(model.qualified_name),
-                              controller,
-                              methods=["POST"],
-                              response_model=model.output_schema,
-                              description=model.description,
-                              responses={
-                                  400: {"model": Error},
-                                  500: {"model": Error}
-                              })
-            logger.info("Created endpoint for {} model.".format(model.qualified_name))
+            controller = create_controller(model, model_configuration)
+            controllers[controller.qualified_name] = controller
+            add_prediction_route(app, controller, controller.pipeline.output_schema, controller.pipeline.description)
+            logger.info("Created endpoint for %s model.", controller.qualified_name)
+
+            if model_configuration.shadow is not None and not schema_only:
+                shadowed_controllers.append((controller, model_configuration.shadow))
         else:
-            logger.info("Skipped creating an endpoint for model: {}".format(model.qualified_name))
+            logger.info("Skipped creating an endpoint for model: %s", model.qualified_name)
+
+    # attaching the candidate models after all the models are loaded, a candidate can be listed after its primary model
+    for controller, shadow_configuration in shadowed_controllers:
+        try:
+            candidate = model_manager.get_model(shadow_configuration.qualified_name)
+        except ValueError:
+            raise ValueError("Shadow model '{}' of model '{}' is not loaded.".format(
+                shadow_configuration.qualified_name, controller.qualified_name))
+        worker = BackgroundWorker("shadow.{}".format(controller.qualified_name),
+                                  queue_size=shadow_configuration.queue_size)
+        controller.shadow = ShadowModel(controller.qualified_name, candidate, worker,
+                                        sample_rate=shadow_configuration.sample_rate)
+        logger.info("Mirroring predictions of %s model to %s model.", controller.qualified_name,
+                    candidate.qualified_name)
+
+    # creating a model and an endpoint for each pipeline, the pipeline's model is added to the ModelManager
+    pipelines = configuration.pipelines if configuration.pipelines is not None else []
+    for pipeline_configuration in pipelines:
+        steps = []
+        for step in pipeline_configuration.steps:
+            try:
+                step_model = model_manager.get_model(step.qualified_name)
+            except ValueError:
+                raise ValueError("Model '{}' of pipeline '{}' is not loaded.".format(
+                    step.qualified_name, pipeline_configuration.qualified_name))
+            steps.append(PipelineStep(step.name, step_model, step.inputs))
+
+        pipeline = ModelPipeline(pipeline_configuration.qualified_name, steps,
+                                 outputs=pipeline_configuration.outputs,
+                                 display_name=pipeline_configuration.display_name,
+                                 description=pipeline_configuration.description,
+                                 version=pipeline_configuration.version,
+                                 max_concurrency=pipeline_configuration.max_concurrency)
+        model_manager.add_model(pipeline)
+
+        controller = PredictionController(model=pipeline)
+        controller.codecs = get_codecs(pipeline.input_schema, pipeline.output_schema)
+        controllers[pipeline.qualified_name] = controller
+        add_prediction_route(app, controller, pipeline.output_schema, pipeline.description)
+        logger.info("Created endpoint for %s pipeline.", pipeline.qualified_name)
+
+    # creating an endpoint for each traffic split, the models that receive the traffic do not need their own endpoint
+    traffic_splits = configuration.traffic_splits if configuration.traffic_splits is not None else []
+    for traffic_split in traffic_splits:
+        if traffic_split.qualified_name in model_configurations or traffic_split.qualified_name in controllers:
+            raise ValueError("Traffic split '{}' has the same name as a model.".format(traffic_split.qualified_name))
+        variants = {}
+        for variant in traffic_split.variants:
+            if variant.qualified_name not in controllers:
+                if variant.qualified_name not in model_configurations:
+                    raise ValueError("Model '{}' of traffic split '{}' is not loaded.".format(
+                        variant.qualified_name, traffic_split.qualified_name))
+                controllers[variant.qualified_name] = create_controller(
+                    model_manager.get_model(variant.qualified_name), model_configurations[variant.qualified_name])
+            variants[variant.qualified_name] = controllers[variant.qualified_name]
+
+        controller = TrafficSplitController(traffic_split.qualified_name, variants,
+                                            {variant.qualified_name: variant.weight
+                                             for variant in traffic_split.variants},
+                                            sticky_header=traffic_split.sticky_header)
+        add_prediction_route(app, controller, controller.output_schema, controller.description)
+
+        path = "/api/models/{}/traffic_split".format(controller.qualified_name)
+        app.router.add_api_route(path, controller.get_weights_endpoint, methods=["GET"],
+                                 response_model=TrafficSplitWeights)
+        if traffic_split.runtime_updates:
+            app.router.add_api_route(path, controller.set_weights_endpoint, methods=["PUT"],
+                                     response_model=TrafficSplitWeights, responses={400: {"model": Error}})
+        logger.info("Created endpoint for %s traffic split.", controller.qualified_name)
+
+    # reporting the artifacts that the models mapped into memory while they were loaded
+    artifacts = ArtifactStore().get_artifacts()
+    if len(artifacts) > 0:
+        logger.info("Mapped %s model artifacts, %s bytes in total, in %.6f seconds.", len(artifacts),
+                    sum(artifact["size"] for artifact in artifacts),
+                    sum(artifact["load_seconds"] for artifact in artifacts))
@@ -0,0 +1,436 @@
+"""Asynchronous jobs for long-running predictions."""
+import os
+import json
+import uuid
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from threading import Lock, Thread
+from queue import Queue, Full
+from time import monotonic, time
+from fastapi import HTTPException
+from starlette.responses import Response, JSONResponse, StreamingResponse
+
+from rest_model_service.routes import PredictionController
+from rest_model_service.schemas import JobStatus, JobDetails, Error
+from rest_model_service.content_types import to_jsonable, JSON_MEDIA_TYPE
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+job_queue_depth = metrics.gauge("job_queue_depth", "Number of jobs waiting in the job queue.",
+                                multiprocess_mode="livesum")
+jobs_total = metrics.counter("jobs_total", "Number of jobs that finished, by model and status.", ["model", "status"])
+rejected_jobs = metrics.counter("jobs_rejected_total", "Number of jobs rejected because the job queue was full.",
+                                ["model"])
+stored_result_size = metrics.gauge("job_results_bytes", "Size of the results of the jobs that are retained, in bytes.",
+                                   multiprocess_mode="livesum")
+
+
+def _serialize(content: Any) -> bytes:  # noqa: ANN401
+    return json.dumps(to_jsonable(content), default=str).encode()
+
+
+class ResultTooLargeError(Exception):
+    """Raised when the result of a job does not fit in the memory limit of the retained results."""
+
+
+class Job(object):
+    """A prediction made in the background, and its result."""
+
+    def __init__(self, controller: PredictionController, data: Any) -> None:  # noqa: ANN101, ANN401
+        """Initialize the job.
+
+        Args:
+            controller: Controller of the model that makes the prediction.
+            data: Validated input of the model.
+
+        """
+        self.job_id = str(uuid.uuid4())
+        self.controller = controller
+        self.data = data
+        self.status = JobStatus.QUEUED
+        self.submitted_at = time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[Error] = None
+        # the result is kept serialized, as one JSON document or as one JSON document per item of a streamed result
+        self.chunks: List[bytes] = []
+        self.streamed = False
+        self.size = 0
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._lock = Lock()
+
+    @property
+    def finished(self) -> bool:  # noqa: ANN101
+        """Whether the job succeeded, failed or was cancelled."""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def get_details(self) -> JobDetails:  # noqa: ANN101
+        """Get the details of the job."""
+        return JobDetails(job_id=self.job_id, qualified_name=self.controller.qualified_name, status=self.status,
+                          submitted_at=self.submitted_at, started_at=self.started_at, finished_at=self.finished_at,
+                          error=self.error)
+
+    def notify(self) -> None:  # noqa: ANN101
+        """Wake up the requests that are streaming the result of the job."""
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the event loop of the request was closed
+                pass
+
+    async def wait(self, known_chunks: int) -> None:  # noqa: ANN101
+        """Wait until the job has more chunks than the number known by the caller, or it finishes."""
+        event = asyncio.Event()
+        with self._lock:
+            if len(self.chunks) > known_chunks or self.finished:
+                return
+            self._waiters.append((asyncio.get_running_loop(), event))
+        await event.wait()
+
+
+class JobManager(object):
+    """Queues jobs, executes them in a fixed pool of worker threads, and retains their results.
+
+    Note:
+        The jobs use the same controllers, and so the same model instances, as the prediction endpoints, and they are
+        counted in the load of the models. The number of jobs that run at the same time is limited by the number of
+        workers, independently of the threadpool that runs the synchronous predictions. The results of finished jobs
+        are kept until they expire. The memory limit applies to the results of running jobs as they are produced, the
+        oldest results of finished jobs are removed to make room for them, and a job fails if its result does not fit.
+        If the model has a circuit breaker, a job fails without calling the model when the breaker rejects it as it
+        starts, and the outcome of the prediction is recorded by the breaker. The worker threads are started by the
+        first job submitted in each process.
+
+    """
+
+    def __init__(self, queue_size: int = 100, workers: int = 4, result_ttl_seconds: float = 600.0,  # noqa: ANN101
+                 max_result_bytes: int = 104857600) -> None:
+        """Initialize the job manager.
+
+        Args:
+            queue_size: Maximum number of jobs waiting to be executed, jobs submitted when the queue is full are
+                rejected.
+            workers: Number of worker threads that execute jobs.
+            result_ttl_seconds: Time that the result of a finished job is kept, in seconds.
+            max_result_bytes: Maximum size of the retained results, in bytes.
+
+        """
+        self.queue_size = queue_size
+        self.workers = workers
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_result_bytes = max_result_bytes
+
+        self.jobs: Dict[str, Job] = {}
+        # finished jobs, in the order in which they finished, with the time at which they expire
+        self._finished_jobs: "OrderedDict[str, float]" = OrderedDict()
+        self._result_bytes = 0
+        self._lock = Lock()
+        self._pid: Optional[int] = None
+        self._queue: Optional[Queue] = None
+        self._threads: List[Thread] = []
+
+    def _start(self) -> Queue:  # noqa: ANN101
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._queue
+        with self._lock:
+            if self._pid != pid:
+                self._queue = Queue(maxsize=self.queue_size)
+                self._threads = [Thread(target=self._run, args=(self._queue,), name="job-worker-{}".format(i),
+                                        daemon=True) for i in range(self.workers)]
+                for thread in self._threads:
+                    thread.start()
+                self._pid = pid
+        return self._queue
+
+    def submit(self, controller: PredictionController, data: Any) -> Optional[Job]:  # noqa: ANN101, ANN401
+        """Add a job to the queue.
+
+        Args:
+            controller: Controller of the model that makes the prediction.
+            data: Validated input of the model.
+
+        Returns:
+            The job, or None if the queue is full.
+
+        """
+        queue = self._start()
+        self._expire()
+        job = Job(controller, data)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        try:
+            queue.put_nowait(job)
+        except Full:
+            with self._lock:
+                del self.jobs[job.job_id]
+            rejected_jobs.labels(model=controller.qualified_name).inc()
+            return None
+        job_queue_depth.set(queue.qsize())
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:  # noqa: ANN101
+        """Get a job that is waiting, running, or finished and not expired.
+
+        Args:
+            job_id: ID of the job.
+
+        Returns:
+            The job, or None if it does not exist.
+
+        """
+        self._expire()
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:  # noqa: ANN101
+        """Cancel a job that is waiting in the queue, or remove the result of a finished job.
+
+        Args:
+            job_id: ID of the job.
+
+        Returns:
+            The job, or None if it does not exist. A job that is running is not cancelled.
+
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == JobStatus.QUEUED:
+                job.status = JobStatus.CANCELLED
+                job.finished_at = time()
+                self._finished_jobs[job_id] = monotonic() + self.result_ttl_seconds
+            elif job.finished:
+                self._remove(job_id)
+        job.notify()
+        return job
+
+    def _remove(self, job_id: str) -> None:  # noqa: ANN101
+        """Remove a finished job, the lock must be held by the caller."""
+        self._finished_jobs.pop(job_id, None)
+        job = self.jobs.pop(job_id, None)
+        if job is not None:
+            self._result_bytes -= job.size
+            stored_result_size.set(self._result_bytes)
+
+    def _expire(self) -> None:  # noqa: ANN101
+        now = monotonic()
+        with self._lock:
+            while len(self._finished_jobs) > 0:
+                job_id, expires_at = next(iter(self._finished_jobs.items()))
+                if expires_at > now and self._result_bytes <= self.max_result_bytes:
+                    break
+                self._remove(job_id)
+
+    def _run(self, queue: Queue) -> None:  # noqa: ANN101
+        while True:
+            job = queue.get()
+            job_queue_depth.set(queue.qsize())
+            if job is None:
+                return
+            with self._lock:
+                if job.status != JobStatus.QUEUED:
+                    continue
+                job.status = JobStatus.RUNNING
+                job.started_at = time()
+            self._execute(job)
+
+    def _add_chunk(self, job: Job, chunk: bytes) -> None:  # noqa: ANN101
+        size = len(chunk)
+        with self._lock:
+            if job.size + size > self.max_result_bytes:
+                raise ResultTooLargeError("The result of the job is larger than the maximum size of the retained "
+                                          "results, {} bytes.".format(self.max_result_bytes))
+            # making room for the chunk by removing the results of the oldest finished jobs
+            while self._result_bytes + size > self.max_result_bytes and len(self._finished_jobs) > 0:
+                self._remove(next(iter(self._finished_jobs)))
+            if self._result_bytes + size > self.max_result_bytes:
+                raise ResultTooLargeError("The results of the running jobs are larger than the maximum size of the "
+                                          "retained results, {} bytes.".format(self.max_result_bytes))
+            job.chunks.append(chunk)
+            job.size += size
+            self._result_bytes += size
+            stored_result_size.set(self._result_bytes)
+        job.notify()
+
+    def _execute(self, job: Job) -> None:  # noqa: ANN101
+        controller = job.controller
+        circuit_breaker = controller.circuit_breaker
+        # the breaker is asked again when the job runs because it can open while the job is in the queue
+        trial = circuit_breaker.acquire() if circuit_breaker is not None else False
+        if trial is None:
+            job.error = circuit_breaker.get_error()
+            job.data = None
+            status = JobStatus.FAILED
+        else:
+            try:
+                status = self._make_prediction(job, trial)
+            finally:
+                if circuit_breaker is not None:
+                    circuit_breaker.release(trial)
+
+        with self._lock:
+            job.status = status
+            job.finished_at = time()
+            if status == JobStatus.FAILED:
+                self._result_bytes -= job.size
+                job.chunks, job.size = [], 0
+                stored_result_size.set(self._result_bytes)
+            self._finished_jobs[job.job_id] = monotonic() + self.result_ttl_seconds
+        jobs_total.labels(model=controller.qualified_name, status=status.value).inc()
+        job.notify()
+        self._expire()
+
+    def _make_prediction(self, job: Job, trial: bool) -> JobStatus:  # noqa: ANN101
+        controller = job.controller
+        started = controller.load.prediction_started()
+        try:
+            prediction = controller.predict(job.data, trial)
+            if isinstance(prediction, (list, dict, str, bytes)) or not hasattr(prediction, "__next__"):
+                self._add_chunk(job, _serialize(prediction))
+            else:
+                # the model returned an iterator, each item is kept as it is produced so it can be streamed
+                job.streamed = True
+                try:
+                    for item in prediction:
+                        self._add_chunk(job, _serialize(item))
+                finally:
+                    if hasattr(prediction, "close"):
+                        prediction.close()
+            status = JobStatus.SUCCEEDED
+        except ResultTooLargeError as e:
+            logger.error("Error when executing job %s with model '%s': %s", job.job_id, controller.qualified_name, e)
+            job.error = Error(type="ResultTooLarge", messages=[str(e)])
+            status = JobStatus.FAILED
+        except Exception as e:
+            logger.exception("Error when executing job %s with model '%s'.", job.job_id, controller.qualified_name)
+            job.error = Error(type="ServiceError", messages=[str(e)])
+            status = JobStatus.FAILED
+        finally:
+            controller.load.prediction_completed(started)
+            job.data = None
+        return status
+
+    def close(self, timeout: float = 5.0) -> None:  # noqa: ANN101
+        """Stop the worker threads after the jobs that are running finish, jobs waiting in the queue are not run.
+
+        Args:
+            timeout: Maximum time to wait for each worker thread, in seconds.
+
+        """
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            for job in self.jobs.values():
+                if job.status == JobStatus.QUEUED:
+                    job.status = JobStatus.CANCELLED
+                    job.finished_at = time()
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._pid = None
+
+    async def get_job_endpoint(self, job_id: str) -> JSONResponse:  # noqa: ANN101
+        """Return the status of a job."""
+        job = self._get_job_or_404(job_id)
+        return JSONResponse(job.get_details().model_dump(), status_code=200)
+
+    async def get_result_endpoint(self, job_id: str, stream: bool = False) -> Response:  # noqa: ANN101
+        """Return the result of a job.
+
+        The result is returned if the job succeeded, the error if it failed, and the status of the job with a 202
+        status code if it has not finished. If the model returns an iterator, the result is a JSON array of the items
+        of the iterator, and with the "stream" parameter the items are streamed as newline delimited JSON while the
+        job is running.
+
+        """
+        job = self._get_job_or_404(job_id)
+        if stream:
+            return StreamingResponse(self._stream(job), media_type=NDJSON_MEDIA_TYPE)
+        if job.status == JobStatus.SUCCEEDED:
+            content = b"[" + b",".join(job.chunks) + b"]" if job.streamed else job.chunks[0]
+            return Response(content=content, status_code=200, media_type=JSON_MEDIA_TYPE)
+        if job.status == JobStatus.FAILED:
+            return JSONResponse(job.error.model_dump(), status_code=500)
+        if job.status == JobStatus.CANCELLED:
+            error = Error(type="JobCancelled", messages=["Job {} was cancelled.".format(job_id)])
+            return JSONResponse(error.model_dump(), status_code=409)
+        return JSONResponse(job.get_details().model_dump(), status_code=202)
+
+    async def cancel_job_endpoint(self, job_id: str) -> JSONResponse:  # noqa: ANN101
+        """Cancel a job that has not started, or delete the result of a finished job."""
+        job = self.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404)
+        return JSONResponse(job.get_details().model_dump(), status_code=200)
+
+    def _get_job_or_404(self, job_id: str) -> Job:  # noqa: ANN101
+        job = self.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404)
+        return job
+
+    async def _stream(self, job: Job) -> AsyncIterator[bytes]:  # noqa: ANN101
+        sent = 0
+        while True:
+            await job.wait(sent)
+            chunks = job.chunks
+            while sent < len(chunks):
+                yield chunks[sent] + b"\n"
+                sent += 1
+            if job.finished and sent >= len(job.chunks):
+                if job.status == JobStatus.FAILED:
+                    yield _serialize(job.error) + b"\n"
+                return
+
+
+class JobController(object):
+    """Submits jobs for a model, used as the endpoint that creates jobs."""
+
+    def __init__(self, controller: PredictionController, job_manager: JobManager) -> None:  # noqa: ANN101
+        """Initialize the controller.
+
+        Args:
+            controller: Controller of the model that makes the predictions.
+            job_manager: Job manager that executes the jobs.
+
+        """
+        self.controller = controller
+        self.job_manager = job_manager
+
+    async def __call__(self, data) -> JSONResponse:  # noqa: ANN001,ANN101
+        """Submit a job that makes a prediction with a model.
+
+        Note:
+            If the model has a circuit breaker that is open, the job is rejected before it is queued.
+
+        """
+        circuit_breaker = self.controller.circuit_breaker
+        if circuit_breaker is not None:
+            trial = circuit_breaker.acquire()
+            if trial is None:
+                return JSONResponse(circuit_breaker.get_error().model_dump(), status_code=503,
+                                    headers={"Retry-After": str(circuit_breaker.get_retry_after())})
+            # the job is not a trial request until it runs
+            circuit_breaker.release(trial)
+
+        job = self.job_manager.submit(self.controller, data)
+        if job is None:
+            error = Error(type="JobQueueFull", messages=["The job queue is full, try again later."])
+            return JSONResponse(error.model_dump(), status_code=429)
+        return JSONResponse(job.get_details().model_dump(), status_code=202,
+                            headers={"Location": "/api/jobs/{}".format(job.job_id)})
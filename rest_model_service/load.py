@@ -0,0 +1,222 @@
+"""Load of the models, measured in the prediction path."""
+from typing import Any, Dict, List, Optional, Tuple
+from threading import Lock
+from time import monotonic
+import anyio.to_thread
+
+from rest_model_service import metrics
+
+
+requests_in_flight = metrics.gauge("model_requests_in_flight",
+                                   "Number of prediction requests that were received and have not been answered yet.",
+                                   ["model"], multiprocess_mode="livesum")
+predictions_executing = metrics.gauge("model_predictions_executing",
+                                      "Number of predictions that are running in a thread of the threadpool.",
+                                      ["model"], multiprocess_mode="livesum")
+prediction_busy_time = metrics.counter("model_prediction_busy_seconds_total",
+                                       "Time spent making predictions in the threadpool, in seconds.",
+                                       ["model"])
+
+
+class LoadTracker(object):
+    """Counts the requests in flight and the predictions of a model, and keeps the throughput of a recent window.
+
+    Note:
+        A request is in flight from the time that it is received by the prediction route until the response is returned.
+        It is queued while it waits for its body to be parsed and for a thread of the threadpool, and executing while
+        the model makes the prediction. The number of completed predictions and the time spent making them are kept in
+        buckets of one second, the buckets older than the window are ignored.
+
+    """
+
+    def __init__(self, qualified_name: str, window_seconds: int = 60,  # noqa: ANN101
+                 aggregate: bool = False) -> None:
+        """Initialize the tracker.
+
+        Args:
+            qualified_name: Qualified name of the model.
+            window_seconds: Length of the window of the throughput and utilization, in seconds.
+            aggregate: Whether the predictions are also counted by the trackers of the models that make them, like
+                the predictions of a traffic split, which are counted by its variants.
+
+        """
+        self.qualified_name = qualified_name
+        self.window_seconds = window_seconds
+        self.aggregate = aggregate
+        self.in_flight = 0
+        self.executing = 0
+
+        self._lock = Lock()
+        self._created = monotonic()
+        # each bucket holds the second that it counts, the number of completed predictions and the busy time
+        self._buckets: List[List[float]] = [[-1, 0, 0.0] for _ in range(window_seconds)]
+
+        self._requests_in_flight = requests_in_flight.labels(model=qualified_name)
+        self._predictions_executing = predictions_executing.labels(model=qualified_name)
+        self._prediction_busy_time = prediction_busy_time.labels(model=qualified_name)
+
+    def request_received(self) -> None:  # noqa: ANN101
+        """Record that a prediction request was received."""
+        with self._lock:
+            self.in_flight += 1
+        self._requests_in_flight.inc()
+
+    def request_completed(self) -> None:  # noqa: ANN101
+        """Record that the response to a prediction request was returned."""
+        with self._lock:
+            self.in_flight -= 1
+        self._requests_in_flight.dec()
+
+    def prediction_started(self) -> float:  # noqa: ANN101
+        """Record that a prediction started executing.
+
+        Returns:
+            Start time of the prediction, to be passed to prediction_completed().
+
+        """
+        with self._lock:
+            self.executing += 1
+        self._predictions_executing.inc()
+        return monotonic()
+
+    def prediction_completed(self, started: float) -> None:  # noqa: ANN101
+        """Record that a prediction finished executing.
+
+        Args:
+            started: Start time of the prediction, returned by prediction_started().
+
+        """
+        now = monotonic()
+        busy_seconds = now - started
+        second = int(now)
+        with self._lock:
+            self.executing -= 1
+            bucket = self._buckets[second % self.window_seconds]
+            if bucket[0] != second:
+                bucket[0], bucket[1], bucket[2] = second, 0, 0.0
+            bucket[1] += 1
+            bucket[2] += busy_seconds
+        self._predictions_executing.dec()
+        self._prediction_busy_time.inc(busy_seconds)
+
+    def get_window(self, now: Optional[float] = None) -> Tuple[float, int, float]:  # noqa: ANN101
+        """Get the predictions completed in the window.
+
+        Args:
+            now: Current time, from time.monotonic().
+
+        Returns:
+            Length of the window in seconds, which is shorter than the configured window right after the tracker is
+            created, the number of predictions completed in the window and the time spent making them, in seconds.
+
+        """
+        now = monotonic() if now is None else now
+        second = int(now)
+        with self._lock:
+            completed = 0
+            busy_seconds = 0.0
+            for bucket in self._buckets:
+                if second - bucket[0] < self.window_seconds:
+                    completed += bucket[1]
+                    busy_seconds += bucket[2]
+        return max(min(float(self.window_seconds), now - self._created), 1e-9), completed, busy_seconds
+
+
+class LoadManager(object):
+    """Keeps the load tracker of each model, singleton."""
+
+    _lock = Lock()
+
+    def __new__(cls, *args: Tuple, **kwargs: Dict):  # noqa: D102, ANN101, ANN204
+        """Create new LoadManager instance, after instance is first created it will always be returned."""
+        if not hasattr(cls, "_instance"):
+            with cls._lock:
+                cls._instance = super(LoadManager, cls).__new__(cls, *args, **kwargs)
+                cls._instance._is_initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Construct LoadManager object."""
+        if not self._is_initialized:  # pytype: disable=attribute-error
+            self._trackers: Dict[str, LoadTracker] = {}
+            self._trackers_lock = Lock()
+            self._is_initialized = True
+
+    @classmethod
+    def clear_instance(cls) -> None:  # noqa: ANN102
+        """Clear singleton instance from class."""
+        if hasattr(cls, "_instance"):
+            del cls._instance
+
+    def get_tracker(self, qualified_name: str, aggregate: bool = False) -> LoadTracker:  # noqa: ANN101
+        """Get the load tracker of a model, creating it if it does not exist.
+
+        Args:
+            qualified_name: Qualified name of the model.
+            aggregate: Whether the predictions are also counted by the trackers of the models that make them, used
+                when the tracker is created.
+
+        Returns:
+            Load tracker of the model.
+
+        """
+        with self._trackers_lock:
+            tracker = self._trackers.get(qualified_name)
+            if tracker is None:
+                tracker = self._trackers[qualified_name] = LoadTracker(qualified_name, aggregate=aggregate)
+            return tracker
+
+    def get_load(self) -> Dict[str, Any]:  # noqa: ANN101
+        """Get the load of the service and of each model.
+
+        Returns:
+            Dictionary in the schema of the LoadResponse object.
+
+        Note:
+            This method must be called from the event loop of the service, because the statistics of the threadpool
+            are read from the AnyIO capacity limiter of the running event loop. The utilization is the time spent
+            making predictions in the window, divided by the time that all the threads of the threadpool could have
+            spent making predictions in the window. The predictions of aggregate trackers are counted by other trackers,
+            so only their queued requests are added to the totals of the service.
+
+        """
+        statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+        capacity = max(float(statistics.total_tokens), 1.0)
+        now = monotonic()
+
+        with self._trackers_lock:
+            trackers = list(self._trackers.values())
+
+        models = []
+        totals = {"in_flight": 0, "queued": 0, "executing": 0, "throughput": 0.0, "utilization": 0.0}
+        for tracker in trackers:
+            window_seconds, completed, busy_seconds = tracker.get_window(now)
+            in_flight, executing = tracker.in_flight, tracker.executing
+            models.append({
+                "qualified_name": tracker.qualified_name,
+                "in_flight": in_flight,
+                "queued": max(in_flight - executing, 0),
+                "executing": executing,
+                "throughput": completed / window_seconds,
+                "utilization": min(busy_seconds / (window_seconds * capacity), 1.0),
+                "aggregate": tracker.aggregate
+            })
+            model = models[-1]
+            totals["queued"] += model["queued"]
+            if tracker.aggregate:
+                totals["in_flight"] += model["queued"]
+            else:
+                for name in ("in_flight", "executing", "throughput", "utilization"):
+                    totals[name] += model[name]
+
+        return {
+            "in_flight": totals["in_flight"],
+            "queued": totals["queued"],
+            "executing": totals["executing"],
+            "throughput": totals["throughput"],
+            "utilization": min(totals["utilization"], 1.0),
+            "threadpool_tokens_in_use": statistics.borrowed_tokens,
+            "threadpool_tokens_total": statistics.total_tokens,
+            "threadpool_tasks_waiting": statistics.tasks_waiting,
+            "models": models
+        }
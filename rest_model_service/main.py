@@ -1,16 +1,8 @@
 """Main entry point for the service."""
 import os
-from os import path
-import logging.config
-import yaml
+import logging
 
-from rest_model_service.configuration import ServiceConfiguration
-from rest_model_service.helpers import create_app
-
-try:
-    from prometheus_fastapi_instrumentator import Instrumentator
-except ImportError:
-    Instrumentator = None
+from rest_model_service.helpers import create_app, load_configuration, instrument_app
 
 
 logger = logging.getLogger(__name__)
@@ -23,25 +15,11 @@ if "REST_CONFIG" in os.environ:
 else:
     file_path = "rest_config.yaml"
 
-# loading the configuration
-if path.exists(file_path) and path.isfile(file_path):
-    with open(file_path) as file:
-        configuration_dict = yaml.full_load(file)
-
-    # loading configuration
-    configuration = ServiceConfiguration(**configuration_dict)
+# loading the configuration, if there is no configuration file, or it is not found, then an exception is raised
+configuration = load_configuration(file_path)
 
-    # creating app
-    app = create_app(configuration, wait_for_model_creation=False)
+# creating app
+app = create_app(configuration, wait_for_model_creation=False)
 
-    # instrumenting the app if metrics are enabled
-    if Instrumentator is None and configuration.metrics is not None and configuration.metrics.enabled:
-        logger.critical("Cannot enable metrics because optional dependency 'metrics' is not installed.")
-        raise RuntimeError("Cannot start service with metrics without optional dependencies.")
-
-    if configuration.metrics is not None and configuration.metrics.enabled:
-        Instrumentator(**configuration.metrics.model_dump(exclude=["enabled"])).instrument(app).expose(
-            app, include_in_schema=False)
-else:
-    # if there is no configuration file, or it is not found, then raise an exception
-    raise ValueError("Could not find configuration file '{}', service has no models loaded.".format(file_path))
+# instrumenting the app if metrics are enabled
+instrument_app(app, configuration)
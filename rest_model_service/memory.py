@@ -0,0 +1,239 @@
+"""Accounting of the memory used by the models of the service."""
+import os
+import dis
+import time
+import logging
+import threading
+import tracemalloc
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from rest_model_service import metrics
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+logger = logging.getLogger(__name__)
+
+load_memory = metrics.gauge("model_load_memory_bytes",
+                            "Growth of the resident memory of the process while a model or decorator was "
+                            "constructed, in bytes.",
+                            ["model", "layer"],
+                            multiprocess_mode="max")
+sampled_memory = metrics.gauge("model_sampled_memory_bytes",
+                               "Memory allocated by the code of a model or its decorators that is still in use, "
+                               "sampled with tracemalloc, in bytes.",
+                               ["model"],
+                               multiprocess_mode="livesum")
+
+
+def get_resident_memory() -> Optional[int]:
+    """Return the resident memory of the process in bytes, or None if it can not be measured."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def _get_line_ranges(cls: type) -> List[Tuple[str, int, int]]:
+    """Return the file name and the first and last lines of the functions defined in a class."""
+    ranges = []
+    for attribute in vars(cls).values():
+        if isinstance(attribute, (staticmethod, classmethod)):
+            attribute = attribute.__func__
+        elif isinstance(attribute, property):
+            attribute = attribute.fget
+        code = getattr(attribute, "__code__", None)
+        if code is None:
+            continue
+        lines = [line for _, line in dis.findlinestarts(code) if line is not None]
+        ranges.append((code.co_filename, code.co_firstlineno, max(lines, default=code.co_firstlineno)))
+    return ranges
+
+
+class MemoryAccounting(object):
+    """Memory used by each model and its decorators, singleton.
+
+    Note:
+        The memory used to construct a model or a decorator is the growth of the resident memory of the process while
+        it was constructed, it includes the memory allocated by native libraries and the artifacts read into memory.
+        Memory-mapped artifacts count only for the pages that were read. The measure is made once per process, other
+        threads that allocate memory while a model is constructed add to the measure of the model.
+
+        If tracemalloc is tracing, the memory allocated by the functions of the classes of each model and its
+        decorators that is still in use can be sampled. Only the memory allocated by Python's allocator is traced.
+
+    """
+
+    _lock = Lock()
+
+    def __new__(cls, *args: Tuple, **kwargs: Dict):  # noqa: D102, ANN101, ANN204
+        """Create new MemoryAccounting instance, after instance is first created it will always be returned."""
+        if not hasattr(cls, "_instance"):
+            with cls._lock:
+                cls._instance = super(MemoryAccounting, cls).__new__(cls, *args, **kwargs)
+                cls._instance._is_initialized = False
+        return cls._instance
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Construct MemoryAccounting object."""
+        if not self._is_initialized:  # pytype: disable=attribute-error
+            self._layers: Dict[str, Dict[str, int]] = {}
+            self._line_ranges: Dict[str, List[Tuple[str, int, int]]] = {}
+            self._sampled: Dict[str, Tuple[int, float]] = {}
+            self._accounting_lock = Lock()
+            self._is_initialized = True
+
+    @classmethod
+    def clear_instance(cls) -> None:  # noqa: ANN102
+        """Clear singleton instance from class."""
+        if hasattr(cls, "_instance"):
+            del cls._instance
+
+    @staticmethod
+    def load_started() -> Optional[int]:
+        """Return the resident memory of the process before a model or decorator is constructed."""
+        return get_resident_memory()
+
+    def load_completed(self, qualified_name: str, layer: type,  # noqa: ANN101
+                       started: Optional[int]) -> None:
+        """Record the memory used to construct a model or a decorator.
+
+        Args:
+            qualified_name: Qualified name of the model.
+            layer: Class of the model or decorator.
+            started: Value returned by load_started() before the model or decorator was constructed.
+
+        """
+        resident_memory = get_resident_memory()
+        size = max(resident_memory - started, 0) if resident_memory is not None and started is not None else 0
+        with self._accounting_lock:
+            layers = self._layers.setdefault(qualified_name, {})
+            layers[layer.__name__] = layers.get(layer.__name__, 0) + size
+            self._line_ranges.setdefault(qualified_name, []).extend(_get_line_ranges(layer))
+        load_memory.labels(model=qualified_name, layer=layer.__name__).set(layers[layer.__name__])
+        logger.info("Constructing %s for %s model used %s bytes of memory.", layer.__name__, qualified_name, size)
+
+    @staticmethod
+    def check_budget(budget_bytes: Optional[int], qualified_name: str) -> None:
+        """Check that the resident memory of the process is within the memory budget of the service.
+
+        Args:
+            budget_bytes: Memory budget of the service, in bytes, nothing is checked if None.
+            qualified_name: Qualified name of the model that was loaded last.
+
+        Raises:
+            ValueError: Raised if the resident memory of the process is above the budget.
+
+        """
+        if budget_bytes is None:
+            return
+        resident_memory = get_resident_memory()
+        if resident_memory is not None and resident_memory > budget_bytes:
+            raise ValueError("The resident memory of the service is {} bytes after loading model '{}', above the "
+                             "memory budget of {} bytes.".format(resident_memory, qualified_name, budget_bytes))
+
+    def sample(self) -> None:  # noqa: ANN101
+        """Sample the memory that was allocated by the code of each model and is still in use.
+
+        Note:
+            An allocation is counted for a model if one of the frames of its traceback is in a function of the classes
+            of the model or its decorators, so the allocations made by libraries called from the model are counted if
+            tracemalloc records enough frames. Nothing is sampled if tracemalloc is not tracing.
+
+        """
+        if not tracemalloc.is_tracing():
+            return
+        with self._accounting_lock:
+            line_ranges = {qualified_name: list(ranges) for qualified_name, ranges in self._line_ranges.items()}
+        if len(line_ranges) == 0:
+            return
+
+        files: Dict[str, List[Tuple[int, int, str]]] = {}
+        for qualified_name, ranges in line_ranges.items():
+            for filename, first, last in ranges:
+                files.setdefault(filename, []).append((first, last, qualified_name))
+
+        sizes = {qualified_name: 0 for qualified_name in line_ranges}
+        snapshot = tracemalloc.take_snapshot()
+        for statistic in snapshot.statistics("traceback"):
+            models = set()
+            for frame in statistic.traceback:
+                for first, last, qualified_name in files.get(frame.filename, []):
+                    if first <= frame.lineno <= last:
+                        models.add(qualified_name)
+            for qualified_name in models:
+                sizes[qualified_name] += statistic.size
+
+        sampled_at = time.time()
+        with self._accounting_lock:
+            for qualified_name, size in sizes.items():
+                self._sampled[qualified_name] = (size, sampled_at)
+        for qualified_name, size in sizes.items():
+            sampled_memory.labels(model=qualified_name).set(size)
+
+    def get_memory(self, qualified_name: str) -> Optional[Dict[str, Any]]:  # noqa: ANN101
+        """Return the memory used by a model, or None if it was not measured.
+
+        Args:
+            qualified_name: Qualified name of the model.
+
+        Returns:
+            Dictionary with the memory used to construct the model and its decorators, in total and by class, and the
+            last sample of the memory allocated by the model that is still in use.
+
+        """
+        with self._accounting_lock:
+            layers = self._layers.get(qualified_name)
+            if layers is None:
+                return None
+            sampled_bytes, sampled_at = self._sampled.get(qualified_name, (None, None))
+            return {
+                "load_bytes": sum(layers.values()),
+                "layers": dict(layers),
+                "sampled_bytes": sampled_bytes,
+                "sampled_at": sampled_at
+            }
+
+
+class MemorySampler(object):
+    """Samples the memory allocated by the models in a background thread."""
+
+    def __init__(self, interval_seconds: float) -> None:  # noqa: ANN101
+        """Initialize the sampler.
+
+        Args:
+            interval_seconds: Time between two samples, in seconds.
+
+        """
+        self.interval_seconds = interval_seconds
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:  # noqa: ANN101
+        """Start sampling in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:  # noqa: ANN101
+        """Stop sampling and wait for the background thread to exit."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:  # noqa: ANN101
+        memory_accounting = MemoryAccounting()
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                memory_accounting.sample()
+            except Exception:
+                logger.exception("Error when sampling the memory of the models.")
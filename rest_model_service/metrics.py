@@ -0,0 +1,223 @@
+"""Metrics recorded by the service.
+
+Note:
+    The metrics are created with the prometheus_client package, which is installed with the "metrics" optional
+    dependencies. If the package is not installed the metrics are replaced with objects that do nothing, so the code
+    that records metrics does not need to check whether metrics are available.
+
+    When the service runs in several worker processes, each process writes its metrics to files in a shared directory
+    and the metrics endpoint aggregates the files of all the processes.
+
+"""
+import os
+import glob
+from typing import Any, Dict, List, Optional, Sequence
+from threading import Lock
+from time import monotonic
+from starlette.requests import Request
+from starlette.responses import Response
+
+from rest_model_service.singleflight import SingleFlight
+
+try:
+    import prometheus_client
+    import prometheus_client.values
+    import prometheus_client.multiprocess
+    from prometheus_client.mmap_dict import MmapedDict
+except ImportError:
+    prometheus_client = None
+
+
+class _NoOpMetric(object):
+    """Metric that does nothing, used when prometheus_client is not installed."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoOpMetric":  # noqa: ANN101, ANN401
+        return self
+
+    def inc(self, amount: float = 1.0) -> None:  # noqa: ANN101
+        pass
+
+    def dec(self, amount: float = 1.0) -> None:  # noqa: ANN101
+        pass
+
+    def set(self, value: float) -> None:  # noqa: ANN101
+        pass
+
+    def observe(self, value: float) -> None:  # noqa: ANN101
+        pass
+
+
+_metrics: Dict[str, Any] = {}
+_lock = Lock()
+
+
+def _get_or_create(metric_type: str, name: str, documentation: str, labelnames: Sequence[str],
+                   **kwargs: Any) -> Any:  # noqa: ANN401
+    """Return the metric with the name, creating and registering it if it does not exist yet."""
+    if prometheus_client is None:
+        return _NoOpMetric()
+
+    with _lock:
+        if name not in _metrics:
+            metric_class = getattr(prometheus_client, metric_type)
+            _metrics[name] = metric_class(name, documentation, labelnames=list(labelnames), **kwargs)
+        return _metrics[name]
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Any:  # noqa: ANN401
+    """Get or create a counter.
+
+    Args:
+        name: Name of the metric.
+        documentation: Description of the metric.
+        labelnames: Names of the labels of the metric.
+
+    Returns:
+        prometheus_client.Counter object, or an object that does nothing if prometheus_client is not installed.
+
+    """
+    return _get_or_create("Counter", name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),  # noqa: ANN401
+              buckets: Optional[List[float]] = None) -> Any:
+    """Get or create a histogram.
+
+    Args:
+        name: Name of the metric.
+        documentation: Description of the metric.
+        labelnames: Names of the labels of the metric.
+        buckets: Upper bounds of the buckets of the histogram, uses the prometheus_client defaults if not provided.
+
+    Returns:
+        prometheus_client.Histogram object, or an object that does nothing if prometheus_client is not installed.
+
+    """
+    if buckets is not None:
+        return _get_or_create("Histogram", name, documentation, labelnames, buckets=buckets)
+    return _get_or_create("Histogram", name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (),  # noqa: ANN401
+          multiprocess_mode: str = "livesum") -> Any:
+    """Get or create a gauge.
+
+    Args:
+        name: Name of the metric.
+        documentation: Description of the metric.
+        labelnames: Names of the labels of the metric.
+        multiprocess_mode: How the values of the gauge in each process are aggregated when the service runs in several
+            worker processes, by default the values of the processes that are alive are added up.
+
+    Returns:
+        prometheus_client.Gauge object, or an object that does nothing if prometheus_client is not installed.
+
+    """
+    return _get_or_create("Gauge", name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+
+def is_multiprocess() -> bool:
+    """Return True if the metrics are written to a directory shared by several processes."""
+    return prometheus_client is not None and "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def enable_multiprocess(directory: str) -> None:
+    """Write the metrics of this process and of the processes forked from it to a shared directory.
+
+    Args:
+        directory: Directory where the metrics are written, it is created if it does not exist and the files left in
+            it by previous runs are deleted.
+
+    Note:
+        This function must be called before the processes are forked and before the models are loaded, the metrics
+        created before it is called are not written to the directory.
+
+    """
+    if prometheus_client is None:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    for file_path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(file_path)
+
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    # prometheus_client chooses how to store the values of metrics when it is imported, so it is chosen again to store
+    # the values of the metrics created from now on in the directory
+    prometheus_client.values.ValueClass = prometheus_client.values.get_value_class()
+
+
+def archive_process(pid: int) -> None:
+    """Clean up the metrics of a process that exited.
+
+    Args:
+        pid: Process id of the process.
+
+    Note:
+        The gauges of the process that only count live processes are deleted. The counters, histograms and summaries of
+        the process are added to an archive file and deleted, so the totals are kept and the number of files that is
+        read on every scrape does not grow with the number of processes that were restarted.
+
+    """
+    if not is_multiprocess():
+        return
+
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    prometheus_client.multiprocess.mark_process_dead(pid, directory)
+
+    for metric_type in ("counter", "histogram", "summary"):
+        file_path = os.path.join(directory, "{}_{}.db".format(metric_type, pid))
+        if not os.path.exists(file_path):
+            continue
+        archive = MmapedDict(os.path.join(directory, "{}_archive.db".format(metric_type)))
+        try:
+            for key, value, timestamp, _ in MmapedDict.read_all_values_from_file(file_path):
+                archived_value, _ = archive.read_value(key)
+                archive.write_value(key, archived_value + value, timestamp)
+        finally:
+            archive.close()
+        os.remove(file_path)
+
+
+class MetricsEndpoint(object):
+    """Endpoint that renders the metrics for a scrape.
+
+    Note:
+        When the service runs in several worker processes the metrics of all the processes are aggregated. Rendering
+        the metrics can be expensive when there are many metrics, so the rendered metrics can be reused for a number of
+        seconds, and concurrent scrapes share a single rendering.
+
+    """
+
+    def __init__(self, cache_seconds: float = 0.0) -> None:  # noqa: ANN101
+        """Initialize the endpoint.
+
+        Args:
+            cache_seconds: Time to reuse the rendered metrics, in seconds.
+
+        """
+        self.cache_seconds = cache_seconds
+        if is_multiprocess():
+            self.registry = prometheus_client.CollectorRegistry()
+            prometheus_client.multiprocess.MultiProcessCollector(self.registry)
+        else:
+            self.registry = prometheus_client.REGISTRY
+        self._single_flight = SingleFlight()
+        self._content: Optional[bytes] = None
+        self._rendered = 0.0
+
+    def _render(self) -> bytes:  # noqa: ANN101
+        content = prometheus_client.generate_latest(self.registry)
+        self._content, self._rendered = content, monotonic()
+        return content
+
+    def render(self) -> bytes:  # noqa: ANN101
+        """Render the metrics, reusing the last rendering if it is recent enough."""
+        content = self._content
+        if content is not None and monotonic() - self._rendered < self.cache_seconds:
+            return content
+        content, _ = self._single_flight.do("metrics", self._render)
+        return content
+
+    def __call__(self, request: Request) -> Response:  # noqa: ANN101
+        """Return the metrics."""
+        return Response(content=self.render(), media_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,364 @@
+"""ASGI middleware for the service."""
+import io
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from rest_model_service.content_types import create_response
+from rest_model_service.schemas import Error
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _create_compressor(encoding: str, level: Optional[int]) -> Any:  # noqa: ANN401
+    """Create a streaming compressor object for a content encoding, with compress() and flush() methods.
+
+    Note:
+        flush() finishes the stream by default and only flushes the data compressed so far if it is given
+        zlib.Z_SYNC_FLUSH, as with a zlib compressor.
+
+    """
+    if encoding == "gzip":
+        return zlib.compressobj(level if level is not None else 6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        return _ZstdCompressor(level if level is not None else 3)
+    if encoding == "br":
+        return _BrotliCompressor(level if level is not None else 4)
+    raise ValueError("Unsupported content encoding '{}'.".format(encoding))
+
+
+class _ZstdCompressor(object):
+    """Adapter that gives a zstandard compressor the interface of a zlib compressor."""
+
+    def __init__(self, level: int) -> None:  # noqa: ANN101
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:  # noqa: ANN101
+        return self._compressor.compress(data)
+
+    def flush(self, mode: int = zlib.Z_FINISH) -> bytes:  # noqa: ANN101
+        if mode == zlib.Z_SYNC_FLUSH:
+            return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.flush()
+
+
+class _BrotliCompressor(object):
+    """Adapter that gives a brotli compressor the interface of a zlib compressor."""
+
+    def __init__(self, quality: int) -> None:  # noqa: ANN101
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:  # noqa: ANN101
+        return self._compressor.process(data)
+
+    def flush(self, mode: int = zlib.Z_FINISH) -> bytes:  # noqa: ANN101
+        if mode == zlib.Z_SYNC_FLUSH:
+            return self._compressor.flush()
+        return self._compressor.finish()
+
+
+def get_available_encodings() -> List[str]:
+    """Return the content encodings that can be used with the packages that are installed."""
+    encodings = ["gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    return encodings
+
+
+def decompress(encoding: str, data: bytes, max_size: int) -> bytes:
+    """Decompress a request body.
+
+    Args:
+        encoding: Content encoding of the body.
+        data: Compressed body.
+        max_size: Maximum size of the decompressed body, in bytes.
+
+    Returns:
+        Decompressed body.
+
+    Raises:
+        ValueError: Raised if the body can not be decompressed or is larger than the maximum size.
+
+    """
+    # the decoders of the optional packages are not imported if they are not installed
+    if encoding not in get_available_encodings():
+        raise ValueError("Unsupported content encoding '{}'.".format(encoding))
+
+    if encoding == "gzip":
+        try:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            result = decompressor.decompress(data, max_size + 1)
+        except zlib.error as e:
+            raise ValueError(str(e))
+        finished = decompressor.eof
+    elif encoding == "zstd":
+        try:
+            result = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read(max_size + 1)
+            # the stream reader does not say whether the frame ended, its output is known to be small enough to
+            # decompress it again
+            finished = len(result) > max_size or _is_zstd_frame_complete(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(str(e))
+    elif encoding == "br":
+        try:
+            result, finished = _decompress_brotli(data, max_size)
+        except brotli.error as e:
+            raise ValueError(str(e))
+    else:
+        raise ValueError("Unsupported content encoding '{}'.".format(encoding))
+
+    if len(result) > max_size:
+        raise ValueError("Decompressed body is larger than {} bytes.".format(max_size))
+    if not finished:
+        raise ValueError("Compressed body is truncated.")
+    return result
+
+
+def _is_zstd_frame_complete(data: bytes) -> bool:
+    """Return whether a zstd body holds a complete frame."""
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    decompressor.decompress(data)
+    return decompressor.eof
+
+
+def _decompress_brotli(data: bytes, max_size: int) -> Tuple[bytes, bool]:
+    """Decompress a brotli body, stopping once the output is larger than the maximum size.
+
+    Returns:
+        Decompressed body and whether the end of the compressed stream was reached.
+
+    """
+    decompressor = brotli.Decompressor()
+    chunks = []
+    size = 0
+    if hasattr(decompressor, "can_accept_more_data"):
+        chunk = decompressor.process(data, output_buffer_limit=65536)
+        while True:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_size or decompressor.is_finished() or decompressor.can_accept_more_data():
+                break
+            chunk = decompressor.process(b"", output_buffer_limit=65536)
+    else:
+        # older versions of brotli do not limit their output, so the input is fed in small slices
+        for start in range(0, len(data), 64):
+            chunk = decompressor.process(data[start:start + 64])
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_size:
+                break
+    return b"".join(chunks), decompressor.is_finished()
+
+
+def select_encoding(accept_encoding: Optional[str], encodings: List[str]) -> Optional[str]:
+    """Select a content encoding for a response from the Accept-Encoding header of a request.
+
+    Args:
+        accept_encoding: Value of the Accept-Encoding header, can be None.
+        encodings: Encodings that can be used, in order of preference.
+
+    Returns:
+        The first encoding in the preferred encodings that is accepted by the client, or None.
+
+    """
+    if accept_encoding is None:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0.0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware(object):
+    """Middleware that compresses responses and decompresses request bodies.
+
+    Note:
+        Responses are compressed with the first of the configured encodings that the client accepts, but only if the
+        body is at least as large as the minimum size. Responses to requests whose path matches one of the excluded
+        handlers are never compressed. Request bodies with a Content-Encoding header are decompressed before they are
+        handed to the application.
+
+    """
+
+    def __init__(self, app: ASGIApp, encodings: List[str], minimum_size: int = 1024,  # noqa: ANN101
+                 levels: Optional[Dict[str, int]] = None, excluded_handlers: Optional[List[str]] = None,
+                 decompress_requests: bool = True, max_request_size: int = 104857600) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application to wrap.
+            encodings: Content encodings to use for responses, in order of preference.
+            minimum_size: Minimum size of a response body to compress it, in bytes.
+            levels: Compression levels, keyed by encoding.
+            excluded_handlers: Regular expressions for paths whose responses are never compressed.
+            decompress_requests: Whether to decompress request bodies.
+            max_request_size: Maximum size of a request body, compressed and decompressed, in bytes.
+
+        """
+        available_encodings = get_available_encodings()
+        unavailable_encodings = [encoding for encoding in encodings if encoding not in available_encodings]
+        if len(unavailable_encodings) > 0:
+            raise RuntimeError("Cannot compress responses with '{}' because optional dependency 'compression' "
+                               "is not installed.".format(", ".join(unavailable_encodings)))
+
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+        self.levels = levels if levels is not None else {}
+        self.excluded_handlers = [re.compile(pattern) for pattern in (excluded_handlers or [])]
+        self.decompress_requests = decompress_requests
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ANN101
+        """Handle a request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+
+        if self.decompress_requests and "content-encoding" in headers:
+            content_encoding = headers["content-encoding"].strip().lower()
+            if content_encoding != "identity":
+                try:
+                    scope, receive = await self._decompress_request(scope, receive, content_encoding)
+                except ValueError as e:
+                    status_code = 415 if content_encoding not in get_available_encodings() else 400
+                    error = Error(type="ContentEncodingError", messages=[str(e)]).model_dump()
+                    response = create_response(Request(scope), status_code, error)
+                    await response(scope, receive, send)
+                    return
+
+        if any(pattern.match(scope["path"]) for pattern in self.excluded_handlers):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(headers.get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressingSender(send, encoding, self.levels.get(encoding),
+                                                          self.minimum_size))
+
+    async def _decompress_request(self, scope: Scope, receive: Receive,  # noqa: ANN101
+                                  content_encoding: str) -> Tuple[Scope, Receive]:
+        """Read and decompress the request body, returning a new scope and receive function for the application."""
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_request_size:
+                raise ValueError("Compressed body is larger than {} bytes.".format(self.max_request_size))
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+
+        body = decompress(content_encoding, b"".join(chunks), self.max_request_size)
+
+        scope = dict(scope)
+        request_headers = MutableHeaders(scope=scope)
+        del request_headers["content-encoding"]
+        request_headers["content-length"] = str(len(body))
+
+        body_sent = False
+
+        async def decompressed_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, decompressed_receive
+
+
+class _CompressingSender(object):
+    """Send function wrapper that compresses the body of a response."""
+
+    def __init__(self, send: Send, encoding: str, level: Optional[int], minimum_size: int) -> None:  # noqa: ANN101
+        self._send = send
+        self._encoding = encoding
+        self._level = level
+        self._minimum_size = minimum_size
+        self._start_message = None
+        self._compressor = None
+        self._passthrough = False
+
+    async def __call__(self, message: Message) -> None:  # noqa: ANN101
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            if "content-encoding" in Headers(raw=message["headers"]):
+                self._passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is None:
+            headers = MutableHeaders(raw=self._start_message["headers"])
+            if not more_body and len(body) < self._minimum_size:
+                self._passthrough = True
+                await self._send(self._start_message)
+                await self._send(message)
+                return
+
+            self._compressor = _create_compressor(self._encoding, self._level)
+            headers["content-encoding"] = self._encoding
+            headers.add_vary_header("accept-encoding")
+            if not more_body:
+                body = self._compressor.compress(body) + self._compressor.flush()
+                headers["content-length"] = str(len(body))
+                await self._send(self._start_message)
+                await self._send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+            del headers["content-length"]
+            await self._send(self._start_message)
+
+        compressed = self._compressor.compress(body)
+        if not more_body:
+            compressed += self._compressor.flush()
+        elif len(body) > 0:
+            # streamed responses, like the lines of a job's results, are sent as they are produced instead of being
+            # held back in the buffer of the compressor
+            compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
@@ -0,0 +1,245 @@
+"""Pipelines that compose the models of the service into a directed acyclic graph."""
+import logging
+from typing import Any, Dict, List, Optional, Type
+from time import perf_counter, thread_time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from pydantic import BaseModel, create_model
+from ml_base import MLModel
+
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+step_duration = metrics.histogram("pipeline_step_duration_seconds",
+                                  "Time taken by a step of a model pipeline to make a prediction, in seconds.",
+                                  ["pipeline", "step"])
+step_cpu = metrics.histogram("pipeline_step_cpu_seconds",
+                             "CPU time of the thread that ran a step of a model pipeline, in seconds.",
+                             ["pipeline", "step"])
+
+INPUT = "input"
+
+
+def _to_class_name(name: str) -> str:
+    return "".join(part.capitalize() for part in name.replace("-", "_").split("_"))
+
+
+class PipelineStep(object):
+    """A model in a pipeline and the results that its input is built from."""
+
+    def __init__(self, name: str, model: MLModel, inputs: List[str]) -> None:  # noqa: ANN101
+        """Initialize the step.
+
+        Args:
+            name: Name of the step, unique in the pipeline.
+            model: Model that makes the prediction of the step.
+            inputs: Names of the steps whose predictions are merged into the input of the model, "input" is the input
+                of the pipeline.
+
+        """
+        self.name = name
+        self.model = model
+        self.inputs = inputs
+        self.duration = None
+        self.cpu = None
+
+    def build_input(self, results: Dict[str, Any]) -> Any:  # noqa: ANN101, ANN401
+        """Build the input of the model from the input of the pipeline and the predictions of other steps.
+
+        Args:
+            results: Input of the pipeline and predictions of the steps that finished, keyed by name.
+
+        Returns:
+            Input for the model. A single result that is already an instance of the model's input schema is passed
+            without being copied, otherwise the fields of the results are merged, in order, and validated against
+            the model's input schema.
+
+        """
+        input_schema = self.model.input_schema
+        if len(self.inputs) == 1 and type(results[self.inputs[0]]) is input_schema:
+            return results[self.inputs[0]]
+
+        fields = {}
+        for name in self.inputs:
+            result = results[name]
+            fields.update(result.model_dump() if isinstance(result, BaseModel) else result)
+        return input_schema.model_validate(fields)
+
+
+class ModelPipeline(MLModel):
+    """Model that makes a prediction by running a directed acyclic graph of other models.
+
+    Note:
+        Each step waits for the steps that it takes its input from, and steps that do not depend on each other run at
+        the same time in the threads of the pipeline. The predictions of the steps are passed to the next steps as
+        Python objects, without being serialized. The input schema of the pipeline has the fields of the input
+        schemas of the steps that take the input of the pipeline, and the output schema has a field for each output
+        step, holding the prediction of the step. If a step raises an exception, the pipeline raises the same
+        exception once the steps that are already running finish. The CPU time of each step is recorded for the step,
+        whichever thread it runs in.
+
+    """
+
+    @property
+    def display_name(self) -> str:  # noqa: ANN101
+        """Return display name of the pipeline."""
+        return self._display_name
+
+    @property
+    def qualified_name(self) -> str:  # noqa: ANN101
+        """Return qualified name of the pipeline."""
+        return self._qualified_name
+
+    @property
+    def description(self) -> str:  # noqa: ANN101
+        """Return description of the pipeline."""
+        return self._description
+
+    @property
+    def version(self) -> str:  # noqa: ANN101
+        """Return version of the pipeline."""
+        return self._version
+
+    @property
+    def input_schema(self) -> Type[BaseModel]:  # noqa: ANN101
+        """Return the generated input schema of the pipeline."""
+        return self._input_schema
+
+    @property
+    def output_schema(self) -> Type[BaseModel]:  # noqa: ANN101
+        """Return the generated output schema of the pipeline."""
+        return self._output_schema
+
+    def __init__(self, qualified_name: str, steps: List[PipelineStep],  # noqa: ANN101
+                 outputs: Optional[List[str]] = None, display_name: Optional[str] = None, description: str = "",
+                 version: str = "0.1.0", max_concurrency: int = 4) -> None:
+        """Initialize the pipeline.
+
+        Args:
+            qualified_name: Qualified name of the pipeline.
+            steps: Steps of the pipeline.
+            outputs: Names of the steps whose predictions are returned, the last step if not provided.
+            display_name: Display name of the pipeline, the qualified name if not provided.
+            description: Description of the pipeline.
+            version: Version of the pipeline.
+            max_concurrency: Number of threads that run the steps of the pipeline, shared by all the predictions of
+                the pipeline.
+
+        Raises:
+            ValueError: Raised if the names of the steps are not unique, a step takes its input from a step that does
+                not exist, the steps have a cycle, or two steps that take the input of the pipeline have a field with
+                the same name and different types.
+
+        """
+        self._qualified_name = qualified_name
+        self._display_name = display_name if display_name is not None else qualified_name
+        self._description = description
+        self._version = version
+        self.steps = {}
+        for step in steps:
+            if step.name in self.steps or step.name == INPUT:
+                raise ValueError("Step name '{}' is not unique in pipeline '{}'.".format(step.name, qualified_name))
+            step.duration = step_duration.labels(pipeline=qualified_name, step=step.name)
+            step.cpu = step_cpu.labels(pipeline=qualified_name, step=step.name)
+            self.steps[step.name] = step
+        self.outputs = outputs if outputs is not None else [steps[-1].name]
+
+        for step in steps:
+            for name in step.inputs:
+                if name != INPUT and name not in self.steps:
+                    raise ValueError("Step '{}' of pipeline '{}' takes its input from unknown step '{}'.".format(
+                        step.name, qualified_name, name))
+        for name in self.outputs:
+            if name not in self.steps:
+                raise ValueError("Output '{}' of pipeline '{}' is not a step.".format(name, qualified_name))
+        self._check_acyclic()
+
+        input_fields = {}
+        field_steps = {}
+        for step in steps:
+            if INPUT in step.inputs:
+                for field_name, field in step.model.input_schema.model_fields.items():
+                    if field_name not in input_fields:
+                        input_fields[field_name] = (field.annotation, field)
+                        field_steps[field_name] = step.name
+                    elif input_fields[field_name][0] != field.annotation:
+                        raise ValueError("Field '{}' of the input of pipeline '{}' has type '{}' in step '{}' and type "
+                                         "'{}' in step '{}'.".format(field_name, qualified_name,
+                                                                     input_fields[field_name][0],
+                                                                     field_steps[field_name], field.annotation,
+                                                                     step.name))
+        class_name = _to_class_name(qualified_name)
+        self._input_schema = create_model("{}Input".format(class_name), **input_fields)
+        self._output_schema = create_model("{}Output".format(class_name),
+                                           **{name: (self.steps[name].model.output_schema, ...)
+                                              for name in self.outputs})
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix="pipeline-{}".format(qualified_name))
+
+    def _check_acyclic(self) -> None:  # noqa: ANN101
+        finished = {INPUT}
+        remaining = dict(self.steps)
+        while len(remaining) > 0:
+            ready = [name for name, step in remaining.items() if all(name in finished for name in step.inputs)]
+            if len(ready) == 0:
+                raise ValueError("Steps {} of pipeline '{}' have a cycle.".format(sorted(remaining),
+                                                                                  self._qualified_name))
+            for name in ready:
+                finished.add(name)
+                del remaining[name]
+
+    def _run_step(self, step: PipelineStep, results: Dict[str, Any]) -> Any:  # noqa: ANN101, ANN401
+        data = step.build_input(results)
+        start = perf_counter()
+        cpu_start = thread_time()
+        prediction = step.model.predict(data=data)
+        step.cpu.observe(thread_time() - cpu_start)
+        step.duration.observe(perf_counter() - start)
+        return prediction
+
+    def predict(self, data: BaseModel) -> BaseModel:  # noqa: ANN101
+        """Make a prediction with the steps of the pipeline.
+
+        Args:
+            data: Input of the pipeline.
+
+        Returns:
+            Predictions of the output steps.
+
+        """
+        results: Dict[str, Any] = {INPUT: data}
+        pending = dict(self.steps)
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        while len(pending) > 0 or len(running) > 0:
+            ready = [step for step in pending.values() if all(name in results for name in step.inputs)] \
+                if error is None else []
+            for step in ready:
+                del pending[step.name]
+
+            # a step that is the only one that can run is run in the calling thread, to avoid a thread switch
+            if len(ready) == 1 and len(running) == 0:
+                step = ready[0]
+                results[step.name] = self._run_step(step, results)
+                continue
+            for step in ready:
+                running[self._executor.submit(self._run_step, step, dict(results))] = step.name
+
+            if len(running) == 0:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except BaseException as e:
+                    # the steps that are running are allowed to finish, no new steps are started
+                    if error is None:
+                        error = e
+
+        if error is not None:
+            raise error
+        return self._output_schema.model_construct(**{name: results[name] for name in self.outputs})
@@ -0,0 +1,142 @@
+"""Monitoring of the event loop and of the threadpool of the service."""
+import asyncio
+import logging
+from typing import Optional
+import anyio.to_thread
+
+from rest_model_service.status_manager import StatusManager
+from rest_model_service.schemas import ReadinessStatus
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = metrics.gauge("event_loop_lag_seconds",
+                               "Time that the event loop was late in running a scheduled callback, in seconds.",
+                               multiprocess_mode="livemax")
+threadpool_tokens_in_use = metrics.gauge("threadpool_tokens_in_use",
+                                         "Number of threads of the threadpool that are running a task.")
+threadpool_tokens_total = metrics.gauge("threadpool_tokens_total",
+                                        "Maximum number of threads of the threadpool.")
+threadpool_tasks_waiting = metrics.gauge("threadpool_tasks_waiting",
+                                         "Number of tasks waiting for a thread of the threadpool.")
+
+
+class RuntimeMonitor(object):
+    """Measures the lag of the event loop and the usage of the threadpool that runs the models.
+
+    Note:
+        The monitor runs as a task in the event loop. The lag is the time that the task wakes up late after sleeping
+        for the interval, a blocked event loop wakes it up late. The usage of the threadpool is read from the AnyIO
+        capacity limiter that limits the number of threads used by the service.
+
+        If thresholds are configured, the service is marked as refusing traffic when the lag or the number of tasks
+        waiting for a thread stays above its threshold for the configured number of seconds, and marked as accepting
+        traffic again when both stay below their thresholds for the same time.
+
+    """
+
+    def __init__(self, interval_seconds: float = 0.5, lag_threshold_seconds: Optional[float] = None,  # noqa: ANN101
+                 waiting_tasks_threshold: Optional[int] = None, sustained_seconds: float = 5.0,
+                 threadpool_size: Optional[int] = None) -> None:
+        """Initialize the monitor.
+
+        Args:
+            interval_seconds: Time between measurements, in seconds.
+            lag_threshold_seconds: Event loop lag above which the service is saturated, in seconds.
+            waiting_tasks_threshold: Number of tasks waiting for a thread above which the service is saturated.
+            sustained_seconds: Time that the service must stay saturated, or not saturated, before its readiness
+                status is changed, in seconds.
+            threadpool_size: Maximum number of threads of the threadpool, the AnyIO default is used if not provided.
+
+        """
+        self.interval_seconds = interval_seconds
+        self.lag_threshold_seconds = lag_threshold_seconds
+        self.waiting_tasks_threshold = waiting_tasks_threshold
+        self.sustained_seconds = sustained_seconds
+        self.threadpool_size = threadpool_size
+
+        self.lag = 0.0
+        self.tokens_in_use = 0
+        self.tokens_total = 0
+        self.tasks_waiting = 0
+        self.refusing_traffic = False
+
+        self._task: Optional[asyncio.Task] = None
+        self._state_since: Optional[float] = None
+
+    async def start(self) -> None:  # noqa: ANN101
+        """Start the monitor in the running event loop."""
+        if self.threadpool_size is not None:
+            anyio.to_thread.current_default_thread_limiter().total_tokens = self.threadpool_size
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:  # noqa: ANN101
+        """Stop the monitor."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:  # noqa: ANN101
+        loop = asyncio.get_running_loop()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval_seconds)
+            now = loop.time()
+            self.record(max(0.0, now - start - self.interval_seconds), limiter.statistics(), now)
+
+    def record(self, lag: float, statistics: anyio.CapacityLimiterStatistics, now: float) -> None:  # noqa: ANN101
+        """Record a measurement and update the readiness status of the service.
+
+        Args:
+            lag: Lag of the event loop, in seconds.
+            statistics: Statistics of the capacity limiter of the threadpool.
+            now: Time of the measurement, in seconds.
+
+        """
+        self.lag = lag
+        self.tokens_in_use = statistics.borrowed_tokens
+        self.tokens_total = statistics.total_tokens
+        self.tasks_waiting = statistics.tasks_waiting
+
+        event_loop_lag.set(self.lag)
+        threadpool_tokens_in_use.set(self.tokens_in_use)
+        threadpool_tokens_total.set(self.tokens_total)
+        threadpool_tasks_waiting.set(self.tasks_waiting)
+
+        if self.lag_threshold_seconds is None and self.waiting_tasks_threshold is None:
+            return
+
+        saturated = (self.lag_threshold_seconds is not None and self.lag > self.lag_threshold_seconds) or \
+            (self.waiting_tasks_threshold is not None and self.tasks_waiting > self.waiting_tasks_threshold)
+
+        # the time since the service entered its current state, saturated or not, is tracked until the state is
+        # sustained for long enough to change the readiness status
+        if saturated != self.refusing_traffic:
+            if self._state_since is None:
+                self._state_since = now
+            if now - self._state_since >= self.sustained_seconds:
+                self._set_refusing_traffic(saturated)
+                self._state_since = None
+        else:
+            self._state_since = None
+
+    def _set_refusing_traffic(self, refusing_traffic: bool) -> None:  # noqa: ANN101
+        status_manager = StatusManager()
+        if refusing_traffic:
+            # the readiness status is only changed if the service is accepting traffic, it could be refusing traffic
+            # because the models have not finished loading
+            if status_manager.get_readiness_status() != ReadinessStatus.ACCEPTING_TRAFFIC:
+                return
+            status_manager.set_readiness_status(ReadinessStatus.REFUSING_TRAFFIC)
+            logger.warning("Service is saturated, refusing traffic. Event loop lag: %.3f seconds, threadpool tasks "
+                           "waiting: %s.", self.lag, self.tasks_waiting)
+        else:
+            status_manager.set_readiness_status(ReadinessStatus.ACCEPTING_TRAFFIC)
+            logger.warning("Service is no longer saturated, accepting traffic.")
+        self.refusing_traffic = refusing_traffic
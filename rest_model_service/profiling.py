@@ -0,0 +1,312 @@
+"""On-demand CPU and memory profiling of the running service."""
+import os
+import dis
+import sys
+import hmac
+import asyncio
+import marshal
+import logging
+import threading
+import tracemalloc
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import Query, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from ml_base import MLModel
+from ml_base.decorator import MLModelDecorator
+from ml_base.utilities import ModelManager
+
+from rest_model_service.schemas import Error, ProfileMode, ProfileFormat
+
+
+logger = logging.getLogger(__name__)
+
+
+class Attributions(object):
+    """Labels of the predict() methods of the models and decorators that are loaded in the service."""
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Initialize the labels from the models in the ModelManager."""
+        names: Dict[CodeType, Set[str]] = {}
+        model_manager = ModelManager()
+        for model_details in model_manager.get_models():
+            qualified_name = model_details["qualified_name"]
+            layer = model_manager.get_model(qualified_name)
+            while True:
+                kind = "decorator" if isinstance(layer, MLModelDecorator) else "model"
+                code = getattr(type(layer).predict, "__code__", None)
+                if code is not None:
+                    names.setdefault(code, set()).add("{} {}".format(kind, qualified_name))
+                if not isinstance(layer, MLModelDecorator) or not isinstance(layer.__dict__["_model"], MLModel):
+                    break
+                layer = layer.__dict__["_model"]
+
+        self.labels: Dict[CodeType, str] = {code: ", ".join(sorted(labels)) for code, labels in names.items()}
+
+        # tracemalloc only records the file name and line number of each frame
+        self.ranges: Dict[str, List[Tuple[int, int, str]]] = {}
+        for code, label in self.labels.items():
+            lines = [line for _, line in dis.findlinestarts(code) if line is not None]
+            self.ranges.setdefault(code.co_filename, []).append((code.co_firstlineno, max(lines, default=0), label))
+
+    def get_code_label(self, code: CodeType) -> Optional[str]:  # noqa: ANN101
+        """Return the label of a code object if it is the predict() method of a model or decorator."""
+        return self.labels.get(code)
+
+    def get_line_label(self, filename: str, lineno: int) -> Optional[str]:  # noqa: ANN101
+        """Return the label of a line if it is in the predict() method of a model or decorator."""
+        for first, last, label in self.ranges.get(filename, []):
+            if first <= lineno <= last:
+                return label
+        return None
+
+
+def _get_qualified_name(frame: FrameType) -> str:
+    """Return the qualified name of the function of a frame, code objects only have it from Python 3.11."""
+    qualified_name = getattr(frame.f_code, "co_qualname", None)
+    return qualified_name if qualified_name is not None else _get_method_name(frame)
+
+
+def _get_method_name(frame: FrameType) -> str:
+    """Return the name of the function of a frame, prefixed with the name of its class if it is a method."""
+    code = frame.f_code
+    # the class of a method is found from its first argument, the instance or the class that it is called on
+    if code.co_argcount > 0:
+        first_argument = frame.f_locals.get(code.co_varnames[0])
+        cls = first_argument if isinstance(first_argument, type) else type(first_argument)
+        for base in getattr(cls, "__mro__", ()):
+            attribute = base.__dict__.get(code.co_name)
+            function = getattr(attribute, "__func__", attribute)
+            if getattr(function, "__code__", None) is code:
+                return "{}.{}".format(base.__qualname__, code.co_name)
+    return code.co_name
+
+
+class StackSampler(object):
+    """Samples the stacks of all the threads of the process at a regular interval."""
+
+    def __init__(self, interval_seconds: float) -> None:  # noqa: ANN101
+        """Initialize the sampler.
+
+        Args:
+            interval_seconds: Time between two samples, in seconds.
+
+        """
+        self.interval_seconds = interval_seconds
+        self.samples: Dict[Tuple, int] = {}
+        self.modules: Dict[CodeType, str] = {}
+        self.names: Dict[CodeType, str] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self) -> None:  # noqa: ANN101
+        """Start sampling in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:  # noqa: ANN101
+        """Stop sampling and wait for the background thread to exit."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:  # noqa: ANN101
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval_seconds):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                codes = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code not in self.modules:
+                        self.modules[code] = frame.f_globals.get("__name__", code.co_filename)
+                        self.names[code] = _get_qualified_name(frame)
+                    codes.append(code)
+                    frame = frame.f_back
+                stack = (thread_names.get(thread_id, str(thread_id)),) + tuple(reversed(codes))
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def get_label(self, code: CodeType, attributions: Attributions) -> str:  # noqa: ANN101
+        """Return the name of a frame in a collapsed stack."""
+        label = "{}:{}".format(self.modules[code], self.names[code])
+        attribution = attributions.get_code_label(code)
+        return label if attribution is None else "{} [{}]".format(label, attribution)
+
+    def to_collapsed(self, attributions: Attributions) -> str:  # noqa: ANN101
+        """Return the samples as collapsed stacks, one stack and its number of samples on each line."""
+        lines = []
+        for stack, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = [stack[0]] + [self.get_label(code, attributions) for code in stack[1:]]
+            lines.append("{} {}".format(";".join(frame.replace(";", ":") for frame in frames), count))
+        return "\n".join(lines) + "\n"
+
+    def to_pstats(self, attributions: Attributions) -> bytes:  # noqa: ANN101
+        """Return the samples in the marshalled format that is loaded by pstats.Stats.
+
+        Note:
+            A sampling profiler does not count calls, the number of calls of a function is the number of samples it
+            appears in, and the times are the number of samples multiplied by the sampling interval.
+
+        """
+        def key(code: CodeType) -> Tuple[str, int, str]:
+            attribution = attributions.get_code_label(code)
+            name = self.names[code] if attribution is None else "{} [{}]".format(self.names[code], attribution)
+            return code.co_filename, code.co_firstlineno, name
+
+        stats: Dict[Tuple, List] = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.interval_seconds
+            codes = stack[1:]
+            seen = set()
+            for index, code in enumerate(codes):
+                entry = stats.setdefault(key(code), [0, 0, 0.0, 0.0, {}])
+                # recursive calls are counted once in the cumulative time of the function
+                if code not in seen:
+                    seen.add(code)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                if index == len(codes) - 1:
+                    entry[2] += seconds
+                if index > 0:
+                    caller = entry[4].setdefault(key(codes[index - 1]), [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[3] += seconds
+                    if index == len(codes) - 1:
+                        caller[2] += seconds
+
+        return marshal.dumps({function: (entry[0], entry[1], entry[2], entry[3],
+                                         {caller: tuple(values) for caller, values in entry[4].items()})
+                              for function, entry in stats.items()})
+
+
+def memory_to_collapsed(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                        attributions: Attributions) -> str:
+    """Return the memory allocated between two snapshots as collapsed stacks, weighted by the number of bytes."""
+    lines = []
+    for statistic in after.compare_to(before, "traceback"):
+        if statistic.size_diff <= 0:
+            continue
+        frames = []
+        for frame in statistic.traceback:
+            label = "{}:{}".format(frame.filename, frame.lineno)
+            attribution = attributions.get_line_label(frame.filename, frame.lineno)
+            frames.append(label if attribution is None else "{} [{}]".format(label, attribution))
+        lines.append("{} {}".format(";".join(frames), statistic.size_diff))
+    return "\n".join(lines) + "\n"
+
+
+class Profiler(object):
+    """Endpoint that captures a CPU or memory profile of the service for a number of seconds.
+
+    Note:
+        The CPU profile is captured by sampling the stacks of all the threads of the process from a background thread,
+        so it does not slow down the code that is profiled and does not block the event loop. The memory profile is
+        the memory allocated and not freed while the profile is captured, traced with tracemalloc, which slows down
+        the allocations of the whole process while it is running. Only one profile is captured at a time. The frames
+        of the predict() methods of the models and decorators are labeled with their qualified names.
+
+        Requests must have an "Authorization: Bearer <token>" header with the token that is set in the environment
+        variable named by the configuration. If the environment variable is not set, all requests are refused.
+
+    """
+
+    def __init__(self, token_env_var: str = "PROFILING_TOKEN", max_seconds: float = 60.0,  # noqa: ANN101
+                 sampling_interval_seconds: float = 0.01, memory_frames: int = 25) -> None:
+        """Initialize the profiler.
+
+        Args:
+            token_env_var: Name of the environment variable that holds the token of the endpoint.
+            max_seconds: Maximum duration of a profile, in seconds.
+            sampling_interval_seconds: Time between two samples of the CPU profile, in seconds.
+            memory_frames: Number of frames of the tracebacks recorded by the memory profile.
+
+        """
+        self.token_env_var = token_env_var
+        self.max_seconds = max_seconds
+        self.sampling_interval_seconds = sampling_interval_seconds
+        self.memory_frames = memory_frames
+        self._lock = threading.Lock()
+
+    def _check_token(self, request: Request) -> Optional[JSONResponse]:  # noqa: ANN101
+        token = os.environ.get(self.token_env_var)
+        if not token:
+            return JSONResponse(Error(type="Forbidden",
+                                      messages=["The profiling token is not set."]).model_dump(), status_code=403)
+        authorization = request.headers.get("authorization", "")
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), token.encode()):
+            return JSONResponse(Error(type="Unauthorized",
+                                      messages=["The profiling token is not valid."]).model_dump(), status_code=401)
+        return None
+
+    async def profile_endpoint(self, request: Request,  # noqa: ANN101
+                               mode: ProfileMode = ProfileMode.CPU,
+                               seconds: float = 10.0,
+                               output_format: ProfileFormat = Query(default=ProfileFormat.COLLAPSED,
+                                                                    alias="format")) -> Response:
+        """Capture a profile of the service and return it.
+
+        Args:
+            request: Request, used to check the token.
+            mode: Kind of profile to capture, "cpu" or "memory".
+            seconds: Duration of the profile, in seconds.
+            output_format: Format of the profile, "collapsed" stacks or "pstats" for CPU profiles.
+
+        """
+        error_response = self._check_token(request)
+        if error_response is not None:
+            return error_response
+
+        messages = []
+        if not 0.0 < seconds <= self.max_seconds:
+            messages.append("The duration must be more than 0 and at most {} seconds.".format(self.max_seconds))
+        if mode == ProfileMode.MEMORY and output_format == ProfileFormat.PSTATS:
+            messages.append("Memory profiles can only be returned as collapsed stacks.")
+        if len(messages) > 0:
+            return JSONResponse(Error(type="ValidationError", messages=messages).model_dump(), status_code=400)
+
+        if not self._lock.acquire(blocking=False):
+            return JSONResponse(Error(type="Conflict", messages=["A profile is already being captured."]).model_dump(),
+                                status_code=409)
+        try:
+            logger.info("Capturing a %s profile for %s seconds.", mode.value, seconds)
+            if mode == ProfileMode.CPU:
+                return await self._profile_cpu(seconds, output_format)
+            else:
+                return await self._profile_memory(seconds)
+        finally:
+            self._lock.release()
+
+    async def _profile_cpu(self, seconds: float, output_format: ProfileFormat) -> Response:  # noqa: ANN101
+        sampler = StackSampler(self.sampling_interval_seconds)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+
+        attributions = Attributions()
+        if output_format == ProfileFormat.PSTATS:
+            return Response(sampler.to_pstats(attributions), media_type="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=profile.pstats"})
+        return Response(sampler.to_collapsed(attributions), media_type="text/plain")
+
+    async def _profile_memory(self, seconds: float) -> Response:  # noqa: ANN101
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(self.memory_frames)
+        try:
+            before = await run_in_threadpool(tracemalloc.take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await run_in_threadpool(tracemalloc.take_snapshot)
+        finally:
+            # tracing is left running if it was started outside of the profiler
+            if started:
+                tracemalloc.stop()
+
+        content = await run_in_threadpool(memory_to_collapsed, before, after, Attributions())
+        return Response(content, media_type="text/plain")
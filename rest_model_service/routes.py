@@ -1,8 +1,15 @@
 """Routes for the service."""
 import logging
-from fastapi import APIRouter
+from time import perf_counter
+from typing import Callable, Coroutine, Any, Dict, List, Optional
+from threading import Lock
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
-from starlette.responses import RedirectResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from starlette.responses import RedirectResponse, Response
 
 from ml_base import MLModel
 from ml_base.ml_model import MLModelSchemaValidationException
@@ -11,13 +18,28 @@ from ml_base.utilities import ModelManager
 from rest_model_service.schemas import ModelDetailsCollection, ModelMetadata, Error
 from rest_model_service.status_manager import StatusManager
 from rest_model_service.schemas import HealthStatus, ReadinessStatus, StartupStatus, HealthStatusResponse, \
-    ReadinessStatusResponse, StartupStatusResponse
+    ReadinessStatusResponse, StartupStatusResponse, LoadResponse, CircuitState, ModelReadinessResponse
+from rest_model_service.content_types import MediaTypeCodec, parse_media_type, create_response, \
+    get_openapi_response_content, JSON_MEDIA_TYPE
+from rest_model_service.singleflight import SingleFlight
+from rest_model_service.decorator_pipeline import DecoratorPipeline
+from rest_model_service.load import LoadManager
+from rest_model_service.memory import MemoryAccounting
+from rest_model_service.circuit_breaker import CircuitBreakerManager, create_rejected_response
+from rest_model_service import tracing
+from rest_model_service import metrics
 
 logger = logging.getLogger(__name__)
 
+coalesced_predictions = metrics.counter("coalesced_predictions_total",
+                                        "Number of predictions that shared the result of an identical prediction "
+                                        "that was already in flight, instead of calling the model.",
+                                        ["model"])
 
 router = APIRouter()
 
+DISPATCHER_PATH = "/api/models/{model_qualified_name}/prediction"
+
 
 @router.get("/")
 async def get_root():   # noqa: ANN201
@@ -96,13 +118,62 @@ async def startup_check() -> JSONResponse:   # noqa: ANN201
         return JSONResponse(startup_status_response.model_dump(), status_code=503)
 
 
+@router.get("/api/health/load",
+            response_model=LoadResponse,
+            responses={
+                200: {"model": LoadResponse}
+            })
+async def load_check() -> JSONResponse:   # noqa: ANN201
+    """Check on service load.
+
+    Returns the number of prediction requests in flight, queued and executing, the recent throughput and the estimated
+    utilization of the threadpool, for the whole service and for each model. The values are measured in the prediction
+    path, so they can be used to scale the service on its saturation.
+
+    """
+    load_response = LoadResponse(**LoadManager().get_load())
+    return JSONResponse(load_response.model_dump(), status_code=200)
+
+
+@router.get("/api/models/{model_qualified_name}/ready",
+            response_model=ModelReadinessResponse,
+            responses={
+                200: {"model": ModelReadinessResponse},
+                404: {},
+                503: {"model": ModelReadinessResponse}
+            })
+async def model_readiness_check(model_qualified_name: str) -> JSONResponse:   # noqa: ANN201
+    """Check on model readiness.
+
+    Indicates whether a single model is ready to respond to requests. This endpoint will return a 200 status only if
+    the service is ready and the circuit breaker of the model, if it has one, is not open. The readiness of the service
+    does not change when the circuit breaker of a model opens.
+
+    """
+    try:
+        ModelManager().get_model(model_qualified_name)
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    circuit_breaker = CircuitBreakerManager().get_circuit_breaker(model_qualified_name)
+    circuit_state = circuit_breaker.get_state() if circuit_breaker is not None else None
+    service_ready = StatusManager().get_readiness_status() == ReadinessStatus.ACCEPTING_TRAFFIC
+    ready = service_ready and circuit_state is not CircuitState.OPEN
+    model_readiness_response = ModelReadinessResponse(
+        qualified_name=model_qualified_name,
+        readiness_status=ReadinessStatus.ACCEPTING_TRAFFIC if ready else ReadinessStatus.REFUSING_TRAFFIC,
+        circuit_state=circuit_state)
+
+    return JSONResponse(model_readiness_response.model_dump(), status_code=200 if ready else 503)
+
+
 @router.get("/api/models",
             response_model=ModelDetailsCollection,
             responses={
-                200: {"model": ModelDetailsCollection},
-                500: {"model": Error}
+                200: {"model": ModelDetailsCollection, "content": get_openapi_response_content()},
+                500: {"model": Error, "content": get_openapi_response_content()}
             })
-async def get_models() -> JSONResponse:   # noqa: ANN201
+async def get_models(request: Request) -> Response:   # noqa: ANN201
     """List of models available.
 
     This endpoint returns details about all the models currently loaded in the service, however not all models
@@ -113,33 +184,36 @@ async def get_models() -> JSONResponse:   # noqa: ANN201
         model_manager = ModelManager()
         model_details_collection = model_manager.get_models()
         model_details_collection = ModelDetailsCollection(**{"models": model_details_collection}).model_dump()
-        return JSONResponse(status_code=200, content=model_details_collection)
+        return create_response(request, 200, model_details_collection)
     except Exception as e:
         error = Error(type="ServiceError", messages=[str(e)]).model_dump()
-        return JSONResponse(status_code=500, content=error)
+        return create_response(request, 500, error)
 
 
 @router.get("/api/models/{model_qualified_name}/metadata",
             response_model=ModelMetadata,
             responses={
-                200: {"model": ModelMetadata},
-                500: {"model": Error}
+                200: {"model": ModelMetadata, "content": get_openapi_response_content()},
+                500: {"model": Error, "content": get_openapi_response_content()}
             })
-async def get_model_metadata(model_qualified_name: str) -> JSONResponse:   # noqa: ANN201
+async def get_model_metadata(request: Request, model_qualified_name: str) -> Response:   # noqa: ANN201
     """Return metadata about a single model.
 
     This endpoint returns metadata about any of the models currently loaded in the service, however not all models
-    necessarily have an endpoint created for them.
+    necessarily have an endpoint created for them. The memory used by the model is included if it was measured
+    when the model was loaded.
 
     """
     try:
         model_manager = ModelManager()
         model_metadata = model_manager.get_model_metadata(qualified_name=model_qualified_name)
-        model_metadata = ModelMetadata(**model_metadata).model_dump()
-        return JSONResponse(status_code=200, content=model_metadata)
+        memory = MemoryAccounting().get_memory(model_qualified_name)
+        model_metadata = ModelMetadata(**model_metadata, memory=memory).model_dump(
+            exclude={"memory"} if memory is None else None)
+        return create_response(request, 200, model_metadata)
     except Exception as e:
         error = Error(type="ServiceError", messages=[str(e)]).model_dump()
-        return JSONResponse(status_code=500, content=error)
+        return create_response(request, 500, error)
 
 
 class PredictionController(object):
@@ -150,23 +224,247 @@ class PredictionController(object):
 
     """
 
-    def __init__(self, model: MLModel) -> None:  # noqa: ANN101
-        """Initialize the controller."""
-        self._model = model
-
-    def __call__(self, data) -> JSONResponse:  # noqa: ANN001,ANN204,ANN101
-        """Make a prediction with a model."""
+    def __init__(self, model: MLModel, codecs: Optional[Dict[str, MediaTypeCodec]] = None,  # noqa: ANN101
+                 coalesce: bool = False, profile: bool = False) -> None:
+        """Initialize the controller.
+
+        Args:
+            model: Model instance hosted by the controller.
+            codecs: Codecs for the media types that the endpoint supports in addition to JSON, keyed by media type.
+            coalesce: Whether concurrent predictions with identical inputs share a single call to the model.
+            profile: Whether to record timing and call counts of each decorator attached to the model.
+
+        """
+        self.pipeline = DecoratorPipeline(model, profile=profile)
+        self.qualified_name = self.pipeline.qualified_name
+        self.input_schema = self.pipeline.input_schema
+        self.codecs = codecs if codecs is not None else {}
+        self._single_flight = SingleFlight() if coalesce else None
+        self._coalesced_predictions = coalesced_predictions.labels(model=self.qualified_name)
+        self.load = LoadManager().get_tracker(self.qualified_name)
+        self.shadow = None
+        self.circuit_breaker = None
+
+    def predict(self, data: Any, trial: Optional[bool] = False) -> Any:  # noqa: ANN101, ANN401
+        """Make a prediction with the model.
+
+        Args:
+            data: Input for the model.
+            trial: Value returned by the acquire() method of the circuit breaker for the request of the prediction.
+
+        Returns:
+            Prediction returned by the model.
+
+        Note:
+            If coalescing is enabled, the input is serialized to canonical JSON and a prediction that is already in
+            flight with the same input is shared instead of calling the model again. Inputs that can not be serialized,
+            like binary tensors and Arrow tables, are never coalesced. If the controller has a circuit breaker, the
+            outcome and the duration of the prediction are recorded by it.
+
+        """
+        circuit_breaker = self.circuit_breaker
+        if circuit_breaker is None:
+            return self._predict(data)
+
+        started = perf_counter()
+        try:
+            prediction = self._predict(data)
+        except MLModelSchemaValidationException:
+            circuit_breaker.record(True, perf_counter() - started, trial)
+            raise
+        except Exception:
+            circuit_breaker.record(False, perf_counter() - started, trial)
+            raise
+        circuit_breaker.record(True, perf_counter() - started, trial)
+        return prediction
+
+    def _predict(self, data: Any) -> Any:  # noqa: ANN101, ANN401
+        if self._single_flight is not None and isinstance(data, BaseModel):
+            try:
+                key = (type(data), data.model_dump_json())
+            except Exception:
+                key = None
+            if key is not None:
+                prediction, shared = self._single_flight.do(key, self.pipeline.predict, data)
+                if shared:
+                    self._coalesced_predictions.inc()
+                return prediction
+        return self.pipeline.predict(data)
+
+    def __call__(self, request: Request, data) -> Response:  # noqa: ANN001,ANN204,ANN101
+        """Make a prediction with a model.
+
+        Note:
+            Whether the request is a trial request of the circuit breaker is read from the "circuit_breaker_trial"
+            attribute of the state of the request, which is set by the route that acquired the circuit breaker.
+
+        """
+        started = self.load.prediction_started()
         try:
-            prediction = self._model.predict(data).model_dump()
-            logger.debug("Made a prediction with model '{}'.".format(self._model.qualified_name))
-            return JSONResponse(status_code=200, content=prediction)
+            with tracing.span("predict", {"model": self.qualified_name}):
+                prediction = self.predict(data, getattr(request.state, "circuit_breaker_trial", False))
+            logger.debug("Made a prediction with model '%s'.", self.qualified_name)
+            if self.shadow is not None:
+                self.shadow.submit(data, prediction)
+            with tracing.span("serialization"):
+                return create_response(request, 200, prediction, self.codecs)
         except MLModelSchemaValidationException as e:
-            logger.exception("Error when making a prediction  prediction with model '{}'.".
-                             format(self._model.qualified_name), exc_info=e)
+            logger.exception("Error when making a prediction with model '%s'.", self.qualified_name, exc_info=e)
             error = Error(type="SchemaValidationError", messages=[str(e)]).model_dump()
-            return JSONResponse(status_code=400, content=error)
+            return create_response(request, 400, error)
         except Exception as e:
-            logger.exception("Error when making a prediction  prediction with model '{}'.".
-                             format(self._model.qualified_name), exc_info=e)
+            logger.exception("Error when making a prediction with model '%s'.", self.qualified_name, exc_info=e)
             error = Error(type="ServiceError", messages=[str(e)]).model_dump()
-            return JSONResponse(status_code=500, content=error)
+            return create_response(request, 500, error)
+        finally:
+            self.load.prediction_completed(started)
+
+
+async def decode_request(controller: PredictionController, request: Request,
+                         media_type: Optional[str]) -> Any:  # noqa: ANN401
+    """Decode the body of a prediction request and validate it against the input schema of the model.
+
+    Args:
+        controller: Controller of the model.
+        request: Prediction request.
+        media_type: Media type of the body of the request.
+
+    Returns:
+        Input for the model.
+
+    Raises:
+        RequestValidationError: Raised if the body is not valid or its media type is not supported.
+
+    """
+    body = await request.body()
+    codec = controller.codecs.get(media_type)
+    if codec is not None:
+        return codec.decode(body, controller.input_schema)
+    elif media_type is None or media_type == JSON_MEDIA_TYPE:
+        try:
+            return controller.input_schema.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError([{**error, "loc": ("body", *error["loc"])}
+                                          for error in e.errors(include_url=False)])
+    else:
+        raise RequestValidationError([{"loc": ("body",), "type": "media_type",
+                                       "msg": "Media type '{}' is not supported".format(media_type)}])
+
+
+class PredictionRoute(APIRoute):
+    """Route for prediction endpoints that accepts request bodies in media types other than JSON.
+
+    Note:
+        Requests with a JSON body, or without a Content-Type header, are handled by FastAPI as usual. Requests with a
+        body in one of the media types supported by the PredictionController are decoded by the controller's codec
+        and passed to the controller without being parsed into pydantic objects. If tracing is enabled, JSON bodies are
+        also validated by the route, so that the validation and the time spent waiting for a thread are traced as
+        separate spans. If the controller has a circuit breaker that is open, the request is rejected before its body
+        is read.
+
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:  # noqa: ANN101
+        """Create the handler for the route."""
+        default_route_handler = super().get_route_handler()
+        controller = self.endpoint
+
+        async def prediction_route_handler(request: Request) -> Response:
+            circuit_breaker = controller.circuit_breaker
+            trial = circuit_breaker.acquire() if circuit_breaker is not None else False
+            if trial is None:
+                return create_rejected_response(request, circuit_breaker)
+            request.state.circuit_breaker_trial = trial
+
+            controller.load.request_received()
+            try:
+                tracing.record_routing(request)
+                media_type = parse_media_type(request.headers.get("content-type"))
+                if media_type not in controller.codecs and not tracing.is_enabled():
+                    return await default_route_handler(request)
+
+                with tracing.span("validation"):
+                    data = await decode_request(controller, request, media_type)
+                return await tracing.run_in_threadpool(controller, request, data)
+            finally:
+                controller.load.request_completed()
+                if circuit_breaker is not None:
+                    circuit_breaker.release(trial)
+
+        return prediction_route_handler
+
+
+class PredictionDispatcher(object):
+    """Endpoint that handles the predictions of every model from a single parameterized route.
+
+    Note:
+        The controller of the model is found by its qualified name with a dictionary lookup, so the time to route a
+        request does not grow with the number of models. The request body is validated against the input schema of the
+        model, or decoded by the controller's codec if it is in a media type other than JSON. The dispatcher also keeps
+        a route for each model that is never matched, it is only used to generate the OpenAPI document so that the
+        document describes each model's endpoint as if it had its own route.
+
+    """
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Initialize the dispatcher."""
+        self.controllers: Dict[str, PredictionController] = {}
+        self.routes: List[APIRoute] = []
+        self._openapi: Optional[Dict[str, Any]] = None
+        self._openapi_routes = 0
+        self._openapi_lock = Lock()
+
+    def add_controller(self, controller: PredictionController, route: APIRoute) -> None:  # noqa: ANN101
+        """Add the controller of a model to the dispatcher.
+
+        Args:
+            controller: Controller of the model.
+            route: Route of the model's endpoint, used to generate the OpenAPI document.
+
+        """
+        self.controllers[controller.qualified_name] = controller
+        self.routes.append(route)
+
+    async def dispatch(self, request: Request) -> Response:  # noqa: ANN101
+        """Make a prediction with the model named in the path of the request."""
+        controller = self.controllers.get(request.path_params["model_qualified_name"])
+        if controller is None:
+            raise HTTPException(status_code=404)
+
+        circuit_breaker = controller.circuit_breaker
+        trial = circuit_breaker.acquire() if circuit_breaker is not None else False
+        if trial is None:
+            return create_rejected_response(request, circuit_breaker)
+        request.state.circuit_breaker_trial = trial
+
+        controller.load.request_received()
+        try:
+            tracing.record_routing(request, DISPATCHER_PATH)
+            with tracing.span("validation"):
+                data = await decode_request(controller, request,
+                                            parse_media_type(request.headers.get("content-type")))
+            return await tracing.run_in_threadpool(controller, request, data)
+        finally:
+            controller.load.request_completed()
+            if circuit_breaker is not None:
+                circuit_breaker.release(trial)
+
+    def get_openapi(self, app: FastAPI) -> Dict[str, Any]:  # noqa: ANN101
+        """Generate the OpenAPI document of an app, including the endpoint of each model.
+
+        Args:
+            app: App that the dispatcher is added to.
+
+        Returns:
+            OpenAPI document, it is generated again only when models are added to the dispatcher.
+
+        """
+        with self._openapi_lock:
+            if self._openapi is None or self._openapi_routes != len(self.routes):
+                self._openapi_routes = len(self.routes)
+                self._openapi = get_openapi(title=app.title,
+                                            version=app.version,
+                                            openapi_version=app.openapi_version,
+                                            description=app.description,
+                                            routes=app.routes + self.routes)
+            return self._openapi
@@ -1,5 +1,5 @@
 """Schemas used by the service."""
-from typing import List, Dict
+from typing import List, Dict, Optional
 from enum import Enum
 from pydantic import BaseModel, Field
 
@@ -40,12 +40,58 @@ class ReadinessStatusResponse(BaseModel):
     readiness_status: ReadinessStatus = Field(description="Readiness status of the service.")
 
 
+class CircuitState(str, Enum):
+    """State of the circuit breaker of a model."""
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class ModelReadinessResponse(BaseModel):
+    """Readiness status of a model."""
+
+    qualified_name: str = Field(description="The qualified name of the model.")
+    readiness_status: ReadinessStatus = Field(description="Readiness status of the model.")
+    circuit_state: Optional[CircuitState] = Field(default=None, description="State of the circuit breaker of the "
+                                                                            "model, if it has one.")
+
+
 class StartupStatusResponse(BaseModel):
     """Startup status response."""
 
     startup_status: StartupStatus = Field(description="Startup status of the service.")
 
 
+class ModelLoad(BaseModel):
+    """Load of a model."""
+
+    qualified_name: str = Field(description="The qualified name of the model.")
+    in_flight: int = Field(description="Number of prediction requests received and not answered yet.")
+    queued: int = Field(description="Number of prediction requests in flight that are waiting to be executed.")
+    executing: int = Field(description="Number of predictions running in the threadpool.")
+    throughput: float = Field(description="Predictions completed per second in the recent window.")
+    utilization: float = Field(description="Share of the capacity of the threadpool used by the model in the recent "
+                                           "window, between 0 and 1.")
+    aggregate: bool = Field(default=False, description="Whether the predictions are also counted by the models that "
+                                                       "make them, like the predictions of a traffic split.")
+
+
+class LoadResponse(BaseModel):
+    """Load of the service and of each model."""
+
+    in_flight: int = Field(description="Number of prediction requests received and not answered yet.")
+    queued: int = Field(description="Number of prediction requests in flight that are waiting to be executed.")
+    executing: int = Field(description="Number of predictions running in the threadpool.")
+    throughput: float = Field(description="Predictions completed per second in the recent window.")
+    utilization: float = Field(description="Share of the capacity of the threadpool used in the recent window, "
+                                           "between 0 and 1.")
+    threadpool_tokens_in_use: int = Field(description="Number of threads of the threadpool running a task.")
+    threadpool_tokens_total: int = Field(description="Maximum number of threads of the threadpool.")
+    threadpool_tasks_waiting: int = Field(description="Number of tasks waiting for a thread of the threadpool.")
+    models: List[ModelLoad] = Field(description="Load of each model.")
+
+
 class ModelDetails(BaseModel):
     """Metadata of a model."""
 
@@ -61,11 +107,33 @@ class ModelDetailsCollection(BaseModel):
     models: List[ModelDetails] = Field(description="Collection of model details.")
 
 
+class ModelMemory(BaseModel):
+    """Memory used by a model and its decorators."""
+
+    load_bytes: int = Field(description="Growth of the resident memory of the process while the model and its "
+                                        "decorators were constructed, in bytes.")
+    layers: Dict[str, int] = Field(description="Growth of the resident memory while each model and decorator class "
+                                               "was constructed, in bytes.")
+    sampled_bytes: Optional[int] = Field(default=None, description="Memory allocated by the code of the model and its "
+                                                                   "decorators that was in use in the last sample, "
+                                                                   "in bytes.")
+    sampled_at: Optional[float] = Field(default=None, description="Time of the last sample, in seconds since the "
+                                                                  "epoch.")
+
+
 class ModelMetadata(ModelDetails):
     """Metadata of a model, includes all information in ModelDetails plus input and output schemas of the model."""
 
     input_schema: Dict = Field(description="Input schema of a model, as a JSON Schema object.")
     output_schema: Dict = Field(description="Output schema of a model, as a JSON Schema object.")
+    memory: Optional[ModelMemory] = Field(default=None, description="Memory used by the model, if it was measured.")
+
+
+class TrafficSplitWeights(BaseModel):
+    """Weights of the models of a traffic split."""
+
+    qualified_name: str = Field(default="", description="The qualified name of the traffic split.")
+    weights: Dict[str, float] = Field(description="Weight of each model, keyed by qualified name.")
 
 
 class Error(BaseModel):
@@ -73,3 +141,41 @@ class Error(BaseModel):
 
     type: str = Field(description="The type of error.")
     messages: List[str] = Field(description="List of error messages.")
+
+
+class JobStatus(str, Enum):
+    """Status of a job."""
+
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class JobDetails(BaseModel):
+    """Details of a job."""
+
+    job_id: str = Field(description="The ID of the job.")
+    qualified_name: str = Field(description="The qualified name of the model that makes the prediction.")
+    status: JobStatus = Field(description="The status of the job.")
+    submitted_at: float = Field(description="Time when the job was submitted, in seconds since the epoch.")
+    started_at: Optional[float] = Field(default=None, description="Time when the job started running, in seconds "
+                                                                  "since the epoch.")
+    finished_at: Optional[float] = Field(default=None, description="Time when the job finished, in seconds since the "
+                                                                   "epoch.")
+    error: Optional[Error] = Field(default=None, description="The error raised by the model, if the job failed.")
+
+
+class ProfileMode(str, Enum):
+    """Kind of profile captured by the profiling endpoint."""
+
+    CPU = "cpu"
+    MEMORY = "memory"
+
+
+class ProfileFormat(str, Enum):
+    """Format of the profile returned by the profiling endpoint."""
+
+    COLLAPSED = "collapsed"
+    PSTATS = "pstats"
@@ -0,0 +1,238 @@
+"""Command that serves the models with several worker processes that share the memory of the models.
+
+Note:
+    The models are loaded once in a parent process, which then forks the worker processes. The memory of the models is
+    shared by the workers copy-on-write, instead of each worker loading its own copy of every model. The parent process
+    supervises the workers and starts a new worker when one of them exits. The command is only available on platforms
+    that support os.fork().
+
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+import traceback
+from typing import Any, Dict, Optional
+import uvicorn
+from fastapi import FastAPI
+
+from rest_model_service.helpers import create_app, load_configuration, instrument_app
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def create_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create a listening socket that is shared by the worker processes.
+
+    Args:
+        host: Address to bind the socket to.
+        port: Port to bind the socket to.
+        backlog: Maximum number of pending connections.
+
+    Returns:
+        Listening socket.
+
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class WorkerSupervisor(object):
+    """Forks worker processes that serve an app on a shared socket, and replaces the workers that exit."""
+
+    def __init__(self, app: FastAPI, sock: socket.socket, workers: int,  # noqa: ANN101
+                 uvicorn_options: Optional[Dict[str, Any]] = None, restart_delay: float = 1.0,
+                 max_startup_failures: int = 5) -> None:
+        """Initialize the supervisor.
+
+        Args:
+            app: App served by the workers, created before the workers are forked.
+            sock: Listening socket shared by the workers.
+            workers: Number of worker processes.
+            uvicorn_options: Options passed to the uvicorn.Config object of each worker.
+            restart_delay: Time to wait before replacing a worker that exited less than this number of seconds after
+                it was started, in seconds. This prevents a worker that fails on startup from being restarted in a
+                tight loop.
+            max_startup_failures: Number of workers in a row that can exit less than "restart_delay" seconds after
+                they were started, the supervisor stops the other workers and fails when one more does.
+
+        """
+        self.app = app
+        self.sock = sock
+        self.number_of_workers = workers
+        self.uvicorn_options = uvicorn_options if uvicorn_options is not None else {}
+        self.restart_delay = restart_delay
+        self.max_startup_failures = max_startup_failures
+        # time at which each worker was started, on a clock that stops while the supervisor sleeps before restarting
+        # a worker, so that a worker that exits during the sleep is not counted as having run for longer
+        self.workers: Dict[int, float] = {}
+        self._slept = 0.0
+        self._stopping = False
+        self._startup_failures = 0
+        self._exit_code = os.EX_OK
+
+    def spawn_worker(self) -> int:  # noqa: ANN101
+        """Fork a worker process.
+
+        Returns:
+            Process id of the worker.
+
+        """
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.workers[pid] = self._get_time()
+        logger.info("Started worker %s.", pid)
+        return pid
+
+    def _get_time(self) -> float:  # noqa: ANN101
+        return time.monotonic() - self._slept
+
+    def _run_worker(self) -> None:  # noqa: ANN101
+        # the worker uses the default signal handlers until uvicorn installs its own
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+
+        exit_code = os.EX_OK
+        try:
+            config = uvicorn.Config(self.app, **self.uvicorn_options)
+            server = uvicorn.Server(config)
+            server.run(sockets=[self.sock])
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else os.EX_SOFTWARE
+        except BaseException:
+            traceback.print_exc()
+            exit_code = os.EX_SOFTWARE
+        finally:
+            # exiting without running the exit handlers and finalizers inherited from the parent process
+            os._exit(exit_code)
+
+    def stop(self, signal_number: int = signal.SIGTERM, frame: Any = None) -> None:  # noqa: ANN101, ANN401
+        """Stop the workers, a second call kills the workers that are still running."""
+        kill_signal = signal.SIGKILL if self._stopping else signal.SIGTERM
+        self._stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, kill_signal)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:  # noqa: ANN101
+        """Start the workers and supervise them until the supervisor is stopped.
+
+        Returns:
+            Exit code of the supervisor process, os.EX_SOFTWARE if the supervisor stopped because the workers kept
+            failing on startup.
+
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.number_of_workers):
+            self.spawn_worker()
+
+        while len(self.workers) > 0:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+            metrics.archive_process(pid)
+            if self._stopping:
+                continue
+
+            exit_code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            failed_on_startup = self._get_time() - started < self.restart_delay
+            self._startup_failures = self._startup_failures + 1 if failed_on_startup else 0
+            if self._startup_failures > self.max_startup_failures:
+                logger.error("Worker %s exited with code %s, %s workers in a row failed on startup, stopping.", pid,
+                             exit_code, self._startup_failures)
+                self._exit_code = os.EX_SOFTWARE
+                self.stop()
+                continue
+
+            logger.warning("Worker %s exited with code %s, starting a new worker.", pid, exit_code)
+            if failed_on_startup:
+                time.sleep(self.restart_delay)
+                self._slept += self.restart_delay
+            if not self._stopping:
+                self.spawn_worker()
+
+        self.sock.close()
+        return self._exit_code
+
+
+def main() -> None:
+    """Entry point for the cli tool."""
+    argument_parser = argparse.ArgumentParser(description="Serve the models with several worker processes.")
+    argument_parser.add_argument("--configuration_file", type=str, help="Path of configuration file.",
+                                 default=os.environ.get("REST_CONFIG", "rest_config.yaml"))
+    argument_parser.add_argument("--host", type=str, help="Address to bind to.", default="127.0.0.1")
+    argument_parser.add_argument("--port", type=int, help="Port to bind to.", default=8000)
+    argument_parser.add_argument("--workers", type=int, help="Number of worker processes.",
+                                 default=os.cpu_count() or 1)
+    argument_parser.add_argument("--timeout_graceful_shutdown", type=int, default=30,
+                                 help="Maximum time for a worker to finish its requests when it is stopped, in "
+                                      "seconds.")
+
+    args = argument_parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("The serve command requires a platform that supports os.fork().", file=sys.stderr)
+        sys.exit(os.EX_UNAVAILABLE)
+
+    try:
+        # disabling the garbage collector while the models are loaded, so that the objects created are not moved to
+        # older generations, which writes to their memory pages
+        gc.disable()
+
+        configuration = load_configuration(args.configuration_file)
+
+        # the metrics of the workers are written to a shared directory and aggregated when they are scraped
+        if configuration.metrics is not None and configuration.metrics.enabled and \
+                configuration.metrics.multiprocess_directory is not None:
+            metrics.enable_multiprocess(configuration.metrics.multiprocess_directory)
+
+        # creating the app and loading the models in the parent process, before forking the workers
+        app = create_app(configuration, wait_for_model_creation=True)
+        instrument_app(app, configuration)
+        sock = create_socket(args.host, args.port)
+
+        # moving every object to the permanent generation, so the garbage collector of the workers does not touch
+        # the memory pages of the objects shared with the parent process
+        gc.freeze()
+
+        uvicorn_options = {
+            "timeout_graceful_shutdown": args.timeout_graceful_shutdown
+        }
+        # keeping the logging configuration of the service instead of the uvicorn defaults
+        if configuration.logging is not None:
+            uvicorn_options["log_config"] = None
+
+        supervisor = WorkerSupervisor(app, sock, args.workers, uvicorn_options)
+        logger.info("Serving on %s:%s with %s workers.", args.host, args.port, args.workers)
+        exit_code = supervisor.run()
+    except Exception:
+        traceback.print_exc()
+        sys.exit(os.EX_SOFTWARE)
+    else:
+        sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Mirroring of prediction requests to candidate models."""
+import random
+import logging
+from typing import Any
+from time import perf_counter
+from pydantic import BaseModel
+from ml_base import MLModel
+
+from rest_model_service.background import BackgroundWorker
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+shadow_prediction_duration = metrics.histogram("shadow_prediction_duration_seconds",
+                                               "Time taken by a candidate model to make a shadow prediction, in "
+                                               "seconds.",
+                                               ["model", "shadow_model"])
+shadow_predictions = metrics.counter("shadow_predictions_total",
+                                     "Number of shadow predictions made by a candidate model, by whether the "
+                                     "prediction agreed with the prediction of the primary model.",
+                                     ["model", "shadow_model", "result"])
+
+AGREE = "agree"
+DISAGREE = "disagree"
+ERROR = "error"
+
+
+def _equal(first: Any, second: Any) -> bool:  # noqa: ANN401
+    """Compare two predictions, pydantic objects are compared by their fields."""
+    if isinstance(first, BaseModel):
+        first = first.model_dump()
+    if isinstance(second, BaseModel):
+        second = second.model_dump()
+    try:
+        return bool(first == second)
+    except Exception:
+        # some objects, like NumPy arrays, can not be compared with the equality operator
+        return False
+
+
+class ShadowModel(object):
+    """Mirrors a sample of the predictions of a model to a candidate model, in a background worker.
+
+    Note:
+        The candidate model receives the validated input of the primary model's prediction. If the candidate model has
+        a different input schema, the input is converted to it. The candidate's prediction is compared with the
+        primary model's prediction and discarded. When the queue of the worker is full, the input is dropped instead of
+        waiting, so shadow predictions never slow down the primary model's predictions.
+
+    """
+
+    def __init__(self, qualified_name: str, candidate: MLModel, worker: BackgroundWorker,  # noqa: ANN101
+                 sample_rate: float = 1.0) -> None:
+        """Initialize the shadow model.
+
+        Args:
+            qualified_name: Qualified name of the primary model.
+            candidate: Candidate model that makes the shadow predictions.
+            worker: Background worker that executes the shadow predictions.
+            sample_rate: Fraction of the predictions of the primary model that are mirrored to the candidate model.
+
+        """
+        self.qualified_name = qualified_name
+        self.candidate = candidate
+        self.worker = worker
+        self.sample_rate = sample_rate
+
+        labels = dict(model=qualified_name, shadow_model=candidate.qualified_name)
+        self._duration = shadow_prediction_duration.labels(**labels)
+        self._agree = shadow_predictions.labels(result=AGREE, **labels)
+        self._disagree = shadow_predictions.labels(result=DISAGREE, **labels)
+        self._error = shadow_predictions.labels(result=ERROR, **labels)
+
+    def submit(self, data: Any, prediction: Any) -> bool:  # noqa: ANN101, ANN401
+        """Add a shadow prediction to the queue of the worker, if the prediction is sampled.
+
+        Args:
+            data: Validated input of the primary model's prediction.
+            prediction: Prediction of the primary model.
+
+        Returns:
+            True if a shadow prediction was added to the queue.
+
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        return self.worker.submit(self._execute, data, prediction)
+
+    def _execute(self, data: Any, prediction: Any) -> None:  # noqa: ANN101, ANN401
+        input_schema = self.candidate.input_schema
+        start = perf_counter()
+        try:
+            if isinstance(data, BaseModel) and type(data) is not input_schema:
+                data = input_schema.model_validate(data.model_dump())
+            shadow_prediction = self.candidate.predict(data=data)
+        except Exception:
+            self._error.inc()
+            logger.exception("Error when making a shadow prediction with model '%s' for model '%s'.",
+                             self.candidate.qualified_name, self.qualified_name)
+            return
+        self._duration.observe(perf_counter() - start)
+
+        if _equal(prediction, shadow_prediction):
+            self._agree.inc()
+        else:
+            self._disagree.inc()
+            logger.debug("Shadow prediction of model '%s' disagreed with model '%s'.",
+                         self.candidate.qualified_name, self.qualified_name)
@@ -0,0 +1,70 @@
+"""Coalescing of identical concurrent calls."""
+from typing import Any, Callable, Dict, Hashable, Tuple
+from threading import Event, Lock
+
+
+class _Call(object):
+    """A call that is in flight."""
+
+    def __init__(self) -> None:  # noqa: ANN101
+        self.event = Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """Executes only one call at a time for each key, concurrent callers with the same key share its result.
+
+    Note:
+        Nothing is retained after a call completes, a call that starts after the in-flight call with the same key
+        has finished executes the function again. This makes it safe to use with functions whose results must never
+        be stale.
+
+    """
+
+    def __init__(self) -> None:  # noqa: ANN101
+        """Initialize the SingleFlight object."""
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable, *args: Any,  # noqa: ANN101, ANN401
+           **kwargs: Any) -> Tuple[Any, bool]:
+        """Execute a function, or wait for the in-flight execution with the same key to finish.
+
+        Args:
+            key: Key that identifies identical calls.
+            function: Function to execute.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+
+        Returns:
+            Tuple with the result of the function and a flag that is True if the result was shared from a call made
+            by another caller.
+
+        Raises:
+            Exception: The exception raised by the function is raised in every caller that shares the call.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
@@ -0,0 +1,292 @@
+"""Structured logging that does not block the request path.
+
+Note:
+    The classes in this module can be referenced from the logging configuration of the service like any other logging
+    class. The service also provides a built-in configuration that uses all of them, which is selected by setting the
+    logging section of the configuration to "structured".
+
+"""
+import os
+import json
+import random
+import logging
+import logging.config
+import logging.handlers
+from typing import Any, Dict, List, Optional, Tuple
+from threading import Lock
+from time import monotonic
+from collections import OrderedDict
+from queue import Queue, Full
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from rest_model_service import metrics
+
+
+dropped_records = metrics.counter("log_records_dropped_total",
+                                  "Number of log records dropped because the queue of the background log handler was "
+                                  "full.",
+                                  ["handler"])
+
+# attributes that every log record has, the other attributes of a record were added through the "extra" parameter
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime",
+                                                                                       "taskName"}
+
+
+def _dumps(value: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, default=str)
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats log records as JSON objects, one per line.
+
+    Note:
+        The object contains the time, level, logger name and message of the record, any attributes added to the record
+        through the "extra" parameter, and the formatted traceback if the record has exception information. The orjson
+        package is used to serialize the object if it is installed.
+
+    """
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa: ANN101
+        """Format a log record as a JSON object."""
+        document = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                document[key] = value
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exception"] = record.exc_text
+        if record.stack_info:
+            document["stack_info"] = self.formatStack(record.stack_info)
+        return _dumps(document)
+
+
+class BackgroundHandler(logging.Handler):
+    """Handler that puts log records in a bounded queue, they are written by other handlers in a background thread.
+
+    Note:
+        In a logging configuration, the handlers that write the records are referenced by name, they must be defined in
+        the "handlers" section of the same configuration, which must be applied with configure_logging(). When the queue
+        is full, records are dropped instead of blocking the thread
+        that logged them, the number of dropped records is recorded in the "log_records_dropped_total" metric. The
+        background thread is started by the first record logged in each process, so a forked process gets its own
+        queue and thread.
+
+    """
+
+    def __init__(self, targets: List[logging.Handler], queue_size: int = 10000,  # noqa: ANN101
+                 respect_handler_level: bool = True) -> None:
+        """Initialize the handler.
+
+        Args:
+            targets: Handlers that write the log records.
+            queue_size: Maximum number of log records waiting in the queue.
+            respect_handler_level: Whether the level of each handler is checked before passing a record to it.
+
+        """
+        super().__init__()
+        self.targets = targets
+        self.respect_handler_level = respect_handler_level
+        self.queue_size = queue_size
+        self.queue: Optional[Queue] = None
+        self._pid: Optional[int] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._listener_lock = Lock()
+        self._dropped_records = None
+
+    def _start(self) -> None:  # noqa: ANN101
+        with self._listener_lock:
+            if self._pid == os.getpid():
+                return
+            self._dropped_records = dropped_records.labels(handler=str(self.name))
+            self.queue = Queue(maxsize=self.queue_size)
+            self._listener = logging.handlers.QueueListener(self.queue, *self.targets,
+                                                            respect_handler_level=self.respect_handler_level)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def emit(self, record: logging.LogRecord) -> None:  # noqa: ANN101
+        """Put a record in the queue, dropping it if the queue is full.
+
+        Note:
+            The message is not formatted in the calling thread, the record is passed unchanged to the handlers in the
+            background thread, so the arguments of the record must not be modified after it is logged.
+
+        """
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self._dropped_records.inc()
+
+    def close(self) -> None:  # noqa: ANN101
+        """Write the records in the queue and stop the background thread."""
+        with self._listener_lock:
+            if self._pid == os.getpid():
+                self._listener.stop()
+                self._listener = None
+                self._pid = None
+        super().close()
+
+
+class RateLimitingFilter(logging.Filter):
+    """Filter that limits the rate of identical log records.
+
+    Note:
+        Records are identical if they have the same logger, level and message template, regardless of the arguments of
+        the message. Each group of identical records gets a bucket of tokens that refills at the configured rate.
+        When the bucket is empty, records are kept with the sample probability and suppressed otherwise. The next
+        record of the group that is kept has a "suppressed" attribute with the number of records suppressed since the
+        previous one. Records below the configured level are never filtered. The buckets of the groups that logged least
+        recently are dropped when there are more than "max_groups" groups, the group then starts again with a full
+        bucket.
+
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, sample_rate: float = 0.0,  # noqa: ANN101
+                 level: str = "WARNING", max_groups: int = 1000) -> None:
+        """Initialize the filter.
+
+        Args:
+            rate: Number of identical records per second that are kept.
+            burst: Number of identical records that are kept in a burst, before the rate is applied.
+            sample_rate: Probability of keeping a record that exceeds the rate.
+            level: Minimum level of the records that are rate limited.
+            max_groups: Maximum number of groups of identical records whose buckets are kept.
+
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_rate = sample_rate
+        self.levelno = logging.getLevelName(level) if isinstance(level, str) else level
+        self._lock = Lock()
+        self.max_groups = max_groups
+        self._buckets: "OrderedDict[Tuple[str, int, Any], List[float]]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: ANN101
+        """Return True if the record should be logged."""
+        if record.levelno < self.levelno:
+            return True
+
+        key = (record.name, record.levelno, record.msg)
+        now = monotonic()
+        with self._lock:
+            # each bucket holds the number of tokens, the time of the last refill and the number of suppressed records
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+                if len(self._buckets) > self.max_groups:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+            elif self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+                bucket[2] += 1
+                return False
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed > 0:
+            record.suppressed = suppressed
+        return True
+
+
+class _LoggingConfigurator(logging.config.DictConfigurator):
+    """Logging configurator that passes the handlers named in the targets of a BackgroundHandler to it."""
+
+    def configure_handler(self, config: Dict[str, Any]) -> logging.Handler:  # noqa: ANN101
+        """Configure a handler from a dictionary, resolving the names of the targets of a BackgroundHandler."""
+        factory = config.get("class")
+        if isinstance(factory, str):
+            factory = self.resolve(factory)
+        if isinstance(factory, type) and issubclass(factory, BackgroundHandler) and "targets" in config:
+            names = list(config["targets"])
+            handlers = self.config.get("handlers", {})
+            targets = [handlers.get(name) for name in names]
+            for name, target in zip(names, targets):
+                if target is None:
+                    raise ValueError("Handler '{}' is not defined in the logging configuration.".format(name))
+                if not isinstance(target, logging.Handler):
+                    # the handlers are configured in alphabetical order, the configurator configures this handler
+                    # again after the others, like the target of a logging.handlers.MemoryHandler
+                    raise ValueError("Unable to set target handler '{}'.".format(name)) \
+                        from TypeError("target not configured yet")
+            config["targets"] = targets
+        return super().configure_handler(config)
+
+
+def configure_logging(configuration: Dict[str, Any]) -> None:
+    """Configure logging from a dictionary in the logging package's configuration dictionary schema.
+
+    Note:
+        This works like logging.config.dictConfig(), the names in the targets of each BackgroundHandler are replaced
+        with the handlers that are defined with those names in the configuration.
+
+    Args:
+        configuration: Logging configuration.
+
+    """
+    _LoggingConfigurator(configuration).configure()
+
+
+def get_structured_logging_configuration(level: str = "INFO") -> Dict[str, Any]:
+    """Return the built-in structured logging configuration.
+
+    Args:
+        level: Level of the root logger.
+
+    Returns:
+        Dictionary in the logging package's configuration dictionary schema. Records are formatted as JSON and written
+        to stdout by a background thread, identical warnings and errors are rate limited.
+
+    """
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "json": {
+                "()": "rest_model_service.structured_logging.JSONFormatter"
+            }
+        },
+        "filters": {
+            "rate_limit": {
+                "()": "rest_model_service.structured_logging.RateLimitingFilter",
+                "rate": 10.0,
+                "burst": 20,
+                "sample_rate": 0.01
+            }
+        },
+        "handlers": {
+            "stdout": {
+                "class": "logging.StreamHandler",
+                "stream": "ext://sys.stdout",
+                "formatter": "json"
+            },
+            "background": {
+                "class": "rest_model_service.structured_logging.BackgroundHandler",
+                "targets": ["stdout"],
+                "filters": ["rate_limit"]
+            }
+        },
+        "root": {
+            "level": level,
+            "handlers": ["background"]
+        }
+    }
@@ -0,0 +1,313 @@
+"""Distributed tracing of the requests handled by the service."""
+import os
+import logging
+from time import time_ns
+from threading import Lock
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from rest_model_service.background import BackgroundWorker
+
+try:
+    from opentelemetry import trace, propagate
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider, SpanProcessor, ReadableSpan
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+    from opentelemetry.sdk.trace.sampling import Sampler, SamplingResult, Decision, ParentBased, TraceIdRatioBased
+except ImportError:
+    trace = None
+    Sampler = object
+    SpanProcessor = object
+
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_provider = None
+
+
+class TailSampler(Sampler):
+    """Sampler that records the spans of the traces that the head sampler drops, so they can be sampled at the tail."""
+
+    def __init__(self, head_sampler: "Sampler") -> None:  # noqa: ANN101
+        """Initialize the sampler.
+
+        Args:
+            head_sampler: Sampler that decides which traces are sampled when they start.
+
+        """
+        self.head_sampler = head_sampler
+
+    def should_sample(self, *args: Any, **kwargs: Any) -> "SamplingResult":  # noqa: ANN101, ANN401
+        """Return the decision of the head sampler, recording the spans that it drops without sampling them."""
+        result = self.head_sampler.should_sample(*args, **kwargs)
+        if result.decision == Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, result.attributes, result.trace_state)
+        return result
+
+    def get_description(self) -> str:  # noqa: ANN101
+        """Return the description of the sampler."""
+        return "TailSampler{{{}}}".format(self.head_sampler.get_description())
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Span processor that exports the traces dropped by the head sampler if they were slow or failed.
+
+    Note:
+        The spans of a trace that was not sampled when it started are kept in memory until the span that started the
+        trace in this process ends. The trace is exported if that span took longer than the latency threshold or its
+        status is an error, and discarded otherwise. The spans of traces sampled by the head sampler are passed to the
+        next processor as they end. At most "max_traces" traces are kept in memory, the oldest trace is discarded when a
+        new trace starts and the limit is reached.
+
+    """
+
+    def __init__(self, processor: "SpanProcessor", exporter: "SpanExporter",  # noqa: ANN101
+                 latency_threshold_seconds: Optional[float] = None, sample_errors: bool = False,
+                 max_traces: int = 1000) -> None:
+        """Initialize the processor.
+
+        Args:
+            processor: Processor of the spans of the traces sampled by the head sampler.
+            exporter: Exporter of the traces sampled at the tail.
+            latency_threshold_seconds: Duration above which a trace is exported, no trace is exported for its latency
+                if None.
+            sample_errors: Whether traces that end with an error status are exported.
+            max_traces: Maximum number of traces kept in memory.
+
+        """
+        self.processor = processor
+        self.exporter = exporter
+        self.latency_threshold_ns = int(latency_threshold_seconds * 1e9) \
+            if latency_threshold_seconds is not None else None
+        self.sample_errors = sample_errors
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._lock = Lock()
+        self._worker = BackgroundWorker("tracing.tail_sampling")
+
+    def on_start(self, span: Any, parent_context: Any = None) -> None:  # noqa: ANN101, ANN401
+        """Pass the span to the next processor."""
+        self.processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: "ReadableSpan") -> None:  # noqa: ANN101
+        """Pass the span to the next processor if it is sampled, keep it until its trace ends otherwise."""
+        if span.context.trace_flags.sampled:
+            self.processor.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                if len(self._traces) >= self.max_traces:
+                    self._traces.popitem(last=False)
+                spans = self._traces[trace_id] = []
+            spans.append(span)
+            if is_local_root:
+                del self._traces[trace_id]
+
+        if is_local_root and self._should_export(span):
+            self._worker.submit(self.exporter.export, spans)
+
+    def _should_export(self, span: "ReadableSpan") -> bool:  # noqa: ANN101
+        if self.sample_errors and span.status.status_code == StatusCode.ERROR:
+            return True
+        return self.latency_threshold_ns is not None and span.end_time - span.start_time >= self.latency_threshold_ns
+
+    def shutdown(self) -> None:  # noqa: ANN101
+        """Export the traces that are waiting and shut down the next processor and the exporter."""
+        self._worker.close()
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:  # noqa: ANN101
+        """Export the traces that are waiting."""
+        self._worker.join()
+        return self.processor.force_flush(timeout_millis)
+
+
+def _create_exporter(exporter: str, endpoint: str, file_path: str) -> "SpanExporter":
+    if exporter == "file":
+        file = open(file_path, "a")
+        return ConsoleSpanExporter(out=file, formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    return OTLPSpanExporter(endpoint=endpoint)
+
+
+def configure(service_name: str, head_sample_rate: float = 1.0,
+              tail_latency_threshold_seconds: Optional[float] = None, tail_sample_errors: bool = False,
+              max_buffered_traces: int = 1000, exporter: str = "otlp",
+              endpoint: str = "http://localhost:4318/v1/traces", file_path: str = "traces.jsonl") -> None:
+    """Enable tracing in the process.
+
+    Args:
+        service_name: Name of the service in the exported spans.
+        head_sample_rate: Fraction of the traces started by the service that are sampled when they start, traces
+            started by a caller follow the caller's sampling decision.
+        tail_latency_threshold_seconds: Duration above which a trace that was not sampled when it started is exported.
+        tail_sample_errors: Whether traces that were not sampled when they started are exported if they end with an
+            error.
+        max_buffered_traces: Maximum number of traces kept in memory for tail sampling.
+        exporter: Where the spans are exported, "otlp" to send them to a collector or "file" to write them to a file.
+        endpoint: URL of the collector's OTLP/HTTP traces endpoint.
+        file_path: Path of the file that the spans are appended to, one JSON object on each line.
+
+    Raises:
+        RuntimeError: Raised if the "tracing" optional dependencies are not installed.
+
+    """
+    global _tracer, _provider
+    if trace is None:
+        logger.critical("Cannot enable tracing because optional dependency 'tracing' is not installed.")
+        raise RuntimeError("Cannot start service with tracing without optional dependencies.")
+
+    shutdown()
+    tail_sampling = tail_latency_threshold_seconds is not None or tail_sample_errors
+    sampler = ParentBased(root=TraceIdRatioBased(head_sample_rate))
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}),
+                              sampler=TailSampler(sampler) if tail_sampling else sampler)
+
+    span_exporter = _create_exporter(exporter, endpoint, file_path)
+    processor = BatchSpanProcessor(span_exporter)
+    if tail_sampling:
+        processor = TailSamplingSpanProcessor(processor, span_exporter,
+                                              latency_threshold_seconds=tail_latency_threshold_seconds,
+                                              sample_errors=tail_sample_errors,
+                                              max_traces=max_buffered_traces)
+    provider.add_span_processor(processor)
+
+    _provider = provider
+    _tracer = provider.get_tracer(__name__)
+
+
+def shutdown() -> None:
+    """Export the spans that are waiting and disable tracing in the process."""
+    global _tracer, _provider
+    provider = _provider
+    _tracer = None
+    _provider = None
+    if provider is not None:
+        provider.shutdown()
+
+
+def is_enabled() -> bool:
+    """Return True if tracing is enabled in the process."""
+    return _tracer is not None
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> ContextManager:
+    """Return a context manager that traces a block of code as a span, it does nothing if tracing is disabled."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def record_span(name: str, start_time: int, end_time: Optional[int] = None) -> None:
+    """Record a span that already happened, with times in nanoseconds since the epoch, if tracing is enabled."""
+    if _tracer is None:
+        return
+    recorded_span = _tracer.start_span(name, start_time=start_time)
+    recorded_span.end(end_time=end_time if end_time is not None else time_ns())
+
+
+def _set_route(request_span: Any, method: str, route_path: Optional[str]) -> None:  # noqa: ANN401
+    if route_path is not None:
+        request_span.update_name("{} {}".format(method, route_path))
+        request_span.set_attribute("http.route", route_path)
+
+
+def record_routing(request: Request, route_path: Optional[str] = None) -> None:
+    """Record the time from the start of a request to the start of its handler as the routing span.
+
+    Args:
+        request: Request routed to the handler.
+        route_path: Path template of the route, the span of the request is named after it. The path of the route in
+            the scope of the request is used if not provided.
+
+    """
+    if _tracer is None:
+        return
+    request_span = trace.get_current_span()
+    if route_path is None:
+        route_path = getattr(request.scope.get("route"), "path", None)
+    _set_route(request_span, request.method, route_path)
+    start_time = getattr(request_span, "start_time", None)
+    if start_time is not None:
+        record_span("routing", start_time)
+
+
+def wrap(function: Callable, name: str) -> Callable:
+    """Wrap a function so that each call is traced as a span."""
+    def traced(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        with span(name):
+            return function(*args, **kwargs)
+
+    traced.__wrapped__ = function
+    return traced
+
+
+async def run_in_threadpool(function: Callable, *args: Any) -> Any:  # noqa: ANN401
+    """Run a function in the threadpool, tracing the time it waits for a thread as the queue span."""
+    if _tracer is None:
+        return await _run_in_threadpool(function, *args)
+
+    queued_at = time_ns()
+
+    def traced_function() -> Any:  # noqa: ANN401
+        record_span("queue", queued_at)
+        return function(*args)
+
+    return await _run_in_threadpool(traced_function)
+
+
+class TracingMiddleware(object):
+    """Middleware that traces each HTTP request as a span, continuing the trace of the caller.
+
+    Note:
+        The W3C trace context of the caller is read from the "traceparent" and "tracestate" headers. The span is named
+        after the method and the route of the request once the request is routed, the prediction routes name it when
+        they start handling the request. Its status is an error if the response has a 5xx status code.
+
+    """
+
+    def __init__(self, app: ASGIApp) -> None:  # noqa: ANN101
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application wrapped by the middleware.
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ANN101
+        """Trace a request."""
+        if scope["type"] != "http" or _tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        method = scope["method"]
+        with _tracer.start_as_current_span(method, context=propagate.extract(headers), kind=SpanKind.SERVER,
+                                           attributes={"http.request.method": method,
+                                                       "url.path": scope["path"]}) as request_span:
+            status_code = 500
+
+            async def traced_send(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                _set_route(request_span, method, getattr(scope.get("route"), "path", None))
+                request_span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    request_span.set_status(Status(StatusCode.ERROR))
@@ -0,0 +1,187 @@
+"""Splitting of the traffic of a prediction endpoint across several models."""
+import zlib
+import random
+import logging
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from time import perf_counter
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse
+
+from rest_model_service.routes import PredictionController
+from rest_model_service.schemas import TrafficSplitWeights, Error
+from rest_model_service.load import LoadManager
+from rest_model_service.circuit_breaker import create_rejected_response
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+variant_duration = metrics.histogram("traffic_split_duration_seconds",
+                                     "Time taken by a variant of a traffic split to make a prediction, in seconds.",
+                                     ["split", "variant"])
+variant_predictions = metrics.counter("traffic_split_predictions_total",
+                                      "Number of predictions made by a variant of a traffic split.",
+                                      ["split", "variant", "status"])
+
+VARIANT_HEADER = "X-Model-Variant"
+
+
+class TrafficSplitController(object):
+    """Callable class that spreads the predictions of an endpoint across the controllers of several models by weight.
+
+    Note:
+        Requests with a routing key are assigned to a variant by a hash of the key, so requests with the same key go to
+        the same variant as long as the weights do not change. Requests without a routing key are assigned at random.
+        The weights can be changed while the service is running, the new weights are swapped in as a single object so
+        requests are never routed with a mix of the old and new weights. The name of the variant that made the
+        prediction is returned in the X-Model-Variant header of the response. If the circuit breaker of the chosen
+        variant is open, the request is rejected by it, it is not routed to another variant.
+
+    """
+
+    def __init__(self, qualified_name: str, variants: Dict[str, PredictionController],  # noqa: ANN101
+                 weights: Dict[str, float], sticky_header: Optional[str] = None) -> None:
+        """Initialize the controller.
+
+        Args:
+            qualified_name: Name of the traffic split, used in the path of its endpoint.
+            variants: Controllers of the models that receive the traffic, keyed by qualified name.
+            weights: Weight of each variant, keyed by qualified name.
+            sticky_header: Name of the request header that holds the routing key.
+
+        """
+        first_variant = next(iter(variants.values()))
+        self.qualified_name = qualified_name
+        self.input_schema = first_variant.input_schema
+        self.output_schema = first_variant.pipeline.output_schema
+        self.description = "Traffic split across models {}.".format(", ".join(variants))
+        self.variants = variants
+        self.sticky_header = sticky_header
+        self.codecs = first_variant.codecs
+        self.load = LoadManager().get_tracker(qualified_name, aggregate=True)
+        self.circuit_breaker = None
+        self._metrics = {
+            name: (variant_duration.labels(split=qualified_name, variant=name),
+                   variant_predictions.labels(split=qualified_name, variant=name, status="success"),
+                   variant_predictions.labels(split=qualified_name, variant=name, status="error"))
+            for name in variants
+        }
+        self._routing: Tuple[List[str], List[float], Dict[str, float]] = ([], [], {})
+        self.set_weights(weights)
+
+    def get_weights(self) -> Dict[str, float]:  # noqa: ANN101
+        """Get the weight of each variant.
+
+        Returns:
+            Dictionary of weights, keyed by the qualified names of the variants.
+
+        """
+        return dict(self._routing[2])
+
+    def set_weights(self, weights: Dict[str, float]) -> None:  # noqa: ANN101
+        """Change the weights of the variants.
+
+        Args:
+            weights: Weight of each variant, keyed by qualified name. Variants that are not in the dictionary get a
+                weight of zero.
+
+        Raises:
+            ValueError: Raised if a variant is unknown, a weight is negative, or all the weights are zero.
+
+        """
+        for name, weight in weights.items():
+            if name not in self.variants:
+                raise ValueError("Model '{}' is not a variant of traffic split '{}'.".format(name, self.qualified_name))
+            if weight < 0.0:
+                raise ValueError("Weight of model '{}' can not be negative.".format(name))
+
+        names = []
+        cumulative_weights = []
+        total = 0.0
+        for name in self.variants:
+            weight = weights.get(name, 0.0)
+            if weight > 0.0:
+                total += weight
+                names.append(name)
+                cumulative_weights.append(total)
+        if total == 0.0:
+            raise ValueError("Traffic split '{}' needs a variant with a positive weight.".format(self.qualified_name))
+
+        # replacing the routing table with a single assignment, requests being routed keep the table they read
+        self._routing = (names, cumulative_weights, {name: float(weights.get(name, 0.0)) for name in self.variants})
+        logger.info("Set weights of traffic split '%s' to %s.", self.qualified_name, self.get_weights())
+
+    def choose_variant(self, key: Optional[str] = None) -> str:  # noqa: ANN101
+        """Choose the variant that makes a prediction.
+
+        Args:
+            key: Routing key of the request, requests with the same key are assigned to the same variant.
+
+        Returns:
+            Qualified name of the variant.
+
+        """
+        names, cumulative_weights, _ = self._routing
+        if key is None:
+            point = random.random()
+        else:
+            # crc32 is stable across processes, unlike the built-in hash() of strings
+            point = zlib.crc32(key.encode()) / 4294967296.0
+        index = bisect_right(cumulative_weights, point * cumulative_weights[-1])
+        return names[min(index, len(names) - 1)]
+
+    def __call__(self, request: Request, data) -> Response:  # noqa: ANN001,ANN204,ANN101
+        """Make a prediction with one of the variants."""
+        key = request.headers.get(self.sticky_header) if self.sticky_header is not None else None
+        name = self.choose_variant(key)
+        controller = self.variants[name]
+        duration, successes, errors = self._metrics[name]
+
+        if isinstance(data, BaseModel) and type(data) is not controller.input_schema:
+            data = controller.input_schema.model_validate(data.model_dump())
+
+        start = perf_counter()
+        circuit_breaker = controller.circuit_breaker
+        trial = circuit_breaker.acquire() if circuit_breaker is not None else False
+        if trial is None:
+            response = create_rejected_response(request, circuit_breaker)
+        else:
+            request.state.circuit_breaker_trial = trial
+            # the prediction is counted in the load of the split and in the load of the variant that makes it
+            started = self.load.prediction_started()
+            controller.load.request_received()
+            try:
+                response = controller(request, data)
+            finally:
+                controller.load.request_completed()
+                self.load.prediction_completed(started)
+                if circuit_breaker is not None:
+                    circuit_breaker.release(trial)
+        duration.observe(perf_counter() - start)
+        if response.status_code < 500:
+            successes.inc()
+        else:
+            errors.inc()
+
+        response.headers[VARIANT_HEADER] = name
+        return response
+
+    async def get_weights_endpoint(self) -> JSONResponse:  # noqa: ANN101
+        """Return the weights of the variants of the traffic split."""
+        weights = TrafficSplitWeights(qualified_name=self.qualified_name, weights=self.get_weights())
+        return JSONResponse(weights.model_dump(), status_code=200)
+
+    async def set_weights_endpoint(self, weights: TrafficSplitWeights) -> JSONResponse:  # noqa: ANN101
+        """Change the weights of the variants of the traffic split."""
+        try:
+            self.set_weights(weights.weights)
+        except ValueError as e:
+            error = Error(type="ValueError", messages=[str(e)]).model_dump()
+            return JSONResponse(error, status_code=400)
+        return await self.get_weights_endpoint()
+
+    def __repr__(self) -> str:  # noqa: ANN101
+        """Return a string describing the traffic split."""
+        return "{}({}, {})".format(self.__class__.__name__, self.qualified_name, self.get_weights())
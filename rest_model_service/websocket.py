@@ -0,0 +1,173 @@
+"""WebSocket endpoint that makes predictions with any model over a single connection."""
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from ml_base.ml_model import MLModelSchemaValidationException
+
+from rest_model_service.routes import PredictionController
+from rest_model_service.schemas import Error
+from rest_model_service.content_types import to_jsonable
+from rest_model_service import metrics
+
+
+logger = logging.getLogger(__name__)
+
+websocket_connections = metrics.gauge("websocket_connections", "Number of open WebSocket connections.",
+                                      multiprocess_mode="livesum")
+websocket_messages = metrics.counter("websocket_messages_total",
+                                     "Number of prediction messages received over WebSocket connections, by model and "
+                                     "status code of the response.",
+                                     ["model", "status"])
+
+
+class WebSocketEndpoint(object):
+    """Endpoint that receives prediction requests as messages over a WebSocket connection.
+
+    Note:
+        Each request message is a JSON object with an "id" chosen by the client, the "model" qualified name, and the
+        "data" for the model. Each response message has the same "id", the "status" code, and the "result" of the
+        prediction or the "error". The predictions of a connection run concurrently in the threadpool and their
+        responses are sent as they finish, so they can be out of order. When a connection has the maximum number of
+        requests in flight, the endpoint stops reading messages from it until a response is sent, so a client that
+        sends faster than the models predict is slowed down by the flow control of the connection.
+
+    """
+
+    def __init__(self, max_in_flight: int = 32) -> None:  # noqa: ANN101
+        """Initialize the endpoint.
+
+        Args:
+            max_in_flight: Maximum number of requests of a connection that are being predicted or waiting for their
+                response to be sent.
+
+        """
+        self.max_in_flight = max_in_flight
+        self.controllers: Dict[str, PredictionController] = {}
+
+    def add_controller(self, controller: PredictionController) -> None:  # noqa: ANN101
+        """Add the controller of a model to the endpoint.
+
+        Args:
+            controller: Controller of the model.
+
+        """
+        self.controllers[controller.qualified_name] = controller
+
+    async def handle(self, websocket: WebSocket) -> None:  # noqa: ANN101
+        """Receive prediction requests from a connection and send back the predictions."""
+        await websocket.accept()
+        websocket_connections.inc()
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        send_lock = asyncio.Lock()
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                await in_flight.acquire()
+                try:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+                except BaseException:
+                    in_flight.release()
+                    raise
+                task = asyncio.get_running_loop().create_task(self._handle_message(websocket, send_lock, in_flight,
+                                                                                   message.get("text")))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # the responses of the requests in flight can not be sent after the connection is closed
+            for task in tasks:
+                task.cancel()
+            websocket_connections.dec()
+
+    async def _handle_message(self, websocket: WebSocket, send_lock: asyncio.Lock,  # noqa: ANN101
+                              in_flight: asyncio.Semaphore, text: Optional[str]) -> None:
+        message_id = None
+        qualified_name = None
+        try:
+            try:
+                if text is None:
+                    raise ValueError("Messages must be sent in text frames.")
+                message = json.loads(text)
+                if not isinstance(message, dict):
+                    raise ValueError("Message must be a JSON object.")
+                message_id = message.get("id")
+                if not isinstance(message.get("model"), str):
+                    raise ValueError("Field 'model' must be the qualified name of a model.")
+                qualified_name = message["model"]
+                controller = self.controllers.get(qualified_name)
+                if controller is None:
+                    response = self._create_error(message_id, 404, "NotFound",
+                                                  ["Model '{}' not found.".format(qualified_name)])
+                else:
+                    response = await self._predict(controller, message_id, message.get("data"))
+            except ValueError as e:
+                response = self._create_error(message_id, 400, "ValidationError", [str(e)])
+            except Exception as e:
+                logger.exception("Error when handling a WebSocket message.")
+                response = self._create_error(message_id, 500, "ServiceError", [str(e)])
+
+            # the names of models that do not exist come from the client and are not used as labels
+            model_label = qualified_name if qualified_name in self.controllers else "unknown"
+            websocket_messages.labels(model=model_label, status=str(response["status"])).inc()
+            try:
+                async with send_lock:
+                    await websocket.send_text(json.dumps(response, default=str))
+            except Exception:
+                logger.debug("Could not send the response to message %s, the connection is closed.", message_id)
+        finally:
+            in_flight.release()
+
+    async def _predict(self, controller: PredictionController, message_id: Any,  # noqa: ANN101, ANN401
+                       data: Any) -> Dict[str, Any]:  # noqa: ANN401
+        try:
+            data = controller.input_schema.model_validate(data)
+        except ValidationError as e:
+            messages = ["Field '{}' has error '{}', {}.".format(", ".join(str(location) for location in error["loc"]),
+                                                                error["type"], error["msg"])
+                        for error in e.errors(include_url=False)]
+            return self._create_error(message_id, 400, "ValidationError", messages)
+
+        circuit_breaker = controller.circuit_breaker
+        trial = circuit_breaker.acquire() if circuit_breaker is not None else False
+        if trial is None:
+            return {"id": message_id, "status": 503, "error": circuit_breaker.get_error().model_dump()}
+
+        controller.load.request_received()
+        try:
+            prediction = await run_in_threadpool(self._make_prediction, controller, data, trial)
+            return {"id": message_id, "status": 200, "result": to_jsonable(prediction)}
+        except MLModelSchemaValidationException as e:
+            logger.exception("Error when making a prediction with model '%s'.", controller.qualified_name)
+            return self._create_error(message_id, 400, "SchemaValidationError", [str(e)])
+        except Exception as e:
+            logger.exception("Error when making a prediction with model '%s'.", controller.qualified_name)
+            return self._create_error(message_id, 500, "ServiceError", [str(e)])
+        finally:
+            controller.load.request_completed()
+            if circuit_breaker is not None:
+                circuit_breaker.release(trial)
+
+    @staticmethod
+    def _make_prediction(controller: PredictionController, data: Any,  # noqa: ANN401
+                         trial: Optional[bool]) -> Any:  # noqa: ANN401
+        started = controller.load.prediction_started()
+        try:
+            prediction = controller.predict(data, trial)
+        finally:
+            controller.load.prediction_completed(started)
+        if controller.shadow is not None:
+            controller.shadow.submit(data, prediction)
+        return prediction
+
+    @staticmethod
+    def _create_error(message_id: Optional[Any], status: int, error_type: str,  # noqa: ANN401
+                      messages: list) -> Dict[str, Any]:
+        return {"id": message_id, "status": status, "error": Error(type=error_type, messages=messages).model_dump()}
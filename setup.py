@@ -22,6 +22,7 @@ setup(name="rest_model_service",
       entry_points={
           "console_scripts": [
               "generate_openapi=rest_model_service.generate_openapi:main",
+              "serve_model_service=rest_model_service.serve:main",
           ]
       },
       python_requires=">=3.7",
@@ -29,7 +30,15 @@ setup(name="rest_model_service",
       tests_require=["pytest", "pytest-html", "pylama", "coverage", "coverage-badge", "radon", "bandit", "safety",
                      "flake8-annotations"],
       extras_require={
-          "metrics":  ["prometheus-fastapi-instrumentator"]
+          "metrics":  ["prometheus-fastapi-instrumentator"],
+          "arrow": ["pyarrow"],
+          "tensor": ["numpy"],
+          "msgpack": ["msgpack"],
+          "compression": ["zstandard", "brotli"],
+          "logging": ["orjson"],
+          "websocket": ["websockets"],
+          "memory": ["psutil"],
+          "tracing": ["opentelemetry-sdk", "opentelemetry-exporter-otlp-proto-http"]
       },
       package_data={
           "rest_model_service": [
@@ -1,12 +1,14 @@
 from pydantic import BaseModel, Field, create_model
 from enum import Enum
 from uuid import UUID, uuid4
-from typing import Optional
+from typing import Optional, List
 import time
 
 from ml_base.ml_model import MLModel
 from ml_base.decorator import MLModelDecorator
 
+from rest_model_service.content_types import tensor_field
+
 
 class IrisModelInput(BaseModel):
     sepal_length: float = Field(gt=5.0, lt=8.0, description="Length of the sepal of the flower.")
@@ -91,6 +93,13 @@ class IrisModelWithConfiguration(MLModel):
         return IrisModelOutput(species="Iris setosa")
 
 
+class UnloadableIrisModel(IrisModel):
+    qualified_name = "unloadable_iris_model"
+
+    def __init__(self):
+        raise RuntimeError("Model parameters are not available.")
+
+
 # creating a mockup class to test with
 class SomeClass(object):
     pass
@@ -132,3 +141,194 @@ class PredictionIDDecorator(MLModelDecorator):
         prediction = self._model.predict(data=data)
         wrapped_prediction = self.output_schema(prediction_id=prediction_id, **prediction.model_dump())
         return wrapped_prediction
+
+
+class ColumnarIrisModel(MLModel):
+    # accessing the package metadata
+    display_name = "Columnar Iris Model"
+    qualified_name = "columnar_iris_model"
+    description = "Model for predicting the species of a flower based on its measurements, accepts Arrow tables."
+    version = "1.0.0"
+    input_schema = IrisModelInput
+    output_schema = IrisModelOutput
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        import pyarrow
+
+        if isinstance(data, pyarrow.Table):
+            return pyarrow.table({"species": [Species.iris_setosa.value] * data.num_rows})
+        return IrisModelOutput(species=Species.iris_setosa)
+
+
+class EmbeddingModelInput(BaseModel):
+    embedding: List[float] = tensor_field(dtype="float32", shape=[4], description="Embedding of an item.")
+
+
+class EmbeddingModelOutput(BaseModel):
+    norm: float = Field(description="Euclidean norm of the embedding.")
+
+
+class EmbeddingModel(MLModel):
+    # accessing the package metadata
+    display_name = "Embedding Model"
+    qualified_name = "embedding_model"
+    description = "Model that computes the norm of an embedding, accepts binary tensors."
+    version = "1.0.0"
+    input_schema = EmbeddingModelInput
+    output_schema = EmbeddingModelOutput
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        import numpy
+
+        return EmbeddingModelOutput(norm=float(numpy.linalg.norm(numpy.asarray(data.embedding))))
+
+
+class ProjectionModel(MLModel):
+    # accessing the package metadata
+    display_name = "Projection Model"
+    qualified_name = "projection_model"
+    description = "Model that projects an embedding with weights loaded from a memory-mapped artifact."
+    version = "1.0.0"
+    input_schema = EmbeddingModelInput
+    output_schema = EmbeddingModelOutput
+
+    def __init__(self, weights_path):
+        from rest_model_service.artifacts import ArtifactStore
+
+        self.weights = ArtifactStore().get_array(weights_path)
+
+    def predict(self, data):
+        import numpy
+
+        return EmbeddingModelOutput(norm=float(numpy.linalg.norm(self.weights @ numpy.asarray(data.embedding))))
+
+
+class RecordingDecorator(MLModelDecorator):
+    """Side-effect decorator that records the predictions it sees."""
+    records = []
+
+    def predict(self, data):
+        time.sleep(self._configuration.get("delay", 0.0))
+        prediction = self._model.predict(data=data)
+        RecordingDecorator.records.append((data, prediction))
+        return prediction
+
+
+class CandidateIrisModelInput(BaseModel):
+    sepal_length: float
+    sepal_width: float
+    petal_length: float
+    petal_width: float
+
+
+class CandidateIrisModel(MLModel):
+    """Candidate model that receives shadow predictions, records the inputs it sees."""
+    display_name = "Candidate Iris Model"
+    qualified_name = "candidate_iris_model"
+    description = "Candidate version of the Iris model."
+    version = "1.1.0"
+    input_schema = CandidateIrisModelInput
+    output_schema = IrisModelOutput
+    inputs = []
+
+    def __init__(self, species="Iris setosa", delay=0.0, fail=False):
+        self.species = species
+        self.delay = delay
+        self.fail = fail
+
+    def predict(self, data):
+        time.sleep(self.delay)
+        CandidateIrisModel.inputs.append(data)
+        if self.fail:
+            raise RuntimeError("Candidate model failed.")
+        return IrisModelOutput(species=self.species)
+
+
+class IrisFeatures(BaseModel):
+    sepal_area: float
+    petal_area: float
+
+
+class IrisScore(BaseModel):
+    score: float
+
+
+class IrisFeatureModel(MLModel):
+    """First step of a pipeline, computes features from the measurements of a flower."""
+    display_name = "Iris Feature Model"
+    qualified_name = "iris_feature_model"
+    description = "Computes the areas of the sepal and petal of a flower."
+    version = "1.0.0"
+    input_schema = IrisModelInput
+    output_schema = IrisFeatures
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        return IrisFeatures(sepal_area=data.sepal_length * data.sepal_width,
+                            petal_area=data.petal_length * data.petal_width)
+
+
+class IrisScoreModel(MLModel):
+    """Second step of a pipeline, scores the features of a flower."""
+    display_name = "Iris Score Model"
+    qualified_name = "iris_score_model"
+    description = "Scores the features of a flower."
+    version = "1.0.0"
+    input_schema = IrisFeatures
+    output_schema = IrisScore
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        if data.sepal_area < 0.0:
+            raise RuntimeError("Sepal area can not be negative.")
+        return IrisScore(score=data.sepal_area + data.petal_area)
+
+
+class DelayedIrisModel(IrisModel):
+    """Iris model that takes a configurable time to make a prediction, its qualified name is configurable."""
+    qualified_name = "delayed_iris_model"
+
+    def __init__(self, qualified_name="delayed_iris_model", delay=0.0):
+        self.qualified_name = qualified_name
+        self.delay = delay
+
+    def predict(self, data):
+        time.sleep(self.delay)
+        return IrisModelOutput(species=Species.iris_setosa)
+
+
+class IrisStreamingModel(IrisModel):
+    """Iris model that returns its prediction as an iterator, one species at a time."""
+    qualified_name = "iris_streaming_model"
+
+    def __init__(self, count=3, delay=0.0):
+        self.count = count
+        self.delay = delay
+
+    def predict(self, data):
+        for _ in range(self.count):
+            time.sleep(self.delay)
+            yield IrisModelOutput(species=Species.iris_setosa)
+
+
+class LargeIrisModel(IrisModel):
+    """Iris model that holds a configurable amount of memory, allocated when it is constructed and when it predicts."""
+    qualified_name = "large_iris_model"
+
+    def __init__(self, size=0):
+        self.weights = bytearray(b"\x01") * size
+        self.cache = []
+
+    def predict(self, data):
+        self.cache.append(bytearray(b"\x01") * 1024)
+        return IrisModelOutput(species=Species.iris_setosa)
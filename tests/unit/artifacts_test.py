@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+
+import unittest
+import tempfile
+import numpy
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model
+from rest_model_service.artifacts import ArtifactStore
+
+
+class ArtifactStoreTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.array_path = os.path.join(self.directory.name, "weights.npy")
+        numpy.save(self.array_path, numpy.eye(4, dtype=numpy.float32) * 2.0)
+        self.buffer_path = os.path.join(self.directory.name, "weights.bin")
+        with open(self.buffer_path, "wb") as file:
+            file.write(b"asdf" * 10)
+
+    def tearDown(self) -> None:
+        ArtifactStore.clear_instance()
+        ModelManager().clear_instance()
+        self.directory.cleanup()
+
+    def test_artifact_store_is_singleton(self):
+        # act
+        first_store = ArtifactStore()
+        second_store = ArtifactStore()
+
+        # assert
+        self.assertTrue(first_store is second_store)
+
+    def test_get_array(self):
+        # arrange
+        artifact_store = ArtifactStore()
+
+        # act
+        array = artifact_store.get_array(self.array_path)
+        same_array = artifact_store.get_array(os.path.join(self.directory.name, ".", "weights.npy"))
+
+        # assert
+        self.assertTrue(type(array) is numpy.memmap)
+        self.assertTrue(array.shape == (4, 4) and array[0, 0] == 2.0)
+        self.assertTrue(not array.flags.writeable)
+        self.assertTrue(array is same_array)
+
+        with self.assertRaises(ValueError):
+            array[0, 0] = 1.0
+
+    def test_get_buffer(self):
+        # arrange
+        artifact_store = ArtifactStore()
+
+        # act
+        buffer = artifact_store.get_buffer(self.buffer_path)
+
+        # assert
+        self.assertTrue(buffer.readonly)
+        self.assertTrue(bytes(buffer[:8]) == b"asdfasdf")
+        self.assertTrue(len(buffer) == 40)
+
+    def test_get_artifacts(self):
+        # arrange
+        artifact_store = ArtifactStore()
+        _ = artifact_store.get_array(self.array_path)
+        _ = artifact_store.get_buffer(self.buffer_path)
+
+        # act
+        artifacts = artifact_store.get_artifacts()
+
+        # assert
+        self.assertTrue([artifact["kind"] for artifact in artifacts] == ["array", "buffer"])
+        self.assertTrue(artifacts[0]["size"] == os.path.getsize(self.array_path))
+        self.assertTrue(artifacts[1]["size"] == 40)
+        self.assertTrue(all(artifact["load_seconds"] >= 0.0 for artifact in artifacts))
+
+    def test_model_with_memory_mapped_artifact(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.ProjectionModel",
+                                                           create_endpoint=True,
+                                                           configuration={"weights_path": self.array_path})])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/projection_model/prediction",
+                                   json={"embedding": [1.0, 0.0, 0.0, 0.0]})
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.json() == {"norm": 2.0})
+        self.assertTrue(ArtifactStore().get_artifacts()[0]["path"] == os.path.realpath(self.array_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
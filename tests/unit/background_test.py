@@ -0,0 +1,153 @@
+import os
+from pathlib import Path
+
+import unittest
+import time
+from threading import Event
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator
+from rest_model_service.background import BackgroundWorker, AsynchronousDecorator
+from tests.mocks import IrisModel, IrisModelInput, RecordingDecorator, PredictionIDDecorator
+
+
+class BackgroundTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        RecordingDecorator.records = []
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def test_worker_executes_submitted_calls(self):
+        # arrange
+        worker = BackgroundWorker("test")
+        calls = []
+
+        # act
+        results = [worker.submit(calls.append, i) for i in range(5)]
+        worker.join()
+
+        # assert
+        self.assertTrue(results == [True] * 5)
+        self.assertTrue(calls == [0, 1, 2, 3, 4])
+
+    def test_worker_drops_calls_when_queue_is_full(self):
+        # arrange
+        worker = BackgroundWorker("test", queue_size=1, overflow_policy="drop")
+        release = Event()
+        calls = []
+
+        # act
+        worker.submit(release.wait)
+        time.sleep(0.1)
+        first_result = worker.submit(calls.append, 1)
+        second_result = worker.submit(calls.append, 2)
+        release.set()
+        worker.join()
+
+        # assert
+        self.assertTrue(first_result is True)
+        self.assertTrue(second_result is False)
+        self.assertTrue(calls == [1])
+
+    def test_worker_blocks_when_queue_is_full(self):
+        # arrange
+        worker = BackgroundWorker("test", queue_size=1, overflow_policy="block")
+        calls = []
+
+        # act
+        worker.submit(time.sleep, 0.2)
+        results = [worker.submit(calls.append, i) for i in range(3)]
+        worker.join()
+
+        # assert
+        self.assertTrue(results == [True] * 3)
+        self.assertTrue(calls == [0, 1, 2])
+
+    def test_worker_continues_after_exception(self):
+        # arrange
+        worker = BackgroundWorker("test")
+        calls = []
+
+        # act
+        worker.submit(lambda: 1 / 0)
+        worker.submit(calls.append, 1)
+        worker.join()
+
+        # assert
+        self.assertTrue(calls == [1])
+
+    def test_worker_with_unsupported_overflow_policy(self):
+        # act, assert
+        with self.assertRaises(ValueError):
+            BackgroundWorker("test", overflow_policy="asdf")
+
+    def test_asynchronous_decorator(self):
+        # arrange
+        worker = BackgroundWorker("test")
+        model = AsynchronousDecorator(RecordingDecorator(delay=0.2), worker).set_model(IrisModel())
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        start = time.perf_counter()
+        prediction = model.predict(data)
+        elapsed = time.perf_counter() - start
+        worker.join()
+
+        # assert
+        self.assertTrue(elapsed < 0.2)
+        self.assertTrue(prediction.species == "Iris setosa")
+        self.assertTrue(RecordingDecorator.records == [(data, prediction)])
+        self.assertTrue(model.qualified_name == "iris_model")
+
+    def test_asynchronous_decorator_from_configuration(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True,
+                                                           decorators=[
+                                                               ModelDecorator(
+                                                                   class_path="tests.mocks.RecordingDecorator",
+                                                                   configuration={"delay": 0.5},
+                                                                   asynchronous=True,
+                                                                   queue_size=10
+                                                               ),
+                                                               ModelDecorator(
+                                                                   class_path="tests.mocks.PredictionIDDecorator"
+                                                               )
+                                                           ])])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+        model = ModelManager().get_model("iris_model")
+
+        # act
+        with TestClient(app) as client:
+            start = time.perf_counter()
+            response = client.post("/api/models/iris_model/prediction", json={
+                "sepal_length": 6.0,
+                "sepal_width": 5.0,
+                "petal_length": 3.0,
+                "petal_width": 2.0,
+                "prediction_id": "asdf"
+            })
+            elapsed = time.perf_counter() - start
+
+        model._model._worker.join()
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.json()["prediction_id"] == "asdf")
+        self.assertTrue(elapsed < 0.5)
+        self.assertTrue(type(model) is PredictionIDDecorator)
+        self.assertTrue(str(model) == "PredictionIDDecorator(AsynchronousDecorator(RecordingDecorator, IrisModel))")
+        self.assertTrue(len(RecordingDecorator.records) == 1)
+        self.assertTrue(RecordingDecorator.records[0][1].species == "Iris setosa")
+
+
+if __name__ == '__main__':
+    unittest.main()
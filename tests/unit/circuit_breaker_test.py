@@ -0,0 +1,268 @@
+import os
+from pathlib import Path
+
+import time
+import unittest
+from prometheus_client import REGISTRY
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, CircuitBreakerConfiguration, \
+    WebSocketConfiguration
+from rest_model_service.circuit_breaker import CircuitBreaker, CircuitBreakerManager
+from rest_model_service.schemas import CircuitState
+
+
+GOOD_INPUT = {"sepal_area": 1.0, "petal_area": 1.0}
+BAD_INPUT = {"sepal_area": -1.0, "petal_area": 1.0}
+
+
+class CircuitBreakerTests(unittest.TestCase):
+
+    def test_breaker_opens_on_error_rate(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("error_rate_model", window_size=4, minimum_requests=4,
+                                         error_rate_threshold=0.5)
+
+        # act
+        circuit_breaker.record(True, 0.01)
+        circuit_breaker.record(False, 0.01)
+        circuit_breaker.record(True, 0.01)
+        state_before_minimum = circuit_breaker.get_state()
+        circuit_breaker.record(False, 0.01)
+
+        # assert
+        self.assertTrue(state_before_minimum is CircuitState.CLOSED)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.OPEN)
+        self.assertTrue(circuit_breaker.acquire() is None)
+        self.assertTrue(REGISTRY.get_sample_value("circuit_breaker_state", {"model": "error_rate_model"}) == 2.0)
+        self.assertTrue(REGISTRY.get_sample_value("circuit_breaker_transitions_total",
+                                                  {"model": "error_rate_model", "state": "OPEN"}) == 1.0)
+        self.assertTrue(REGISTRY.get_sample_value("circuit_breaker_rejected_total",
+                                                  {"model": "error_rate_model"}) == 1.0)
+
+    def test_breaker_opens_on_slow_rate(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("slow_rate_model", window_size=2, minimum_requests=2,
+                                         latency_threshold_seconds=0.5, slow_rate_threshold=1.0)
+
+        # act
+        circuit_breaker.record(True, 0.6)
+        circuit_breaker.record(True, 0.1)
+        state_with_one_slow = circuit_breaker.get_state()
+        circuit_breaker.record(True, 0.7)
+
+        # assert
+        self.assertTrue(state_with_one_slow is CircuitState.CLOSED)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.CLOSED)
+        circuit_breaker.record(True, 0.8)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.OPEN)
+
+    def test_breaker_closes_after_successful_trials(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("half_open_model", window_size=1, minimum_requests=1, open_seconds=0.05,
+                                         half_open_requests=2)
+        circuit_breaker.record(False, 0.01)
+
+        # act
+        time.sleep(0.1)
+        first_trial = circuit_breaker.acquire()
+        second_trial = circuit_breaker.acquire()
+        rejected = circuit_breaker.acquire()
+        circuit_breaker.record(True, 0.01, first_trial)
+        circuit_breaker.release(first_trial)
+        state_after_first_trial = circuit_breaker.get_state()
+        circuit_breaker.record(True, 0.01, second_trial)
+        circuit_breaker.release(second_trial)
+
+        # assert
+        self.assertTrue(first_trial is True and second_trial is True)
+        self.assertTrue(rejected is None)
+        self.assertTrue(state_after_first_trial is CircuitState.HALF_OPEN)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.CLOSED)
+        self.assertTrue(circuit_breaker.acquire() is False)
+
+    def test_breaker_opens_again_after_failed_trial(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("failed_trial_model", window_size=1, minimum_requests=1, open_seconds=0.05)
+        circuit_breaker.record(False, 0.01)
+
+        # act
+        time.sleep(0.1)
+        trial = circuit_breaker.acquire()
+        circuit_breaker.record(False, 0.01, trial)
+        circuit_breaker.release(trial)
+
+        # assert
+        self.assertTrue(trial is True)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.OPEN)
+        self.assertTrue(circuit_breaker.acquire() is None)
+        self.assertTrue(circuit_breaker.get_retry_after() == 1)
+
+    def test_predictions_that_are_not_trials_are_ignored_when_half_open(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("late_prediction_model", window_size=1, minimum_requests=1,
+                                         open_seconds=0.05)
+        admitted = circuit_breaker.acquire()
+        circuit_breaker.record(False, 0.01)
+        time.sleep(0.1)
+
+        # act
+        trial = circuit_breaker.acquire()
+        circuit_breaker.record(True, 0.01, admitted)
+        circuit_breaker.release(admitted)
+        state_after_late_prediction = circuit_breaker.get_state()
+        circuit_breaker.record(True, 0.01, trial)
+        circuit_breaker.release(trial)
+
+        # assert
+        self.assertTrue(admitted is False and trial is True)
+        self.assertTrue(state_after_late_prediction is CircuitState.HALF_OPEN)
+        self.assertTrue(circuit_breaker.get_state() is CircuitState.CLOSED)
+
+    def test_trial_released_without_prediction(self):
+        # arrange
+        circuit_breaker = CircuitBreaker("released_trial_model", window_size=1, minimum_requests=1,
+                                         open_seconds=0.05)
+        circuit_breaker.record(False, 0.01)
+        time.sleep(0.1)
+
+        # act
+        trial = circuit_breaker.acquire()
+        rejected = circuit_breaker.acquire()
+        circuit_breaker.release(trial)
+        next_trial = circuit_breaker.acquire()
+
+        # assert
+        self.assertTrue(rejected is None)
+        self.assertTrue(next_trial is True)
+
+
+class CircuitBreakerEndpointTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        CircuitBreakerManager.clear_instance()
+
+    def tearDown(self) -> None:
+        CircuitBreakerManager.clear_instance()
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self, prediction_dispatcher=False, websocket=None, open_seconds=60.0):
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisScoreModel", create_endpoint=True,
+                  circuit_breaker=CircuitBreakerConfiguration(window_size=2, minimum_requests=2,
+                                                              open_seconds=open_seconds)),
+            Model(class_path="tests.mocks.IrisModel", create_endpoint=True)
+        ], prediction_dispatcher=prediction_dispatcher, websocket=websocket)
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def test_open_breaker_rejects_predictions(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            failed_responses = [client.post("/api/models/iris_score_model/prediction", json=BAD_INPUT)
+                                for _ in range(2)]
+            rejected_response = client.post("/api/models/iris_score_model/prediction", json=GOOD_INPUT)
+
+        # assert
+        self.assertTrue(all(response.status_code == 500 for response in failed_responses))
+        self.assertTrue(rejected_response.status_code == 503)
+        self.assertTrue(rejected_response.json()["type"] == "ServiceUnavailable")
+        self.assertTrue(0 < int(rejected_response.headers["Retry-After"]) <= 60)
+        self.assertTrue(CircuitBreakerManager().get_circuit_breaker("iris_score_model").state is CircuitState.OPEN)
+
+    def test_open_breaker_rejects_predictions_with_dispatcher(self):
+        # arrange
+        app = self.create_app(prediction_dispatcher=True)
+
+        # act
+        with TestClient(app) as client:
+            for _ in range(2):
+                client.post("/api/models/iris_score_model/prediction", json=BAD_INPUT)
+            rejected_response = client.post("/api/models/iris_score_model/prediction", json=GOOD_INPUT)
+            openapi_document = client.get("/openapi.json").json()
+
+        # assert
+        self.assertTrue(rejected_response.status_code == 503)
+        responses = openapi_document["paths"]["/api/models/iris_score_model/prediction"]["post"]["responses"]
+        self.assertTrue("503" in responses)
+        responses = openapi_document["paths"]["/api/models/iris_model/prediction"]["post"]["responses"]
+        self.assertTrue("503" not in responses)
+
+    def test_open_breaker_rejects_websocket_predictions(self):
+        # arrange
+        app = self.create_app(websocket=WebSocketConfiguration(enabled=True))
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                statuses = []
+                for message_id in range(3):
+                    websocket.send_json({"id": message_id, "model": "iris_score_model",
+                                         "data": BAD_INPUT if message_id < 2 else GOOD_INPUT})
+                    statuses.append(websocket.receive_json()["status"])
+
+        # assert
+        self.assertTrue(statuses == [500, 500, 503])
+
+    def test_successful_trial_closes_breaker(self):
+        # arrange
+        options = [{}, {"prediction_dispatcher": True}, {"websocket": WebSocketConfiguration(enabled=True)}]
+
+        for index, app_options in enumerate(options):
+            ModelManager().clear_instance()
+            app = self.create_app(open_seconds=0.05, **app_options)
+
+            # act
+            with TestClient(app) as client:
+                for _ in range(2):
+                    client.post("/api/models/iris_score_model/prediction", json=BAD_INPUT)
+                time.sleep(0.1)
+                if index < 2:
+                    status = client.post("/api/models/iris_score_model/prediction", json=GOOD_INPUT).status_code
+                else:
+                    with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                        websocket.send_json({"id": 1, "model": "iris_score_model", "data": GOOD_INPUT})
+                        status = websocket.receive_json()["status"]
+
+            # assert
+            circuit_breaker = CircuitBreakerManager().get_circuit_breaker("iris_score_model")
+            self.assertTrue(status == 200, index)
+            self.assertTrue(circuit_breaker.get_state() is CircuitState.CLOSED, index)
+
+    def test_model_readiness(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            ready_response = client.get("/api/models/iris_score_model/ready")
+            for _ in range(2):
+                client.post("/api/models/iris_score_model/prediction", json=BAD_INPUT)
+            not_ready_response = client.get("/api/models/iris_score_model/ready")
+            other_model_response = client.get("/api/models/iris_model/ready")
+            service_response = client.get("/api/health/ready")
+            unknown_model_response = client.get("/api/models/unknown_model/ready")
+
+        # assert
+        self.assertTrue(ready_response.status_code == 200)
+        self.assertTrue(ready_response.json() == {"qualified_name": "iris_score_model",
+                                                  "readiness_status": "ACCEPTING_TRAFFIC",
+                                                  "circuit_state": "CLOSED"})
+        self.assertTrue(not_ready_response.status_code == 503)
+        self.assertTrue(not_ready_response.json()["readiness_status"] == "REFUSING_TRAFFIC")
+        self.assertTrue(not_ready_response.json()["circuit_state"] == "OPEN")
+        self.assertTrue(other_model_response.status_code == 200)
+        self.assertTrue(other_model_response.json()["circuit_state"] is None)
+        self.assertTrue(service_response.status_code == 200)
+        self.assertTrue(unknown_model_response.status_code == 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+import unittest
+import io
+import numpy
+import pyarrow
+import msgpack
+from fastapi.exceptions import RequestValidationError
+from starlette.requests import Request
+
+from rest_model_service.content_types import parse_media_type, negotiate_media_type, check_table_schema, \
+    ArrowStreamCodec, ParquetCodec, NumpyCodec, MessagePackCodec, to_jsonable, get_tensor_field, get_codecs, \
+    create_response, JSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE, NPY_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from tests.mocks import IrisModelInput, IrisModelOutput, Species, EmbeddingModelInput, EmbeddingModelOutput
+
+
+def to_npy(array):
+    stream = io.BytesIO()
+    numpy.save(stream, array)
+    return stream.getvalue()
+
+
+def create_request(headers):
+    return Request({"type": "http", "headers": [(key.lower().encode(), value.encode())
+                                                for key, value in headers.items()]})
+
+
+class ContentTypesTests(unittest.TestCase):
+
+    def test_parse_media_type(self):
+        # arrange, act, assert
+        self.assertTrue(parse_media_type(None) is None)
+        self.assertTrue(parse_media_type("") is None)
+        self.assertTrue(parse_media_type("application/json") == "application/json")
+        self.assertTrue(parse_media_type("Application/JSON; charset=utf-8") == "application/json")
+        self.assertTrue(parse_media_type("application/x-msgpack") == "application/msgpack")
+
+    def test_negotiate_media_type(self):
+        # arrange
+        available = [JSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE]
+
+        # act, assert
+        self.assertTrue(negotiate_media_type(None, available, JSON_MEDIA_TYPE) == JSON_MEDIA_TYPE)
+        self.assertTrue(negotiate_media_type("*/*", available, ARROW_STREAM_MEDIA_TYPE) == ARROW_STREAM_MEDIA_TYPE)
+        self.assertTrue(negotiate_media_type("application/vnd.apache.parquet", available, JSON_MEDIA_TYPE) ==
+                        PARQUET_MEDIA_TYPE)
+        self.assertTrue(negotiate_media_type("application/json;q=0.5, application/vnd.apache.arrow.stream",
+                                             available, JSON_MEDIA_TYPE) == ARROW_STREAM_MEDIA_TYPE)
+        self.assertTrue(negotiate_media_type("text/csv", available, JSON_MEDIA_TYPE) is None)
+
+    def test_check_table_schema_with_valid_table(self):
+        # arrange
+        table = pyarrow.table({
+            "sepal_length": [6.0, 7.0],
+            "sepal_width": [5.0, 3.0],
+            "petal_length": [3, 2],
+            "petal_width": [2.0, 1.0]
+        })
+
+        # act
+        check_table_schema(table, IrisModelInput)
+
+    def test_check_table_schema_with_invalid_table(self):
+        # arrange
+        table = pyarrow.table({
+            "sepal_length": [9.0, 7.0],
+            "sepal_width": ["a", "b"],
+            "petal_length": [3.0, None]
+        })
+
+        # act
+        with self.assertRaises(RequestValidationError) as context:
+            check_table_schema(table, IrisModelInput)
+
+        # assert
+        errors = {error["loc"][1]: error["type"] for error in context.exception.errors()}
+        self.assertTrue(errors == {
+            "sepal_length": "less_than",
+            "sepal_width": "column_type",
+            "petal_length": "null_values",
+            "petal_width": "missing"
+        })
+
+    def test_check_table_schema_with_enum_column(self):
+        # arrange
+        valid_table = pyarrow.table({"species": ["Iris setosa", "Iris virginica"]})
+        invalid_table = pyarrow.table({"species": ["Iris setosa", "Rose"]})
+
+        # act
+        check_table_schema(valid_table, IrisModelOutput)
+        with self.assertRaises(RequestValidationError) as context:
+            check_table_schema(invalid_table, IrisModelOutput)
+
+        # assert
+        self.assertTrue(context.exception.errors()[0]["type"] == "enum")
+
+    def test_arrow_stream_codec_round_trip(self):
+        # arrange
+        codec = ArrowStreamCodec()
+        predictions = [IrisModelOutput(species=Species.iris_setosa), IrisModelOutput(species=Species.iris_virginica)]
+
+        # act
+        body = codec.encode(predictions)
+        table = codec.decode(body, IrisModelOutput)
+
+        # assert
+        self.assertTrue(table.to_pylist() == [{"species": "Iris setosa"}, {"species": "Iris virginica"}])
+
+    def test_parquet_codec_round_trip(self):
+        # arrange
+        codec = ParquetCodec()
+        table = pyarrow.table({"species": ["Iris setosa"]})
+
+        # act
+        body = codec.encode(table)
+        decoded_table = codec.decode(body, IrisModelOutput)
+
+        # assert
+        self.assertTrue(decoded_table.equals(table))
+
+    def test_arrow_stream_codec_with_invalid_body(self):
+        # arrange
+        codec = ArrowStreamCodec()
+
+        # act, assert
+        with self.assertRaises(RequestValidationError):
+            codec.decode(b"not an arrow stream", IrisModelInput)
+
+    def test_to_jsonable(self):
+        # arrange, act, assert
+        self.assertTrue(to_jsonable(IrisModelOutput(species=Species.iris_setosa)) == {"species": "Iris setosa"})
+        self.assertTrue(to_jsonable(pyarrow.table({"species": ["Iris setosa"]})) == [{"species": "Iris setosa"}])
+
+    def test_get_tensor_field(self):
+        # arrange, act
+        tensor_field = get_tensor_field(EmbeddingModelInput)
+        no_tensor_field = get_tensor_field(IrisModelInput)
+
+        # assert
+        self.assertTrue(tensor_field == ("embedding", {"dtype": "float32", "shape": [4]}))
+        self.assertTrue(no_tensor_field is None)
+        self.assertTrue(EmbeddingModelInput.model_json_schema()["properties"]["embedding"]["x-tensor"] ==
+                        {"dtype": "float32", "shape": [4]})
+
+    def test_get_codecs_for_tensor_schema(self):
+        # arrange, act
+        codecs = get_codecs(EmbeddingModelInput, EmbeddingModelOutput)
+
+        # assert
+        self.assertTrue(list(codecs.keys()) == [MSGPACK_MEDIA_TYPE, NPY_MEDIA_TYPE])
+        self.assertFalse(codecs[NPY_MEDIA_TYPE].can_encode)
+
+    def test_numpy_codec_decodes_without_copying(self):
+        # arrange
+        codec = NumpyCodec(get_tensor_field(EmbeddingModelInput))
+        body = to_npy(numpy.array([1.0, 2.0, 3.0, 4.0], dtype="float32"))
+
+        # act
+        data = codec.decode(body, EmbeddingModelInput)
+
+        # assert
+        self.assertTrue(type(data) is EmbeddingModelInput)
+        self.assertTrue(data.embedding.tolist() == [1.0, 2.0, 3.0, 4.0])
+        self.assertFalse(data.embedding.flags.owndata)
+        self.assertFalse(data.embedding.flags.writeable)
+
+    def test_numpy_codec_with_wrong_dtype_and_shape(self):
+        # arrange
+        codec = NumpyCodec(get_tensor_field(EmbeddingModelInput))
+        body = to_npy(numpy.zeros((2, 3), dtype="float64"))
+
+        # act
+        with self.assertRaises(RequestValidationError) as context:
+            codec.decode(body, EmbeddingModelInput)
+
+        # assert
+        self.assertTrue([error["type"] for error in context.exception.errors()] == ["tensor_dtype", "tensor_shape"])
+
+    def test_numpy_codec_with_invalid_body(self):
+        # arrange
+        codec = NumpyCodec(get_tensor_field(EmbeddingModelInput))
+
+        # act, assert
+        with self.assertRaises(RequestValidationError):
+            codec.decode(b"not an array", EmbeddingModelInput)
+
+        with self.assertRaises(RequestValidationError):
+            codec.decode(to_npy(numpy.zeros(4, dtype="float32"))[:-4], EmbeddingModelInput)
+
+    def test_numpy_codec_encodes_output_tensor_field(self):
+        # arrange
+        codec = NumpyCodec(get_tensor_field(EmbeddingModelInput), get_tensor_field(EmbeddingModelInput))
+        prediction = EmbeddingModelInput(embedding=[1.0, 2.0, 3.0, 4.0])
+
+        # act
+        body = codec.encode(prediction)
+
+        # assert
+        self.assertTrue(numpy.load(io.BytesIO(body)).tolist() == [1.0, 2.0, 3.0, 4.0])
+
+    def test_message_pack_codec_round_trip(self):
+        # arrange
+        codec = MessagePackCodec()
+        data = {"sepal_length": 6.0, "sepal_width": 5.0, "petal_length": 3.0, "petal_width": 2.0}
+
+        # act
+        decoded_data = codec.decode(codec.encode(data), IrisModelInput)
+        body = codec.encode(IrisModelOutput(species=Species.iris_setosa))
+
+        # assert
+        self.assertTrue(type(decoded_data) is IrisModelInput)
+        self.assertTrue(decoded_data.model_dump() == data)
+        self.assertTrue(msgpack.unpackb(body) == {"species": "Iris setosa"})
+
+    def test_message_pack_codec_with_bad_data(self):
+        # arrange
+        codec = MessagePackCodec()
+
+        # act
+        with self.assertRaises(RequestValidationError) as context:
+            codec.decode(msgpack.packb({"sepal_length": 16.0}), IrisModelInput)
+
+        # assert
+        self.assertTrue(context.exception.errors()[0]["loc"] == ("body", "sepal_length"))
+        self.assertTrue(len(context.exception.errors()) == 4)
+
+        # act, assert
+        with self.assertRaises(RequestValidationError):
+            codec.decode(b"\xc1", IrisModelInput)
+
+    def test_create_response(self):
+        # arrange
+        content = {"species": "Iris setosa"}
+
+        # act
+        json_response = create_response(create_request({}), 200, content)
+        msgpack_response = create_response(create_request({"Accept": "application/msgpack"}), 200, content)
+        same_as_request_response = create_response(create_request({"Content-Type": "application/msgpack"}), 400,
+                                                   content)
+
+        # assert
+        self.assertTrue(json_response.media_type == JSON_MEDIA_TYPE)
+        self.assertTrue(msgpack_response.media_type == MSGPACK_MEDIA_TYPE)
+        self.assertTrue(msgpack.unpackb(msgpack_response.body) == content)
+        self.assertTrue(same_as_request_response.media_type == MSGPACK_MEDIA_TYPE)
+        self.assertTrue(same_as_request_response.status_code == 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
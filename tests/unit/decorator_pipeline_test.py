@@ -0,0 +1,150 @@
+import unittest
+import time
+
+from prometheus_client import REGISTRY
+from ml_base.decorator import MLModelDecorator
+
+from rest_model_service.decorator_pipeline import DecoratorPipeline
+from tests.mocks import IrisModel, IrisModelInput, PredictionIDDecorator
+
+
+class SlowDecorator(MLModelDecorator):
+
+    def predict(self, data):
+        time.sleep(0.05)
+        return self._model.predict(data=data)
+
+
+class BusyDecorator(MLModelDecorator):
+
+    def predict(self, data):
+        start = time.thread_time()
+        while time.thread_time() - start < 0.05:
+            pass
+        return self._model.predict(data=data)
+
+
+def get_prediction_cpu(suffix):
+    value = REGISTRY.get_sample_value("model_prediction_cpu_seconds_{}".format(suffix),
+                                      {"model": "iris_model", "version": "1.0.0"})
+    return value if value is not None else 0.0
+
+
+class DecoratorPipelineTests(unittest.TestCase):
+
+    def test_pipeline_resolves_properties_of_decorated_model(self):
+        # arrange
+        model = PredictionIDDecorator().set_model(IrisModel())
+
+        # act
+        pipeline = DecoratorPipeline(model)
+
+        # assert
+        self.assertTrue(pipeline.qualified_name == "iris_model")
+        self.assertTrue("prediction_id" in pipeline.input_schema.model_fields)
+        self.assertTrue("prediction_id" in pipeline.output_schema.model_fields)
+        self.assertTrue(pipeline.description.endswith("returned in a field called 'prediction_id' in the model "
+                                                      "output."))
+        self.assertTrue([type(layer) for layer in pipeline.layers] == [PredictionIDDecorator, IrisModel])
+        self.assertTrue(pipeline.get_profile() == [])
+
+    def test_pipeline_skips_decorators_that_forward_predict(self):
+        # arrange
+        model = MLModelDecorator().set_model(PredictionIDDecorator().set_model(
+            MLModelDecorator().set_model(MLModelDecorator().set_model(IrisModel()))))
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        pipeline = DecoratorPipeline(model)
+        prediction = pipeline.predict(data)
+
+        # assert
+        composed_decorator = pipeline._predict.__self__
+        self.assertTrue(type(composed_decorator) is PredictionIDDecorator)
+        self.assertTrue(composed_decorator.__dict__["_model"].predict == pipeline.layers[4].predict)
+        self.assertTrue(prediction.species == "Iris setosa" and prediction.prediction_id is not None)
+
+    def test_pipeline_does_not_change_the_decorated_model(self):
+        # arrange
+        model = PredictionIDDecorator().set_model(MLModelDecorator().set_model(IrisModel()))
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        first_pipeline = DecoratorPipeline(model, profile=True)
+        second_pipeline = DecoratorPipeline(model, profile=True)
+        _ = first_pipeline.predict(data)
+        _ = model.predict(data)
+
+        # assert
+        self.assertTrue(all("predict" not in layer.__dict__ for layer in first_pipeline.layers))
+        self.assertTrue(model.__dict__["_model"].__dict__["_model"] is first_pipeline.layers[2])
+        self.assertTrue([layer["calls"] for layer in first_pipeline.get_profile()] == [1, 1, 1])
+        self.assertTrue([layer["calls"] for layer in second_pipeline.get_profile()] == [0, 0, 0])
+
+    def test_pipeline_records_profile_of_each_layer(self):
+        # arrange
+        model = PredictionIDDecorator().set_model(SlowDecorator().set_model(IrisModel()))
+        pipeline = DecoratorPipeline(model, profile=True)
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        prediction = pipeline.predict(data)
+        _ = pipeline.predict(data)
+        profile = pipeline.get_profile()
+
+        # assert
+        self.assertTrue(prediction.species == "Iris setosa")
+        self.assertTrue([layer["name"] for layer in profile] == ["PredictionIDDecorator", "SlowDecorator",
+                                                                 "IrisModel"])
+        self.assertTrue(all(layer["calls"] == 2 for layer in profile))
+        self.assertTrue(profile[1]["self_seconds"] >= 0.1)
+        self.assertTrue(profile[0]["self_seconds"] < profile[0]["total_seconds"])
+        self.assertTrue(profile[0]["total_seconds"] >= profile[1]["total_seconds"] >= profile[2]["total_seconds"])
+
+    def test_pipeline_records_cpu_time_of_each_layer(self):
+        # arrange
+        model = BusyDecorator().set_model(SlowDecorator().set_model(IrisModel()))
+        pipeline = DecoratorPipeline(model, profile=True)
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        _ = pipeline.predict(data)
+        profile = pipeline.get_profile()
+
+        # assert
+        self.assertTrue(profile[0]["self_cpu_seconds"] >= 0.05)
+        self.assertTrue(profile[1]["self_cpu_seconds"] < 0.025)
+        self.assertTrue(profile[1]["self_seconds"] >= 0.05)
+        self.assertTrue(profile[0]["cpu_seconds"] >= profile[1]["cpu_seconds"] >= profile[2]["cpu_seconds"])
+
+    def test_pipeline_records_cpu_time_of_predictions(self):
+        # arrange
+        pipeline = DecoratorPipeline(BusyDecorator().set_model(IrisModel()))
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+        count_before = get_prediction_cpu("count")
+        sum_before = get_prediction_cpu("sum")
+
+        # act
+        _ = pipeline.predict(data)
+
+        # assert
+        self.assertTrue(get_prediction_cpu("count") - count_before == 1.0)
+        self.assertTrue(get_prediction_cpu("sum") - sum_before >= 0.05)
+
+    def test_pipeline_records_errors(self):
+        # arrange
+        model = IrisModel()
+        model.predict = lambda data: 1 / 0
+        pipeline = DecoratorPipeline(model, profile=True)
+
+        # act
+        with self.assertRaises(ZeroDivisionError):
+            pipeline.predict(None)
+
+        # assert
+        self.assertTrue(pipeline.get_profile()[0]["calls"] == 1)
+        self.assertTrue(pipeline.get_profile()[0]["errors"] == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+from pathlib import Path
+
+import unittest
+import sys
+import tempfile
+import yaml
+from unittest.mock import patch
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app, get_configuration_hash, load_openapi_document
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator
+from rest_model_service.generate_openapi import main
+
+
+class GenerateOpenAPITests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.configuration_file = os.path.join(self.directory.name, "rest_config.yaml")
+        self.output_file = os.path.join(self.directory.name, "openapi.yaml")
+        self.configuration_dict = {
+            "service_title": "REST Model Service",
+            "models": [{
+                "class_path": "tests.mocks.IrisModel",
+                "create_endpoint": True,
+                "decorators": [{"class_path": "tests.mocks.PredictionIDDecorator"}]
+            }]
+        }
+        with open(self.configuration_file, "w") as file:
+            yaml.dump(self.configuration_dict, file)
+
+    def tearDown(self) -> None:
+        ModelManager().clear_instance()
+        self.directory.cleanup()
+
+    def run_main(self, *args):
+        with patch.object(sys, "argv", ["generate_openapi", "--configuration_file", self.configuration_file,
+                                        "--output_file", self.output_file, *args]):
+            with self.assertRaises(SystemExit) as context:
+                main()
+        ModelManager().clear_instance()
+        return context.exception.code
+
+    def test_schema_only_document_is_same_as_document(self):
+        # arrange
+        configuration = ServiceConfiguration(**self.configuration_dict)
+
+        # act
+        document = create_app(configuration, wait_for_model_creation=True).openapi()
+        ModelManager().clear_instance()
+        schema_only_document = create_app(configuration, wait_for_model_creation=True, schema_only=True).openapi()
+
+        # assert
+        self.assertTrue(document == schema_only_document)
+        self.assertTrue("/api/models/iris_model/prediction" in document["paths"])
+
+    def test_schema_only_does_not_initialize_models(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.UnloadableIrisModel", create_endpoint=True,
+                  decorators=[ModelDecorator(class_path="tests.mocks.PredictionIDDecorator",
+                                             configuration={"asdf": "asdf"})])
+        ])
+
+        # act
+        document = create_app(configuration, wait_for_model_creation=True, schema_only=True).openapi()
+
+        # assert
+        self.assertTrue("/api/models/unloadable_iris_model/prediction" in document["paths"])
+        self.assertTrue("prediction_id" in document["components"]["schemas"]["IrisModelInput"]["properties"])
+
+        with self.assertRaises(RuntimeError):
+            ModelManager().clear_instance()
+            create_app(configuration, wait_for_model_creation=True)
+
+    def test_generate_openapi_with_configuration_hash(self):
+        # act
+        exit_code = self.run_main("--schema_only")
+
+        with open(self.output_file) as file:
+            document = yaml.safe_load(file)
+
+        # assert
+        self.assertTrue(exit_code == os.EX_OK)
+        self.assertTrue(document["info"]["x-configuration-hash"] ==
+                        get_configuration_hash(ServiceConfiguration(**self.configuration_dict)))
+        self.assertTrue("/api/models/iris_model/prediction" in document["paths"])
+
+    def test_service_returns_generated_document(self):
+        # arrange
+        _ = self.run_main("--schema_only")
+        with open(self.output_file) as file:
+            document = yaml.safe_load(file)
+        document["info"]["description"] = "Generated ahead of time."
+        with open(self.output_file, "w") as file:
+            yaml.dump(document, file)
+
+        configuration = ServiceConfiguration(**self.configuration_dict, openapi_file=self.output_file)
+        changed_configuration = ServiceConfiguration(**{**self.configuration_dict, "version": "2.0.0"},
+                                                     openapi_file=self.output_file)
+
+        # act
+        with TestClient(create_app(configuration, wait_for_model_creation=True)) as client:
+            response = client.get("/openapi.json")
+        ModelManager().clear_instance()
+        with TestClient(create_app(changed_configuration, wait_for_model_creation=True)) as client:
+            changed_response = client.get("/openapi.json")
+
+        # assert
+        self.assertTrue(response.json()["info"]["description"] == "Generated ahead of time.")
+        self.assertTrue(changed_response.json()["info"].get("description") != "Generated ahead of time.")
+        self.assertTrue(changed_response.json()["info"]["version"] == "2.0.0")
+
+    def test_invalid_document_is_generated(self):
+        # arrange
+        configuration = ServiceConfiguration(**self.configuration_dict, openapi_file=self.output_file)
+        documents = []
+
+        # act
+        for content in ["", "- paths\n", "info: version\n", "info: [\n"]:
+            with open(self.output_file, "w") as file:
+                file.write(content)
+            documents.append(load_openapi_document(self.output_file, configuration))
+
+        with TestClient(create_app(configuration, wait_for_model_creation=True)) as client:
+            response = client.get("/openapi.json")
+
+        # assert
+        self.assertTrue(documents == [None, None, None, None])
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue("/api/models/iris_model/prediction" in response.json()["paths"])
+
+
+if __name__ == '__main__':
+    unittest.main()
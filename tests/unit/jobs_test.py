@@ -0,0 +1,355 @@
+import os
+from pathlib import Path
+
+import json
+import time
+import unittest
+from threading import Event
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, JobsConfiguration, \
+    CircuitBreakerConfiguration
+from rest_model_service.routes import PredictionController
+from rest_model_service.jobs import JobManager
+from rest_model_service.schemas import JobStatus, CircuitState
+from rest_model_service.circuit_breaker import CircuitBreaker, CircuitBreakerManager
+from tests.mocks import IrisModel, IrisModelInput, IrisScoreModel, IrisFeatures, IrisStreamingModel
+
+
+IRIS_INPUT = {
+    "sepal_length": 6.0,
+    "sepal_width": 5.0,
+    "petal_length": 3.0,
+    "petal_width": 2.0
+}
+
+
+def wait_for_job(job_manager, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_manager.get_job(job_id)
+        if job is None or job.finished:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError()
+
+
+class BlockingIrisModel(IrisModel):
+    release = Event()
+
+    def predict(self, data):
+        BlockingIrisModel.release.wait()
+        return super().predict(data)
+
+
+class JobManagerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = IrisModelInput(**IRIS_INPUT)
+        BlockingIrisModel.release = Event()
+
+    def tearDown(self) -> None:
+        BlockingIrisModel.release.set()
+
+    def test_submit_job(self):
+        # arrange
+        job_manager = JobManager(workers=1)
+        controller = PredictionController(IrisModel())
+
+        # act
+        job = job_manager.submit(controller, self.data)
+        job = wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job.status == JobStatus.SUCCEEDED)
+        self.assertTrue(json.loads(job.chunks[0]) == {"species": "Iris setosa"})
+        self.assertTrue(job.started_at is not None and job.finished_at >= job.started_at)
+        self.assertTrue(job.data is None)
+
+    def test_submit_job_when_queue_is_full(self):
+        # arrange
+        job_manager = JobManager(queue_size=1, workers=1)
+        controller = PredictionController(BlockingIrisModel())
+
+        # act
+        first_job = job_manager.submit(controller, self.data)
+        time.sleep(0.1)
+        second_job = job_manager.submit(controller, self.data)
+        third_job = job_manager.submit(controller, self.data)
+        BlockingIrisModel.release.set()
+        wait_for_job(job_manager, second_job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(first_job is not None and second_job is not None)
+        self.assertTrue(third_job is None)
+        self.assertTrue(first_job.status == JobStatus.SUCCEEDED and second_job.status == JobStatus.SUCCEEDED)
+
+    def test_cancel_queued_job(self):
+        # arrange
+        job_manager = JobManager(workers=1)
+        controller = PredictionController(BlockingIrisModel())
+        first_job = job_manager.submit(controller, self.data)
+        second_job = job_manager.submit(controller, self.data)
+
+        # act
+        job_manager.cancel(second_job.job_id)
+        BlockingIrisModel.release.set()
+        wait_for_job(job_manager, first_job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(first_job.status == JobStatus.SUCCEEDED)
+        self.assertTrue(second_job.status == JobStatus.CANCELLED and second_job.started_at is None)
+
+    def test_job_with_exception(self):
+        # arrange
+        job_manager = JobManager(workers=1)
+        controller = PredictionController(IrisScoreModel())
+
+        # act
+        job = job_manager.submit(controller, IrisFeatures(sepal_area=-1.0, petal_area=1.0))
+        job = wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job.status == JobStatus.FAILED)
+        self.assertTrue(job.error.type == "ServiceError")
+
+    def test_results_expire(self):
+        # arrange
+        job_manager = JobManager(workers=1, result_ttl_seconds=0.1)
+        controller = PredictionController(IrisModel())
+        job = job_manager.submit(controller, self.data)
+        wait_for_job(job_manager, job.job_id)
+
+        # act
+        job_before = job_manager.get_job(job.job_id)
+        time.sleep(0.2)
+        job_after = job_manager.get_job(job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job_before is job)
+        self.assertTrue(job_after is None)
+
+    def test_results_are_removed_when_memory_limit_is_reached(self):
+        # arrange
+        job_manager = JobManager(workers=1, max_result_bytes=50)
+        controller = PredictionController(IrisModel())
+
+        # act
+        first_job = job_manager.submit(controller, self.data)
+        wait_for_job(job_manager, first_job.job_id)
+        second_job = job_manager.submit(controller, self.data)
+        wait_for_job(job_manager, second_job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job_manager.get_job(first_job.job_id) is None)
+        self.assertTrue(job_manager.get_job(second_job.job_id) is second_job)
+        self.assertTrue(job_manager._result_bytes == second_job.size)
+
+    def test_result_larger_than_memory_limit(self):
+        # arrange
+        job_manager = JobManager(workers=1, max_result_bytes=10)
+        controller = PredictionController(IrisModel())
+
+        # act
+        job = job_manager.submit(controller, self.data)
+        job = wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job.status == JobStatus.FAILED)
+        self.assertTrue(job_manager._result_bytes == 0)
+
+    def test_streamed_result_larger_than_memory_limit(self):
+        # arrange
+        job_manager = JobManager(workers=1, max_result_bytes=100)
+        controller = PredictionController(IrisStreamingModel(count=50))
+
+        # act
+        job = job_manager.submit(controller, self.data)
+        job = wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job is not None)
+        self.assertTrue(job.status == JobStatus.FAILED)
+        self.assertTrue(job.error.type == "ResultTooLarge")
+        self.assertTrue(job.size == 0 and job_manager._result_bytes == 0)
+
+    def test_results_of_running_jobs_are_limited(self):
+        # arrange
+        job_manager = JobManager(workers=2, max_result_bytes=100)
+        blocking_controller = PredictionController(BlockingIrisModel())
+        streaming_controller = PredictionController(IrisStreamingModel(count=3))
+
+        # act
+        blocking_job = job_manager.submit(blocking_controller, self.data)
+        finished_job = wait_for_job(job_manager, job_manager.submit(streaming_controller, self.data).job_id)
+        second_job = wait_for_job(job_manager, job_manager.submit(streaming_controller, self.data).job_id)
+        retained_jobs = [job_manager.get_job(finished_job.job_id), job_manager.get_job(second_job.job_id)]
+        BlockingIrisModel.release.set()
+        blocking_job = wait_for_job(job_manager, blocking_job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(finished_job.status == JobStatus.SUCCEEDED)
+        self.assertTrue(second_job.status == JobStatus.SUCCEEDED)
+        self.assertTrue(retained_jobs == [None, second_job])
+        self.assertTrue(blocking_job.status == JobStatus.SUCCEEDED)
+        self.assertTrue(job_manager._result_bytes == blocking_job.size)
+
+    def test_job_rejected_by_open_circuit_breaker(self):
+        # arrange
+        job_manager = JobManager(workers=1)
+        controller = PredictionController(IrisModel())
+        controller.circuit_breaker = CircuitBreaker("iris_model", window_size=1, minimum_requests=1)
+        controller.circuit_breaker.record(False, 0.01)
+
+        # act
+        job = job_manager.submit(controller, self.data)
+        job = wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(job.status == JobStatus.FAILED)
+        self.assertTrue(job.error.type == "ServiceUnavailable")
+
+    def test_jobs_are_counted_in_the_load_of_the_model(self):
+        # arrange
+        job_manager = JobManager(workers=1)
+        controller = PredictionController(BlockingIrisModel())
+
+        # act
+        job = job_manager.submit(controller, self.data)
+        time.sleep(0.1)
+        executing = controller.load.executing
+        BlockingIrisModel.release.set()
+        wait_for_job(job_manager, job.job_id)
+        job_manager.close()
+
+        # assert
+        self.assertTrue(executing == 1)
+        self.assertTrue(controller.load.executing == 0)
+
+
+class JobEndpointTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self):
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.DelayedIrisModel", create_endpoint=True, configuration={"delay": 0.2}),
+            Model(class_path="tests.mocks.IrisStreamingModel", create_endpoint=True,
+                  configuration={"count": 3, "delay": 0.1})
+        ], jobs=JobsConfiguration(enabled=True, workers=2))
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def test_submit_and_poll_job(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            submit_response = client.post("/api/models/delayed_iris_model/jobs", json=IRIS_INPUT)
+            job_id = submit_response.json()["job_id"]
+            pending_result_response = client.get("/api/jobs/{}/result".format(job_id))
+            wait_for_job(app.state.job_manager, job_id)
+            status_response = client.get("/api/jobs/{}".format(job_id))
+            result_response = client.get("/api/jobs/{}/result".format(job_id))
+            delete_response = client.delete("/api/jobs/{}".format(job_id))
+            deleted_status_response = client.get("/api/jobs/{}".format(job_id))
+
+        # assert
+        self.assertTrue(submit_response.status_code == 202)
+        self.assertTrue(submit_response.headers["location"] == "/api/jobs/{}".format(job_id))
+        self.assertTrue(submit_response.json()["status"] in ("QUEUED", "RUNNING"))
+        self.assertTrue(pending_result_response.status_code == 202)
+        self.assertTrue(status_response.json()["status"] == "SUCCEEDED")
+        self.assertTrue(result_response.status_code == 200)
+        self.assertTrue(result_response.json() == {"species": "Iris setosa"})
+        self.assertTrue(delete_response.status_code == 200)
+        self.assertTrue(deleted_status_response.status_code == 404)
+
+    def test_submit_job_with_bad_data(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/delayed_iris_model/jobs", json={"sepal_length": 6.0})
+            unknown_job_response = client.get("/api/jobs/unknown")
+
+        # assert
+        self.assertTrue(response.status_code == 400)
+        self.assertTrue(unknown_job_response.status_code == 404)
+
+    def test_stream_job_result(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            submit_response = client.post("/api/models/iris_streaming_model/jobs", json=IRIS_INPUT)
+            job_id = submit_response.json()["job_id"]
+            with client.stream("GET", "/api/jobs/{}/result".format(job_id), params={"stream": True}) as response:
+                lines = [json.loads(line) for line in response.iter_lines() if line]
+            result_response = client.get("/api/jobs/{}/result".format(job_id))
+
+        # assert
+        self.assertTrue(response.headers["content-type"] == "application/x-ndjson")
+        self.assertTrue(lines == [{"species": "Iris setosa"}] * 3)
+        self.assertTrue(result_response.json() == [{"species": "Iris setosa"}] * 3)
+
+    def test_open_circuit_breaker_rejects_jobs(self):
+        # arrange
+        CircuitBreakerManager.clear_instance()
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisScoreModel", create_endpoint=True,
+                  circuit_breaker=CircuitBreakerConfiguration(window_size=2, minimum_requests=2, open_seconds=60.0))
+        ], jobs=JobsConfiguration(enabled=True, workers=1))
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            for _ in range(2):
+                job_id = client.post("/api/models/iris_score_model/jobs",
+                                     json={"sepal_area": -1.0, "petal_area": 1.0}).json()["job_id"]
+                wait_for_job(app.state.job_manager, job_id)
+            rejected_response = client.post("/api/models/iris_score_model/jobs",
+                                            json={"sepal_area": 1.0, "petal_area": 1.0})
+
+        # assert
+        circuit_breaker = CircuitBreakerManager().get_circuit_breaker("iris_score_model")
+        CircuitBreakerManager.clear_instance()
+        self.assertTrue(circuit_breaker.state is CircuitState.OPEN)
+        self.assertTrue(rejected_response.status_code == 503)
+        self.assertTrue(rejected_response.json()["type"] == "ServiceUnavailable")
+        self.assertTrue(0 < int(rejected_response.headers["Retry-After"]) <= 60)
+
+    def test_job_endpoints_are_not_created_when_jobs_are_disabled(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/jobs", json=IRIS_INPUT)
+
+        # assert
+        self.assertTrue(response.status_code in (404, 405))
+
+
+if __name__ == '__main__':
+    unittest.main()
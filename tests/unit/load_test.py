@@ -0,0 +1,228 @@
+import os
+from pathlib import Path
+
+import time
+import asyncio
+import unittest
+from threading import Thread
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, TrafficSplitConfiguration, \
+    TrafficSplitVariant
+from rest_model_service.load import LoadTracker, LoadManager
+
+
+class LoadTrackerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        LoadManager.clear_instance()
+
+    def tearDown(self) -> None:
+        LoadManager.clear_instance()
+
+    def test_requests_in_flight_and_predictions_executing(self):
+        # arrange
+        tracker = LoadTracker("model")
+
+        # act
+        tracker.request_received()
+        tracker.request_received()
+        started = tracker.prediction_started()
+        in_flight, executing = tracker.in_flight, tracker.executing
+        tracker.prediction_completed(started)
+        tracker.request_completed()
+
+        # assert
+        self.assertTrue(in_flight == 2 and executing == 1)
+        self.assertTrue(tracker.in_flight == 1 and tracker.executing == 0)
+
+    def test_get_window(self):
+        # arrange
+        tracker = LoadTracker("model", window_seconds=10)
+        tracker._created -= 100.0
+        for _ in range(4):
+            tracker.prediction_completed(tracker.prediction_started() - 0.5)
+
+        # act
+        window_seconds, completed, busy_seconds = tracker.get_window()
+
+        # assert
+        self.assertTrue(window_seconds == 10.0)
+        self.assertTrue(completed == 4)
+        self.assertTrue(2.0 <= busy_seconds < 2.1)
+
+    def test_get_window_ignores_old_predictions(self):
+        # arrange
+        tracker = LoadTracker("model", window_seconds=10)
+        tracker.prediction_completed(tracker.prediction_started())
+
+        # act
+        now = tracker._created + 20.0
+        window_seconds, completed, busy_seconds = tracker.get_window(now)
+
+        # assert
+        self.assertTrue(window_seconds == 10.0)
+        self.assertTrue(completed == 0 and busy_seconds == 0.0)
+
+    def test_load_manager_is_singleton(self):
+        # act
+        first_load_manager = LoadManager()
+        second_load_manager = LoadManager()
+
+        # assert
+        self.assertTrue(first_load_manager is second_load_manager)
+        self.assertTrue(first_load_manager.get_tracker("model") is second_load_manager.get_tracker("model"))
+
+    def test_get_load(self):
+        # arrange
+        load_manager = LoadManager()
+        first_tracker = load_manager.get_tracker("first_model")
+        second_tracker = load_manager.get_tracker("second_model")
+        first_tracker.request_received()
+        first_tracker.request_received()
+        first_tracker.prediction_started()
+        second_tracker.prediction_completed(second_tracker.prediction_started())
+
+        async def get_load():
+            return load_manager.get_load()
+
+        # act
+        load = asyncio.run(get_load())
+
+        # assert
+        self.assertTrue(load["in_flight"] == 2 and load["queued"] == 1 and load["executing"] == 1)
+        self.assertTrue([model["qualified_name"] for model in load["models"]] == ["first_model", "second_model"])
+        self.assertTrue(load["models"][1]["throughput"] > 0.0)
+        self.assertTrue(load["throughput"] == load["models"][1]["throughput"])
+        self.assertTrue(0.0 <= load["utilization"] <= 1.0)
+        self.assertTrue(load["threadpool_tokens_total"] > 0)
+
+    def test_get_load_with_aggregate_tracker(self):
+        # arrange
+        load_manager = LoadManager()
+        split_tracker = load_manager.get_tracker("split", aggregate=True)
+        variant_tracker = load_manager.get_tracker("variant")
+        split_tracker.request_received()
+        split_tracker.request_received()
+        split_started = split_tracker.prediction_started()
+        variant_tracker.request_received()
+        variant_started = variant_tracker.prediction_started()
+
+        async def get_load():
+            return load_manager.get_load()
+
+        # act
+        load = asyncio.run(get_load())
+        variant_tracker.prediction_completed(variant_started)
+        variant_tracker.request_completed()
+        split_tracker.prediction_completed(split_started)
+        split_tracker.request_completed()
+        completed_load = asyncio.run(get_load())
+
+        # assert
+        split_load, variant_load = load["models"]
+        self.assertTrue(split_load["aggregate"] and not variant_load["aggregate"])
+        self.assertTrue((split_load["in_flight"], split_load["queued"], split_load["executing"]) == (2, 1, 1))
+        self.assertTrue((variant_load["in_flight"], variant_load["queued"], variant_load["executing"]) == (1, 0, 1))
+        self.assertTrue((load["in_flight"], load["queued"], load["executing"]) == (2, 1, 1))
+        self.assertTrue(completed_load["models"][0]["throughput"] > 0.0)
+        self.assertTrue(completed_load["throughput"] == completed_load["models"][1]["throughput"])
+
+
+class LoadEndpointTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ModelManager().clear_instance()
+        LoadManager.clear_instance()
+
+    def test_load_endpoint(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            for _ in range(3):
+                client.post("/api/models/iris_model/prediction", json={
+                    "sepal_length": 6.0,
+                    "sepal_width": 5.0,
+                    "petal_length": 3.0,
+                    "petal_width": 2.0
+                })
+            response = client.get("/api/health/load")
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        load = response.json()
+        self.assertTrue(load["in_flight"] == 0 and load["queued"] == 0 and load["executing"] == 0)
+        self.assertTrue(load["models"][0]["qualified_name"] == "iris_model")
+        self.assertTrue(load["models"][0]["throughput"] > 0.0)
+        self.assertTrue(load["throughput"] > 0.0)
+
+    def test_load_endpoint_with_prediction_dispatcher(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             prediction_dispatcher=True)
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            client.post("/api/models/iris_model/prediction", json={
+                "sepal_length": 6.0,
+                "sepal_width": 5.0,
+                "petal_length": 3.0,
+                "petal_width": 2.0
+            })
+            client.post("/api/models/iris_model/prediction", json={"sepal_length": 6.0})
+            response = client.get("/api/health/load")
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        load = response.json()
+        self.assertTrue(load["in_flight"] == 0)
+        self.assertTrue(load["models"][0]["throughput"] > 0.0)
+
+    def test_load_endpoint_with_traffic_split(self):
+        # arrange
+        configuration = ServiceConfiguration(
+            models=[Model(class_path="tests.mocks.DelayedIrisModel", create_endpoint=False,
+                          configuration={"delay": 0.5})],
+            traffic_splits=[
+                TrafficSplitConfiguration(qualified_name="iris_split",
+                                          variants=[TrafficSplitVariant(qualified_name="delayed_iris_model")])
+            ])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            thread = Thread(target=client.post, args=("/api/models/iris_split/prediction",), kwargs={"json": {
+                "sepal_length": 6.0,
+                "sepal_width": 5.0,
+                "petal_length": 3.0,
+                "petal_width": 2.0
+            }})
+            thread.start()
+            time.sleep(0.25)
+            executing_load = client.get("/api/health/load").json()
+            thread.join()
+            completed_load = client.get("/api/health/load").json()
+
+        # assert
+        models = {model["qualified_name"]: model for model in executing_load["models"]}
+        self.assertTrue((models["iris_split"]["in_flight"], models["iris_split"]["executing"]) == (1, 1))
+        self.assertTrue((models["delayed_iris_model"]["in_flight"], models["delayed_iris_model"]["executing"]) == (1, 1))
+        self.assertTrue((executing_load["in_flight"], executing_load["queued"], executing_load["executing"]) == (1, 0, 1))
+        models = {model["qualified_name"]: model for model in completed_load["models"]}
+        self.assertTrue(models["iris_split"]["throughput"] > 0.0)
+        self.assertTrue(completed_load["throughput"] == models["delayed_iris_model"]["throughput"])
+        self.assertTrue(completed_load["in_flight"] == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
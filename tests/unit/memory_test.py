@@ -0,0 +1,187 @@
+import os
+from pathlib import Path
+
+import time
+import inspect
+import unittest
+import tracemalloc
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator, MemoryConfiguration
+from rest_model_service.memory import MemoryAccounting, MemorySampler, get_resident_memory, _get_line_ranges
+from tests.mocks import LargeIrisModel, IrisModelInput
+
+
+SIZE = 32 * 1024 * 1024
+
+
+def wait_for_sample(qualified_name, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while MemoryAccounting().get_memory(qualified_name)["sampled_at"] is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError()
+        time.sleep(0.01)
+
+
+class MemoryAccountingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        MemoryAccounting.clear_instance()
+
+    def tearDown(self) -> None:
+        MemoryAccounting.clear_instance()
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def test_load_memory(self):
+        # arrange
+        memory_accounting = MemoryAccounting()
+
+        # act
+        started = memory_accounting.load_started()
+        model = LargeIrisModel(size=SIZE)
+        memory_accounting.load_completed(model.qualified_name, LargeIrisModel, started)
+        memory = memory_accounting.get_memory(model.qualified_name)
+
+        # assert
+        self.assertTrue(memory["load_bytes"] >= SIZE * 0.9)
+        self.assertTrue(memory["layers"]["LargeIrisModel"] == memory["load_bytes"])
+        self.assertTrue(memory["sampled_bytes"] is None)
+        self.assertTrue(memory_accounting.get_memory("unknown_model") is None)
+
+    def test_get_line_ranges(self):
+        # arrange
+        lines, first_line = inspect.getsourcelines(LargeIrisModel.predict)
+
+        # act
+        ranges = _get_line_ranges(LargeIrisModel)
+
+        # assert
+        self.assertTrue((inspect.getsourcefile(LargeIrisModel), first_line, first_line + len(lines) - 1) in ranges)
+
+    def test_check_budget(self):
+        # arrange
+        memory_accounting = MemoryAccounting()
+        resident_memory = get_resident_memory()
+
+        # act, assert
+        memory_accounting.check_budget(None, "iris_model")
+        memory_accounting.check_budget(resident_memory * 2, "iris_model")
+        with self.assertRaises(ValueError):
+            memory_accounting.check_budget(1024, "iris_model")
+
+    def test_sample(self):
+        # arrange
+        memory_accounting = MemoryAccounting()
+        tracemalloc.start(10)
+        started = memory_accounting.load_started()
+        model = LargeIrisModel(size=1024 * 1024)
+        memory_accounting.load_completed(model.qualified_name, LargeIrisModel, started)
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        memory_accounting.sample()
+        first_sample = memory_accounting.get_memory(model.qualified_name)["sampled_bytes"]
+        for _ in range(100):
+            model.predict(data)
+        memory_accounting.sample()
+        second_sample = memory_accounting.get_memory(model.qualified_name)["sampled_bytes"]
+
+        # assert
+        self.assertTrue(first_sample >= 1024 * 1024)
+        self.assertTrue(second_sample - first_sample >= 100 * 1024)
+
+    def test_sample_without_tracing(self):
+        # arrange
+        memory_accounting = MemoryAccounting()
+        started = memory_accounting.load_started()
+        memory_accounting.load_completed("large_iris_model", LargeIrisModel, started)
+
+        # act
+        memory_accounting.sample()
+
+        # assert
+        self.assertTrue(memory_accounting.get_memory("large_iris_model")["sampled_bytes"] is None)
+
+    def test_memory_sampler(self):
+        # arrange
+        memory_accounting = MemoryAccounting()
+        tracemalloc.start(10)
+        started = memory_accounting.load_started()
+        model = LargeIrisModel(size=1024)
+        memory_accounting.load_completed(model.qualified_name, LargeIrisModel, started)
+        sampler = MemorySampler(interval_seconds=0.01)
+
+        # act
+        sampler.start()
+        wait_for_sample(model.qualified_name)
+        sampler.stop()
+
+        # assert
+        self.assertTrue(memory_accounting.get_memory(model.qualified_name)["sampled_bytes"] >= 1024)
+
+
+class MemoryEndpointTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        MemoryAccounting.clear_instance()
+
+    def tearDown(self) -> None:
+        MemoryAccounting.clear_instance()
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def test_memory_in_model_metadata(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.LargeIrisModel", create_endpoint=True, configuration={"size": SIZE},
+                  decorators=[ModelDecorator(class_path="tests.mocks.PredictionIDDecorator")])
+        ])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.get("/api/models/large_iris_model/metadata")
+
+        # assert
+        memory = response.json()["memory"]
+        self.assertTrue(memory["load_bytes"] >= SIZE * 0.9)
+        self.assertTrue(set(memory["layers"]) == {"LargeIrisModel", "PredictionIDDecorator"})
+
+    def test_memory_budget_exceeded(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.LargeIrisModel", create_endpoint=True, configuration={"size": 1024})
+        ], memory=MemoryConfiguration(budget_bytes=1024))
+
+        # act, assert
+        with self.assertRaises(ValueError) as context:
+            create_app(configuration, wait_for_model_creation=True)
+        self.assertTrue("large_iris_model" in str(context.exception))
+
+    def test_memory_sampling(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.LargeIrisModel", create_endpoint=True, configuration={"size": 1024 * 1024})
+        ], memory=MemoryConfiguration(sample_interval_seconds=0.01))
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            wait_for_sample("large_iris_model")
+            response = client.get("/api/models/large_iris_model/metadata")
+
+        # assert
+        self.assertTrue(response.json()["memory"]["sampled_bytes"] >= 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+import prometheus_client
+import prometheus_client.values
+from prometheus_client import CollectorRegistry, Counter, Gauge
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from rest_model_service import metrics
+
+
+def get_sample_values(directory):
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=directory)
+    return {sample.name: sample.value for metric in registry.collect() for sample in metric.samples}
+
+
+class MetricsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.value_class = prometheus_client.values.ValueClass
+        self.environ = patch.dict(os.environ)
+        self.environ.start()
+
+    def tearDown(self) -> None:
+        self.environ.stop()
+        prometheus_client.values.ValueClass = self.value_class
+        self.directory.cleanup()
+
+    def test_enable_multiprocess(self):
+        # arrange
+        with open(os.path.join(self.directory.name, "counter_1234.db"), "w") as file:
+            file.write("asdf")
+
+        # act
+        metrics.enable_multiprocess(self.directory.name)
+        counter = Counter("test_enable_counter", "Test counter.", registry=None)
+        counter.inc(2)
+
+        # assert
+        self.assertTrue(metrics.is_multiprocess())
+        self.assertTrue(not os.path.exists(os.path.join(self.directory.name, "counter_1234.db")))
+        self.assertTrue(get_sample_values(self.directory.name)["test_enable_counter_total"] == 2.0)
+
+    def test_archive_process(self):
+        # arrange
+        metrics.enable_multiprocess(self.directory.name)
+        counter = Counter("test_archive_counter", "Test counter.", registry=None)
+        gauge = Gauge("test_archive_gauge", "Test gauge.", registry=None, multiprocess_mode="livesum")
+        counter.inc(1)
+        gauge.set(1)
+
+        pids = []
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                counter.inc(2)
+                gauge.set(5)
+                os._exit(0)
+            os.waitpid(pid, 0)
+            pids.append(pid)
+
+        # act
+        values_before = get_sample_values(self.directory.name)
+        for pid in pids:
+            metrics.archive_process(pid)
+        values_after = get_sample_values(self.directory.name)
+        file_names = sorted(os.listdir(self.directory.name))
+
+        # assert
+        self.assertTrue(values_before["test_archive_counter_total"] == 5.0)
+        self.assertTrue(values_before["test_archive_gauge"] == 11.0)
+        self.assertTrue(values_after["test_archive_counter_total"] == 5.0)
+        self.assertTrue(values_after["test_archive_gauge"] == 1.0)
+        self.assertTrue(file_names == ["counter_{}.db".format(os.getpid()), "counter_archive.db",
+                                       "gauge_livesum_{}.db".format(os.getpid())])
+
+    def test_metrics_endpoint_reuses_rendered_metrics(self):
+        # arrange
+        metrics.enable_multiprocess(self.directory.name)
+        counter = Counter("test_endpoint_counter", "Test counter.", registry=None)
+        cached_endpoint = metrics.MetricsEndpoint(cache_seconds=60.0)
+        endpoint = metrics.MetricsEndpoint()
+
+        # act
+        first_content = cached_endpoint.render()
+        counter.inc()
+        second_content = cached_endpoint.render()
+        third_content = endpoint.render()
+
+        # assert
+        self.assertTrue(first_content == second_content)
+        self.assertTrue(b"test_endpoint_counter_total 0.0" in first_content)
+        self.assertTrue(b"test_endpoint_counter_total 1.0" in third_content)
+
+
+if __name__ == '__main__':
+    unittest.main()
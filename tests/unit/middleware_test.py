@@ -0,0 +1,262 @@
+import os
+from pathlib import Path
+
+import unittest
+import json
+import gzip
+import zlib
+import asyncio
+import zstandard
+import brotli
+import tracemalloc
+from unittest.mock import patch
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, CompressionConfiguration
+from rest_model_service.middleware import select_encoding, decompress, _CompressingSender
+
+
+class MiddlewareTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def test_select_encoding(self):
+        # arrange
+        encodings = ["zstd", "br", "gzip"]
+
+        # act, assert
+        self.assertTrue(select_encoding(None, encodings) is None)
+        self.assertTrue(select_encoding("gzip, deflate", encodings) == "gzip")
+        self.assertTrue(select_encoding("gzip, br", encodings) == "br")
+        self.assertTrue(select_encoding("zstd;q=0, gzip", encodings) == "gzip")
+        self.assertTrue(select_encoding("*", encodings) == "zstd")
+        self.assertTrue(select_encoding("identity", encodings) is None)
+
+    def test_decompress(self):
+        # arrange
+        data = b"asdf" * 100
+
+        # act, assert
+        self.assertTrue(decompress("gzip", gzip.compress(data), 1000) == data)
+        self.assertTrue(decompress("zstd", zstandard.compress(data), 1000) == data)
+        self.assertTrue(decompress("br", brotli.compress(data), 1000) == data)
+
+        with self.assertRaises(ValueError):
+            decompress("gzip", gzip.compress(data), 100)
+
+        with self.assertRaises(ValueError):
+            decompress("gzip", b"asdf", 1000)
+
+        with self.assertRaises(ValueError):
+            decompress("lzma", b"asdf", 1000)
+
+    def test_decompress_truncated_body(self):
+        # arrange
+        data = b"asdf" * 100
+        compressed = {
+            "gzip": gzip.compress(data),
+            "zstd": zstandard.compress(data),
+            "br": brotli.compress(data)
+        }
+
+        # act, assert
+        for encoding, body in compressed.items():
+            with self.assertRaises(ValueError, msg=encoding):
+                decompress(encoding, body[:-4], 1000)
+            with self.assertRaises(ValueError, msg=encoding):
+                decompress(encoding, b"", 1000)
+
+    def test_decompress_highly_compressible_body(self):
+        # arrange
+        size = 64 * 1024 * 1024
+        compressed = {
+            "gzip": gzip.compress(b"\0" * size),
+            "zstd": zstandard.compress(b"\0" * size),
+            "br": brotli.compress(b"\0" * size)
+        }
+
+        # act, assert
+        for encoding, data in compressed.items():
+            tracemalloc.start()
+            try:
+                with self.assertRaises(ValueError):
+                    decompress(encoding, data, 1024 * 1024)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertTrue(peak < 8 * 1024 * 1024, encoding)
+
+    def test_response_compression(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             compression=CompressionConfiguration(enabled=True,
+                                                                                  encodings=["zstd", "gzip"],
+                                                                                  minimum_size=500))
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            metadata_response = client.get("/api/models/iris_model/metadata", headers={"Accept-Encoding": "gzip"})
+            zstd_metadata_response = client.get("/api/models/iris_model/metadata",
+                                                headers={"Accept-Encoding": "zstd"})
+            small_response = client.get("/api/models", headers={"Accept-Encoding": "gzip"})
+
+            # assert
+            self.assertTrue(metadata_response.status_code == 200)
+            self.assertTrue(metadata_response.headers["content-encoding"] == "gzip")
+            self.assertTrue(metadata_response.json()["qualified_name"] == "iris_model")
+            self.assertTrue(zstd_metadata_response.headers["content-encoding"] == "zstd")
+            self.assertTrue("content-encoding" not in small_response.headers)
+
+    def test_streamed_response_chunks_are_flushed(self):
+        # arrange
+        decompressors = {
+            "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS).decompress,
+            "zstd": lambda: zstandard.ZstdDecompressor().decompressobj().decompress,
+            "br": lambda: brotli.Decompressor().process
+        }
+        lines = [json.dumps({"index": index}).encode() + b"\n" for index in range(3)]
+
+        for encoding, create_decompressor in decompressors.items():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async def stream():
+                sender = _CompressingSender(send, encoding, None, 1024)
+                await sender({"type": "http.response.start", "status": 200, "headers": []})
+                for line in lines:
+                    await sender({"type": "http.response.body", "body": line, "more_body": True})
+                await sender({"type": "http.response.body", "body": b"", "more_body": False})
+
+            # act
+            asyncio.run(stream())
+
+            # assert
+            decompress_chunk = create_decompressor()
+            for line, message in zip(lines, messages[1:]):
+                self.assertTrue(decompress_chunk(message["body"]) == line, encoding)
+            self.assertTrue(decompress_chunk(messages[-1]["body"]) == b"", encoding)
+
+    def test_response_compression_with_excluded_handler(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             compression=CompressionConfiguration(enabled=True,
+                                                                                  minimum_size=0,
+                                                                                  excluded_handlers=[
+                                                                                      "/api/models/.*/metadata"
+                                                                                  ]))
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            metadata_response = client.get("/api/models/iris_model/metadata", headers={"Accept-Encoding": "gzip"})
+            models_response = client.get("/api/models", headers={"Accept-Encoding": "gzip"})
+
+            # assert
+            self.assertTrue("content-encoding" not in metadata_response.headers)
+            self.assertTrue(models_response.headers["content-encoding"] == "gzip")
+
+    def test_request_decompression(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             compression=CompressionConfiguration(enabled=True))
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        body = json.dumps({
+            "sepal_length": 6.0,
+            "sepal_width": 5.0,
+            "petal_length": 3.0,
+            "petal_width": 2.0
+        }).encode()
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction", content=gzip.compress(body),
+                                   headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+            bad_response = client.post("/api/models/iris_model/prediction", content=body,
+                                       headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+            unsupported_response = client.post("/api/models/iris_model/prediction", content=body,
+                                               headers={"Content-Type": "application/json",
+                                                        "Content-Encoding": "lzma"})
+
+            # assert
+            self.assertTrue(response.status_code == 200)
+            self.assertTrue(response.json() == {"species": "Iris setosa"})
+            self.assertTrue(bad_response.status_code == 400)
+            self.assertTrue(bad_response.json()["type"] == "ContentEncodingError")
+            self.assertTrue(unsupported_response.status_code == 415)
+
+    def test_request_decompression_without_optional_packages(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             compression=CompressionConfiguration(enabled=True))
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        body = json.dumps({
+            "sepal_length": 6.0,
+            "sepal_width": 5.0,
+            "petal_length": 3.0,
+            "petal_width": 2.0
+        }).encode()
+
+        # act
+        with patch("rest_model_service.middleware.zstandard", None), \
+                patch("rest_model_service.middleware.brotli", None):
+            with self.assertRaises(ValueError):
+                decompress("zstd", zstandard.compress(body), 1000)
+            with self.assertRaises(ValueError):
+                decompress("br", brotli.compress(body), 1000)
+
+            with TestClient(app) as client:
+                zstd_response = client.post("/api/models/iris_model/prediction", content=zstandard.compress(body),
+                                            headers={"Content-Type": "application/json", "Content-Encoding": "zstd"})
+                br_response = client.post("/api/models/iris_model/prediction", content=brotli.compress(body),
+                                          headers={"Content-Type": "application/json", "Content-Encoding": "br"})
+
+        # assert
+        self.assertTrue(zstd_response.status_code == 415)
+        self.assertTrue(br_response.status_code == 415)
+        self.assertTrue(br_response.json()["type"] == "ContentEncodingError")
+
+    def test_request_decompression_of_oversized_bodies(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             compression=CompressionConfiguration(enabled=True,
+                                                                                  max_request_size=1024 * 1024))
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            bomb_response = client.post("/api/models/iris_model/prediction",
+                                        content=brotli.compress(b" " * (256 * 1024 * 1024)),
+                                        headers={"Content-Type": "application/json", "Content-Encoding": "br"})
+            large_response = client.post("/api/models/iris_model/prediction", content=os.urandom(2 * 1024 * 1024),
+                                         headers={"Content-Type": "application/json", "Content-Encoding": "br"})
+
+            # assert
+            self.assertTrue(bomb_response.status_code == 400)
+            self.assertTrue("larger than" in bomb_response.json()["messages"][0])
+            self.assertTrue(large_response.status_code == 400)
+            self.assertTrue(large_response.json()["messages"][0].startswith("Compressed body is larger than"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+from pathlib import Path
+
+import unittest
+import time
+from threading import current_thread
+from pydantic import BaseModel
+from prometheus_client import REGISTRY
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, PipelineConfiguration, \
+    PipelineStepConfiguration
+from rest_model_service.model_pipeline import ModelPipeline, PipelineStep
+from tests.mocks import IrisModel, IrisModelInput, IrisFeatureModel, IrisScoreModel, IrisFeatures, \
+    DelayedIrisModel
+
+
+class ThreadRecordingModel(IrisScoreModel):
+    threads = []
+
+    def predict(self, data):
+        ThreadRecordingModel.threads.append(current_thread().name)
+        return super().predict(data)
+
+
+class NamedIrisModelInput(BaseModel):
+    sepal_length: str
+
+
+class NamedIrisModel(IrisModel):
+    qualified_name = "named_iris_model"
+    input_schema = NamedIrisModelInput
+
+
+class ModelPipelineTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+    def test_sequential_pipeline(self):
+        # arrange
+        ThreadRecordingModel.threads = []
+        pipeline = ModelPipeline("iris_pipeline", [
+            PipelineStep("features", IrisFeatureModel(), ["input"]),
+            PipelineStep("score", ThreadRecordingModel(), ["features"])
+        ])
+
+        # act
+        prediction = pipeline.predict(self.data)
+
+        # assert
+        self.assertTrue(prediction.score.score == 36.0)
+        self.assertTrue(list(pipeline.output_schema.model_fields) == ["score"])
+        self.assertTrue(set(pipeline.input_schema.model_fields) == set(IrisModelInput.model_fields))
+        self.assertTrue(ThreadRecordingModel.threads == [current_thread().name])
+
+    def test_intermediate_results_are_not_copied(self):
+        # arrange
+        features = IrisFeatures(sepal_area=1.0, petal_area=2.0)
+        step = PipelineStep("score", IrisScoreModel(), ["features"])
+
+        # act
+        data = step.build_input({"input": self.data, "features": features})
+
+        # assert
+        self.assertTrue(data is features)
+
+    def test_merged_inputs(self):
+        # arrange
+        step = PipelineStep("score", IrisScoreModel(), ["input", "features"])
+
+        # act
+        data = step.build_input({"input": {"sepal_area": 5.0}, "features": {"petal_area": 2.0}})
+
+        # assert
+        self.assertTrue(data == IrisFeatures(sepal_area=5.0, petal_area=2.0))
+
+    def test_parallel_branches(self):
+        # arrange
+        pipeline = ModelPipeline("iris_ensemble", [
+            PipelineStep("first", DelayedIrisModel("first", delay=0.3), ["input"]),
+            PipelineStep("second", DelayedIrisModel("second", delay=0.3), ["input"]),
+            PipelineStep("third", DelayedIrisModel("third", delay=0.3), ["input"])
+        ], outputs=["first", "second", "third"])
+
+        # act
+        start = time.perf_counter()
+        prediction = pipeline.predict(self.data)
+        duration = time.perf_counter() - start
+
+        # assert
+        self.assertTrue(duration < 0.6)
+        self.assertTrue(prediction.first.species == "Iris setosa")
+        self.assertTrue(prediction.third.species == "Iris setosa")
+
+    def test_cpu_time_of_steps(self):
+        # arrange
+        pipeline = ModelPipeline("iris_cpu_pipeline", [
+            PipelineStep("first", DelayedIrisModel("first"), ["input"]),
+            PipelineStep("second", DelayedIrisModel("second"), ["input"])
+        ], outputs=["first", "second"])
+
+        # act
+        pipeline.predict(self.data)
+
+        # assert
+        for step in ["first", "second"]:
+            self.assertTrue(REGISTRY.get_sample_value("pipeline_step_cpu_seconds_count",
+                                                      {"pipeline": "iris_cpu_pipeline", "step": step}) == 1.0)
+
+    def test_exception_in_step(self):
+        # arrange
+        pipeline = ModelPipeline("iris_pipeline", [
+            PipelineStep("iris", DelayedIrisModel(delay=0.1), ["input"]),
+            PipelineStep("score", IrisScoreModel(), ["input"])
+        ], outputs=["iris", "score"])
+
+        # act, assert
+        with self.assertRaises(Exception):
+            pipeline.predict(pipeline.input_schema(sepal_length=6.0, sepal_width=5.0, petal_length=3.0,
+                                                   petal_width=2.0, sepal_area=-1.0, petal_area=1.0))
+
+    def test_bad_pipelines(self):
+        # act, assert
+        with self.assertRaises(ValueError):
+            ModelPipeline("iris_pipeline", [PipelineStep("score", IrisScoreModel(), ["features"])])
+        with self.assertRaises(ValueError):
+            ModelPipeline("iris_pipeline", [PipelineStep("a", IrisScoreModel(), ["b"]),
+                                            PipelineStep("b", IrisScoreModel(), ["a"])])
+        with self.assertRaises(ValueError):
+            ModelPipeline("iris_pipeline", [PipelineStep("a", IrisModel(), ["input"]),
+                                            PipelineStep("a", IrisModel(), ["input"])])
+        with self.assertRaises(ValueError):
+            ModelPipeline("iris_pipeline", [PipelineStep("a", IrisModel(), ["input"])], outputs=["b"])
+
+    def test_input_fields_with_different_types(self):
+        # act
+        with self.assertRaises(ValueError) as context:
+            ModelPipeline("iris_pipeline", [PipelineStep("a", IrisModel(), ["input"]),
+                                            PipelineStep("b", NamedIrisModel(), ["input"])], outputs=["a", "b"])
+
+        # assert
+        self.assertTrue(str(context.exception).startswith("Field 'sepal_length' of the input of pipeline "
+                                                          "'iris_pipeline' has type"))
+
+
+class ModelPipelineEndpointTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def test_prediction_with_pipeline(self):
+        # arrange
+        configuration = ServiceConfiguration(
+            models=[
+                Model(class_path="tests.mocks.IrisModel", create_endpoint=True),
+                Model(class_path="tests.mocks.IrisFeatureModel", create_endpoint=False),
+                Model(class_path="tests.mocks.IrisScoreModel", create_endpoint=False)
+            ],
+            pipelines=[
+                PipelineConfiguration(qualified_name="iris_pipeline",
+                                      description="Species and score of a flower.",
+                                      steps=[
+                                          PipelineStepConfiguration(name="species", qualified_name="iris_model"),
+                                          PipelineStepConfiguration(name="features",
+                                                                    qualified_name="iris_feature_model"),
+                                          PipelineStepConfiguration(name="score", qualified_name="iris_score_model",
+                                                                    inputs=["features"])
+                                      ],
+                                      outputs=["species", "score"])
+            ])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_pipeline/prediction", json={
+                "sepal_length": 6.0,
+                "sepal_width": 5.0,
+                "petal_length": 3.0,
+                "petal_width": 2.0
+            })
+            bad_response = client.post("/api/models/iris_pipeline/prediction", json={"sepal_length": 6.0})
+            metadata_response = client.get("/api/models/iris_pipeline/metadata")
+            openapi_document = client.get("/openapi.json").json()
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.json() == {"species": {"species": "Iris setosa"}, "score": {"score": 36.0}})
+        self.assertTrue(bad_response.status_code == 400)
+        self.assertTrue(metadata_response.json()["description"] == "Species and score of a flower.")
+        self.assertTrue("/api/models/iris_pipeline/prediction" in openapi_document["paths"])
+
+    def test_pipeline_with_model_not_loaded(self):
+        # arrange
+        configuration = ServiceConfiguration(
+            models=[Model(class_path="tests.mocks.IrisModel", create_endpoint=True)],
+            pipelines=[
+                PipelineConfiguration(qualified_name="iris_pipeline",
+                                      steps=[PipelineStepConfiguration(name="features",
+                                                                       qualified_name="iris_feature_model")])
+            ])
+
+        # act, assert
+        with self.assertRaises(ValueError):
+            create_app(configuration, wait_for_model_creation=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
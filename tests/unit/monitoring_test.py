@@ -0,0 +1,182 @@
+import os
+from pathlib import Path
+
+import time
+import asyncio
+import unittest
+import anyio
+import anyio.to_thread
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, MonitoringConfiguration
+from rest_model_service.monitoring import RuntimeMonitor
+from rest_model_service.status_manager import StatusManager
+from rest_model_service.schemas import ReadinessStatus
+
+
+def statistics(tasks_waiting=0, borrowed_tokens=0, total_tokens=40):
+    return anyio.CapacityLimiterStatistics(borrowed_tokens=borrowed_tokens, total_tokens=total_tokens,
+                                           borrowers=(), tasks_waiting=tasks_waiting)
+
+
+class RuntimeMonitorTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        StatusManager().set_readiness_status(ReadinessStatus.ACCEPTING_TRAFFIC)
+
+    def tearDown(self) -> None:
+        StatusManager.clear_instance()
+        ModelManager().clear_instance()
+
+    def test_record(self):
+        # arrange
+        monitor = RuntimeMonitor()
+
+        # act
+        monitor.record(0.25, statistics(tasks_waiting=3, borrowed_tokens=40), 0.0)
+
+        # assert
+        self.assertTrue(monitor.lag == 0.25)
+        self.assertTrue(monitor.tasks_waiting == 3)
+        self.assertTrue(monitor.tokens_in_use == 40 and monitor.tokens_total == 40)
+        self.assertTrue(monitor.refusing_traffic is False)
+        self.assertTrue(StatusManager().get_readiness_status() == ReadinessStatus.ACCEPTING_TRAFFIC)
+
+    def test_sustained_saturation_refuses_traffic(self):
+        # arrange
+        monitor = RuntimeMonitor(lag_threshold_seconds=0.1, sustained_seconds=5.0)
+
+        # act
+        monitor.record(0.5, statistics(), 0.0)
+        readiness_before = StatusManager().get_readiness_status()
+        monitor.record(0.5, statistics(), 5.0)
+        readiness_after = StatusManager().get_readiness_status()
+
+        # assert
+        self.assertTrue(readiness_before == ReadinessStatus.ACCEPTING_TRAFFIC)
+        self.assertTrue(readiness_after == ReadinessStatus.REFUSING_TRAFFIC)
+        self.assertTrue(monitor.refusing_traffic is True)
+
+    def test_short_saturation_does_not_refuse_traffic(self):
+        # arrange
+        monitor = RuntimeMonitor(waiting_tasks_threshold=10, sustained_seconds=5.0)
+
+        # act
+        monitor.record(0.0, statistics(tasks_waiting=20), 0.0)
+        monitor.record(0.0, statistics(tasks_waiting=0), 3.0)
+        monitor.record(0.0, statistics(tasks_waiting=20), 4.0)
+        monitor.record(0.0, statistics(tasks_waiting=20), 8.0)
+
+        # assert
+        self.assertTrue(monitor.refusing_traffic is False)
+        self.assertTrue(StatusManager().get_readiness_status() == ReadinessStatus.ACCEPTING_TRAFFIC)
+
+    def test_sustained_recovery_accepts_traffic(self):
+        # arrange
+        monitor = RuntimeMonitor(waiting_tasks_threshold=10, sustained_seconds=5.0)
+        monitor.record(0.0, statistics(tasks_waiting=20), 0.0)
+        monitor.record(0.0, statistics(tasks_waiting=20), 5.0)
+
+        # act
+        monitor.record(0.0, statistics(tasks_waiting=0), 6.0)
+        readiness_before = StatusManager().get_readiness_status()
+        monitor.record(0.0, statistics(tasks_waiting=0), 11.0)
+        readiness_after = StatusManager().get_readiness_status()
+
+        # assert
+        self.assertTrue(readiness_before == ReadinessStatus.REFUSING_TRAFFIC)
+        self.assertTrue(readiness_after == ReadinessStatus.ACCEPTING_TRAFFIC)
+        self.assertTrue(monitor.refusing_traffic is False)
+
+    def test_saturation_does_not_change_readiness_of_service_loading_models(self):
+        # arrange
+        StatusManager().set_readiness_status(ReadinessStatus.REFUSING_TRAFFIC)
+        monitor = RuntimeMonitor(lag_threshold_seconds=0.1, sustained_seconds=0.0)
+
+        # act
+        monitor.record(0.5, statistics(), 0.0)
+        monitor.record(0.0, statistics(), 1.0)
+
+        # assert
+        self.assertTrue(monitor.refusing_traffic is False)
+        self.assertTrue(StatusManager().get_readiness_status() == ReadinessStatus.REFUSING_TRAFFIC)
+
+    def test_blocked_event_loop_is_measured(self):
+        # arrange
+        monitor = RuntimeMonitor(interval_seconds=0.01)
+        lags = []
+        original_record = monitor.record
+
+        def record(lag, statistics, now):
+            lags.append(lag)
+            original_record(lag, statistics, now)
+
+        monitor.record = record
+
+        async def block_event_loop():
+            await monitor.start()
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)
+            await asyncio.sleep(0.05)
+            await monitor.stop()
+
+        # act
+        asyncio.run(block_event_loop())
+
+        # assert
+        self.assertTrue(max(lags) >= 0.15)
+        self.assertTrue(monitor._task is None)
+
+    def test_threadpool_tasks_waiting(self):
+        # arrange
+        monitor = RuntimeMonitor(interval_seconds=0.01, threadpool_size=1)
+        waiting = []
+        original_record = monitor.record
+
+        def record(lag, statistics, now):
+            waiting.append(statistics.tasks_waiting)
+            original_record(lag, statistics, now)
+
+        monitor.record = record
+
+        async def saturate_threadpool():
+            await monitor.start()
+            async with anyio.create_task_group() as task_group:
+                for _ in range(3):
+                    task_group.start_soon(anyio.to_thread.run_sync, time.sleep, 0.1)
+            await monitor.stop()
+
+        # act
+        anyio.run(saturate_threadpool)
+
+        # assert
+        self.assertTrue(max(waiting) == 2)
+        self.assertTrue(monitor.tokens_total == 1)
+
+    def test_create_app_starts_monitor(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)],
+                                             monitoring=MonitoringConfiguration(enabled=True,
+                                                                                interval_seconds=0.01))
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            time.sleep(0.1)
+            response = client.get("/api/health/ready")
+            task = app.state.runtime_monitor._task
+            self.assertTrue(task is not None and not task.done())
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(app.state.runtime_monitor._task is None)
+        self.assertTrue(app.state.runtime_monitor.tokens_total > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import os
+import sys
+from pathlib import Path
+
+import unittest
+import tempfile
+import pstats
+import tracemalloc
+from threading import Thread, Event
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator, ProfilingConfiguration
+from rest_model_service.profiling import Attributions, memory_to_collapsed, _get_method_name
+from tests.mocks import IrisModel, IrisModelInput, IrisModelOutput, Species
+
+
+IRIS_INPUT = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+TOKEN = "secret-token"
+
+
+class AllocatingIrisModel(IrisModel):
+    qualified_name = "allocating_iris_model"
+
+    def predict(self, data):
+        self.allocated = [bytearray(1024) for _ in range(100)]
+        return IrisModelOutput(species=Species.iris_setosa)
+
+
+class FrameIrisModel(IrisModel):
+
+    def predict(self, data):
+        return sys._getframe()
+
+    @classmethod
+    def get_frame(cls):
+        return sys._getframe()
+
+
+class ProfilerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        os.environ["PROFILING_TOKEN"] = TOKEN
+        self.stopped = Event()
+
+    def tearDown(self) -> None:
+        self.stopped.set()
+        os.environ.pop("PROFILING_TOKEN", None)
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self):
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.DelayedIrisModel", create_endpoint=True, configuration={"delay": 0.01},
+                  decorators=[ModelDecorator(class_path="tests.mocks.PredictionIDDecorator")])
+        ], profiling=ProfilingConfiguration(enabled=True, max_seconds=5.0, sampling_interval_seconds=0.005))
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def make_predictions(self):
+        model = ModelManager().get_model("delayed_iris_model")
+
+        def predict():
+            while not self.stopped.is_set():
+                model.predict(IRIS_INPUT)
+
+        thread = Thread(target=predict, daemon=True)
+        thread.start()
+
+    def test_cpu_profile(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            self.make_predictions()
+            response = client.get("/api/admin/profile", params={"seconds": 0.3},
+                                  headers={"Authorization": "Bearer {}".format(TOKEN)})
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        lines = response.text.splitlines()
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(any("tests.mocks:DelayedIrisModel.predict [model delayed_iris_model]" in line
+                            for line in lines))
+        self.assertTrue(any("tests.mocks:PredictionIDDecorator.predict [decorator delayed_iris_model]" in line
+                            for line in lines))
+
+    def test_cpu_profile_in_pstats_format(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            self.make_predictions()
+            response = client.get("/api/admin/profile", params={"seconds": 0.3, "format": "pstats"},
+                                  headers={"Authorization": "Bearer {}".format(TOKEN)})
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "profile.pstats")
+            with open(file_path, "wb") as file:
+                file.write(response.content)
+            stats = pstats.Stats(file_path)
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(any(name == "DelayedIrisModel.predict [model delayed_iris_model]"
+                            for _, _, name in stats.stats))
+        self.assertTrue(stats.total_tt > 0.0)
+
+    def test_memory_profile(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            response = client.get("/api/admin/profile", params={"mode": "memory", "seconds": 0.1},
+                                  headers={"Authorization": "Bearer {}".format(TOKEN)})
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertTrue(not tracemalloc.is_tracing())
+
+    def test_memory_allocations_are_attributed_to_models(self):
+        # arrange
+        model = AllocatingIrisModel()
+        model_manager = ModelManager()
+        model_manager.add_model(model)
+        tracemalloc.start(10)
+
+        # act
+        before = tracemalloc.take_snapshot()
+        model.predict(IRIS_INPUT)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        content = memory_to_collapsed(before, after, Attributions())
+
+        # assert
+        line = [line for line in content.splitlines() if "[model allocating_iris_model]" in line][0]
+        self.assertTrue(int(line.rsplit(" ", 1)[1]) >= 100 * 1024)
+
+    def test_method_names_without_qualified_names_in_code(self):
+        # arrange
+        class SubclassIrisModel(FrameIrisModel):
+            pass
+
+        def function():
+            return sys._getframe()
+
+        # act
+        method_name = _get_method_name(SubclassIrisModel().predict(IRIS_INPUT))
+        class_method_name = _get_method_name(SubclassIrisModel.get_frame())
+        function_name = _get_method_name(function())
+
+        # assert
+        self.assertTrue(method_name == "FrameIrisModel.predict")
+        self.assertTrue(class_method_name == "FrameIrisModel.get_frame")
+        self.assertTrue(function_name == "function")
+
+    def test_bad_requests(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            headers = {"Authorization": "Bearer {}".format(TOKEN)}
+            missing_token_response = client.get("/api/admin/profile", params={"seconds": 0.1})
+            bad_token_response = client.get("/api/admin/profile", params={"seconds": 0.1},
+                                            headers={"Authorization": "Bearer wrong"})
+            long_response = client.get("/api/admin/profile", params={"seconds": 10.0}, headers=headers)
+            memory_pstats_response = client.get("/api/admin/profile",
+                                                params={"mode": "memory", "format": "pstats", "seconds": 0.1},
+                                                headers=headers)
+            os.environ.pop("PROFILING_TOKEN")
+            unset_token_response = client.get("/api/admin/profile", params={"seconds": 0.1}, headers=headers)
+
+        # assert
+        self.assertTrue(missing_token_response.status_code == 401)
+        self.assertTrue(bad_token_response.status_code == 401)
+        self.assertTrue(long_response.status_code == 400)
+        self.assertTrue(memory_pstats_response.status_code == 400)
+        self.assertTrue(unset_token_response.status_code == 403)
+
+    def test_profiling_endpoint_is_not_created_when_disabled(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.get("/api/admin/profile", headers={"Authorization": "Bearer {}".format(TOKEN)})
+            openapi_document = client.get("/openapi.json").json()
+
+        # assert
+        self.assertTrue(response.status_code == 404)
+        self.assertTrue("/api/admin/profile" not in openapi_document["paths"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,11 @@ from pathlib import Path
 import unittest
 from unittest.mock import Mock
 import json
+import io
+import numpy
+import pyarrow
+import msgpack
+import pyarrow.ipc
 from starlette.testclient import TestClient
 from ml_base.utilities import ModelManager
 from ml_base.ml_model import MLModelSchemaValidationException
@@ -11,7 +16,7 @@ from ml_base.ml_model import MLModelSchemaValidationException
 os.chdir(Path(__file__).resolve().parent.parent.parent)
 
 from rest_model_service.helpers import create_app
-from rest_model_service.configuration import ServiceConfiguration, Model
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator
 
 
 class RoutesTests(unittest.TestCase):
@@ -267,6 +272,270 @@ class RoutesTests(unittest.TestCase):
             # assert
             self.assertTrue(response.status_code == 404)
 
+    def test_prediction_with_arrow_stream(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.ColumnarIrisModel",
+                                                           create_endpoint=True,
+                                                           columnar=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        table = pyarrow.table({
+            "sepal_length": [6.0, 7.0],
+            "sepal_width": [5.0, 3.0],
+            "petal_length": [3.0, 2.0],
+            "petal_width": [2.0, 1.0]
+        })
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/columnar_iris_model/prediction",
+                                   content=sink.getvalue().to_pybytes(),
+                                   headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+            json_response = client.post("/api/models/columnar_iris_model/prediction",
+                                        content=sink.getvalue().to_pybytes(),
+                                        headers={"Content-Type": "application/vnd.apache.arrow.stream",
+                                                 "Accept": "application/json"})
+
+            # assert
+            self.assertTrue(response.status_code == 200)
+            self.assertTrue(response.headers["content-type"] == "application/vnd.apache.arrow.stream")
+            self.assertTrue(pyarrow.ipc.open_stream(response.content).read_all().to_pylist() == [
+                {"species": "Iris setosa"},
+                {"species": "Iris setosa"}
+            ])
+            self.assertTrue(json_response.status_code == 200)
+            self.assertTrue(json_response.json() == [{"species": "Iris setosa"}, {"species": "Iris setosa"}])
+
+    def test_prediction_with_arrow_stream_and_bad_data(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.ColumnarIrisModel",
+                                                           create_endpoint=True,
+                                                           columnar=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        table = pyarrow.table({"sepal_length": [16.0]})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/columnar_iris_model/prediction",
+                                   content=sink.getvalue().to_pybytes(),
+                                   headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+
+            # assert
+            self.assertTrue(response.status_code == 400)
+            self.assertTrue(response.json()["type"] == "ValidationError")
+            self.assertTrue(len(response.json()["messages"]) == 4)
+
+    def test_prediction_with_tensor(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.EmbeddingModel",
+                                                           create_endpoint=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        stream = io.BytesIO()
+        numpy.save(stream, numpy.array([3.0, 4.0, 0.0, 0.0], dtype="float32"))
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/embedding_model/prediction",
+                                   content=stream.getvalue(),
+                                   headers={"Content-Type": "application/x-npy"})
+            json_response = client.post("/api/models/embedding_model/prediction",
+                                        json={"embedding": [3.0, 4.0, 0.0, 0.0]})
+
+            # assert
+            self.assertTrue(response.status_code == 200)
+            self.assertTrue(response.json() == {"norm": 5.0})
+            self.assertTrue(json_response.status_code == 200)
+            self.assertTrue(json_response.json() == {"norm": 5.0})
+
+    def test_prediction_with_tensor_with_wrong_shape(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.EmbeddingModel",
+                                                           create_endpoint=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        stream = io.BytesIO()
+        numpy.save(stream, numpy.zeros(3, dtype="float32"))
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/embedding_model/prediction",
+                                   content=stream.getvalue(),
+                                   headers={"Content-Type": "application/x-npy"})
+
+            # assert
+            self.assertTrue(response.status_code == 400)
+            self.assertTrue(response.json() == {
+                "type": "ValidationError",
+                "messages": ["Field 'body, embedding' has error 'tensor_shape', Tensor should have shape (4,), "
+                             "found (3,)."]
+            })
+
+    def test_prediction_with_message_pack(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction",
+                                   content=msgpack.packb({
+                                       "sepal_length": 6.0,
+                                       "sepal_width": 5.0,
+                                       "petal_length": 3.0,
+                                       "petal_width": 2.0
+                                   }),
+                                   headers={"Content-Type": "application/msgpack"})
+            bad_data_response = client.post("/api/models/iris_model/prediction",
+                                            content=msgpack.packb({
+                                                "sepal_length": 16.0,
+                                                "sepal_width": 5.0,
+                                                "petal_length": 3.0,
+                                                "petal_width": 2.0
+                                            }),
+                                            headers={"Content-Type": "application/msgpack"})
+
+            # assert
+            self.assertTrue(response.status_code == 200)
+            self.assertTrue(response.headers["content-type"] == "application/msgpack")
+            self.assertTrue(msgpack.unpackb(response.content) == {"species": "Iris setosa"})
+            self.assertTrue(bad_data_response.status_code == 400)
+            self.assertTrue(msgpack.unpackb(bad_data_response.content) == {
+                "type": "ValidationError",
+                "messages": ["Field 'body, sepal_length' has error 'less_than', Input should be less than 8."]
+            })
+
+    def test_get_models_and_model_metadata_with_message_pack(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            models_response = client.get("/api/models", headers={"Accept": "application/msgpack"})
+            metadata_response = client.get("/api/models/iris_model/metadata",
+                                           headers={"Accept": "application/msgpack"})
+
+            # assert
+            self.assertTrue(models_response.status_code == 200)
+            self.assertTrue(models_response.headers["content-type"] == "application/msgpack")
+            self.assertTrue(msgpack.unpackb(models_response.content)["models"][0]["qualified_name"] == "iris_model")
+            self.assertTrue(metadata_response.status_code == 200)
+            self.assertTrue(metadata_response.headers["content-type"] == "application/msgpack")
+            self.assertTrue(msgpack.unpackb(metadata_response.content)["input_schema"]["title"] == "IrisModelInput")
+
+    def test_openapi_document_includes_message_pack(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        openapi = app.openapi()
+
+        # assert
+        prediction_operation = openapi["paths"]["/api/models/iris_model/prediction"]["post"]
+        self.assertTrue("application/msgpack" in prediction_operation["requestBody"]["content"])
+        self.assertTrue("application/msgpack" in prediction_operation["responses"]["200"]["content"])
+        self.assertTrue("application/msgpack" in
+                        openapi["paths"]["/api/models/{model_qualified_name}/metadata"]["get"]["responses"]["200"]
+                        ["content"])
+
+
+    def test_prediction_with_prediction_dispatcher(self):
+        # arrange
+        configuration = ServiceConfiguration(prediction_dispatcher=True,
+                                             models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True,
+                                                           decorators=[ModelDecorator(
+                                                               class_path="tests.mocks.PredictionIDDecorator")]),
+                                                     Model(class_path="tests.mocks.ColumnarIrisModel",
+                                                           create_endpoint=True,
+                                                           columnar=True),
+                                                     Model(class_path="tests.mocks.IrisModelWithConfiguration",
+                                                           create_endpoint=False)])
+
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        table = pyarrow.table({
+            "sepal_length": [6.0],
+            "sepal_width": [5.0],
+            "petal_length": [3.0],
+            "petal_width": [2.0]
+        })
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        data = {
+            "sepal_length": 6.0,
+            "sepal_width": 5.0,
+            "petal_length": 3.0,
+            "petal_width": 2.0,
+            "prediction_id": "asdf"
+        }
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction", json=data)
+            message_pack_response = client.post("/api/models/iris_model/prediction", content=msgpack.packb(data),
+                                                headers={"Content-Type": "application/msgpack"})
+            arrow_response = client.post("/api/models/columnar_iris_model/prediction",
+                                         content=sink.getvalue().to_pybytes(),
+                                         headers={"Content-Type": "application/vnd.apache.arrow.stream",
+                                                  "Accept": "application/json"})
+            bad_data_response = client.post("/api/models/iris_model/prediction", json={**data, "sepal_length": 16.0})
+            bad_media_type_response = client.post("/api/models/iris_model/prediction", content=b"asdf",
+                                                  headers={"Content-Type": "text/plain"})
+            no_endpoint_response = client.post("/api/models/iris_model_with_configuration/prediction", json=data)
+
+            # assert
+            self.assertTrue(response.status_code == 200)
+            self.assertTrue(response.json() == {"species": "Iris setosa", "prediction_id": "asdf"})
+            self.assertTrue(message_pack_response.status_code == 200)
+            self.assertTrue(msgpack.unpackb(message_pack_response.content)["prediction_id"] == "asdf")
+            self.assertTrue(arrow_response.json() == [{"species": "Iris setosa"}])
+            self.assertTrue(bad_data_response.status_code == 400)
+            self.assertTrue(bad_data_response.json()["type"] == "ValidationError")
+            self.assertTrue("body, sepal_length" in bad_data_response.json()["messages"][0])
+            self.assertTrue(bad_media_type_response.status_code == 400)
+            self.assertTrue(no_endpoint_response.status_code == 404)
+
+    def test_openapi_document_with_prediction_dispatcher(self):
+        # arrange
+        models = [Model(class_path="tests.mocks.IrisModel", create_endpoint=True),
+                  Model(class_path="tests.mocks.EmbeddingModel", create_endpoint=True)]
+
+        app = create_app(ServiceConfiguration(models=models), wait_for_model_creation=True)
+        ModelManager().clear_instance()
+        dispatcher_app = create_app(ServiceConfiguration(models=models, prediction_dispatcher=True),
+                                    wait_for_model_creation=True)
+
+        # act
+        openapi = app.openapi()
+        dispatcher_openapi = dispatcher_app.openapi()
+
+        # assert
+        self.assertTrue(openapi == dispatcher_openapi)
+        self.assertTrue(len([route for route in dispatcher_app.routes
+                             if "prediction" in getattr(route, "path", "")]) == 1)
+
 
 if __name__ == '__main__':
     unittest.main()
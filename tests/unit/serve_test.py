@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+
+import unittest
+import sys
+import time
+import signal
+import socket
+import subprocess
+import urllib.request
+import psutil
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.serve import WorkerSupervisor
+
+
+class CrashingWorkerSupervisor(WorkerSupervisor):
+
+    def _run_worker(self):
+        os._exit(3)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return True
+        except Exception:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+class ServeTests(unittest.TestCase):
+
+    def test_serve_with_workers(self):
+        # arrange
+        port = get_free_port()
+        url = "http://127.0.0.1:{}/api/health/ready".format(port)
+        process = subprocess.Popen([sys.executable, "-m", "rest_model_service.serve",
+                                    "--configuration_file", "examples/rest_config.yaml",
+                                    "--port", str(port), "--workers", "2"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        parent = psutil.Process(process.pid)
+
+        try:
+            # act
+            ready = wait_for(lambda: urllib.request.urlopen(url).status == 200)
+            workers = [child.pid for child in parent.children()]
+            os.kill(workers[0], signal.SIGKILL)
+            restarted = wait_for(lambda: len(parent.children()) == 2 and
+                                 workers[0] not in [child.pid for child in parent.children()])
+            ready_after_restart = wait_for(lambda: urllib.request.urlopen(url).status == 200)
+
+            process.send_signal(signal.SIGTERM)
+            exit_code = process.wait(timeout=30)
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+        # assert
+        self.assertTrue(ready)
+        self.assertTrue(len(workers) == 2)
+        self.assertTrue(restarted)
+        self.assertTrue(ready_after_restart)
+        self.assertTrue(exit_code == 0)
+
+    def test_supervisor_fails_when_workers_keep_failing_on_startup(self):
+        # arrange
+        sock = socket.socket()
+        supervisor = CrashingWorkerSupervisor(None, sock, workers=2, restart_delay=0.05, max_startup_failures=3)
+        handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+
+        # act
+        try:
+            exit_code = supervisor.run()
+        finally:
+            signal.signal(signal.SIGTERM, handlers[0])
+            signal.signal(signal.SIGINT, handlers[1])
+
+        # assert
+        self.assertTrue(exit_code == os.EX_SOFTWARE)
+        self.assertTrue(len(supervisor.workers) == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+from pathlib import Path
+
+import unittest
+import time
+from threading import Event
+from prometheus_client import REGISTRY
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, ShadowConfiguration
+from rest_model_service.background import BackgroundWorker
+from rest_model_service.shadow import ShadowModel
+from tests.mocks import IrisModelInput, IrisModelOutput, CandidateIrisModel, CandidateIrisModelInput
+
+
+def get_shadow_predictions(result):
+    value = REGISTRY.get_sample_value("shadow_predictions_total", {"model": "iris_model",
+                                                                   "shadow_model": "candidate_iris_model",
+                                                                   "result": result})
+    return value if value is not None else 0.0
+
+
+class ShadowModelTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        CandidateIrisModel.inputs = []
+        self.data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+        self.prediction = IrisModelOutput(species="Iris setosa")
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def test_shadow_prediction_agrees(self):
+        # arrange
+        worker = BackgroundWorker("shadow.test")
+        shadow = ShadowModel("iris_model", CandidateIrisModel(), worker)
+        agree_before = get_shadow_predictions("agree")
+
+        # act
+        result = shadow.submit(self.data, self.prediction)
+        worker.join()
+
+        # assert
+        self.assertTrue(result is True)
+        self.assertTrue(len(CandidateIrisModel.inputs) == 1)
+        self.assertTrue(type(CandidateIrisModel.inputs[0]) is CandidateIrisModelInput)
+        self.assertTrue(CandidateIrisModel.inputs[0].sepal_length == 6.0)
+        self.assertTrue(get_shadow_predictions("agree") == agree_before + 1)
+
+    def test_shadow_prediction_disagrees(self):
+        # arrange
+        worker = BackgroundWorker("shadow.test")
+        shadow = ShadowModel("iris_model", CandidateIrisModel(species="Iris virginica"), worker)
+        disagree_before = get_shadow_predictions("disagree")
+
+        # act
+        shadow.submit(self.data, self.prediction)
+        worker.join()
+
+        # assert
+        self.assertTrue(get_shadow_predictions("disagree") == disagree_before + 1)
+
+    def test_shadow_prediction_with_exception(self):
+        # arrange
+        worker = BackgroundWorker("shadow.test")
+        shadow = ShadowModel("iris_model", CandidateIrisModel(fail=True), worker)
+        error_before = get_shadow_predictions("error")
+
+        # act
+        shadow.submit(self.data, self.prediction)
+        worker.join()
+
+        # assert
+        self.assertTrue(get_shadow_predictions("error") == error_before + 1)
+
+    def test_shadow_prediction_sampling(self):
+        # arrange
+        worker = BackgroundWorker("shadow.test")
+        shadow = ShadowModel("iris_model", CandidateIrisModel(), worker, sample_rate=0.0)
+
+        # act
+        results = [shadow.submit(self.data, self.prediction) for _ in range(10)]
+        worker.join()
+
+        # assert
+        self.assertTrue(results == [False] * 10)
+        self.assertTrue(len(CandidateIrisModel.inputs) == 0)
+
+    def test_shadow_predictions_are_dropped_when_queue_is_full(self):
+        # arrange
+        worker = BackgroundWorker("shadow.test", queue_size=1)
+        shadow = ShadowModel("iris_model", CandidateIrisModel(), worker)
+        release = Event()
+
+        # act
+        worker.submit(release.wait)
+        time.sleep(0.1)
+        first_result = shadow.submit(self.data, self.prediction)
+        second_result = shadow.submit(self.data, self.prediction)
+        release.set()
+        worker.join()
+
+        # assert
+        self.assertTrue(first_result is True and second_result is False)
+        self.assertTrue(len(CandidateIrisModel.inputs) == 1)
+
+    def test_prediction_with_shadow_model(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisModel", create_endpoint=True,
+                  shadow=ShadowConfiguration(qualified_name="candidate_iris_model")),
+            Model(class_path="tests.mocks.CandidateIrisModel", create_endpoint=False,
+                  configuration={"delay": 0.5})
+        ])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act
+        with TestClient(app) as client:
+            start = time.perf_counter()
+            response = client.post("/api/models/iris_model/prediction", json={
+                "sepal_length": 6.0,
+                "sepal_width": 5.0,
+                "petal_length": 3.0,
+                "petal_width": 2.0
+            })
+            duration = time.perf_counter() - start
+            inputs_after_response = len(CandidateIrisModel.inputs)
+            time.sleep(1.0)
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(duration < 0.5)
+        self.assertTrue(inputs_after_response == 0)
+        self.assertTrue(len(CandidateIrisModel.inputs) == 1)
+
+    def test_create_app_with_shadow_model_not_loaded(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisModel", create_endpoint=True,
+                  shadow=ShadowConfiguration(qualified_name="candidate_iris_model"))
+        ])
+
+        # act, assert
+        with self.assertRaises(ValueError):
+            create_app(configuration, wait_for_model_creation=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import time
+from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor
+
+from rest_model_service.singleflight import SingleFlight
+from rest_model_service.routes import PredictionController
+from tests.mocks import IrisModel, IrisModelInput, IrisModelOutput, Species
+
+
+class SlowCountingIrisModel(IrisModel):
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, data):
+        self.calls += 1
+        time.sleep(0.5)
+        return IrisModelOutput(species=Species.iris_setosa)
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_concurrent_calls_with_same_key_share_one_call(self):
+        # arrange
+        single_flight = SingleFlight()
+        calls = []
+
+        def function(value):
+            calls.append(value)
+            time.sleep(0.5)
+            return value * 2
+
+        # act
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(single_flight.do, "key", function, 21) for _ in range(5)]
+            results = [future.result() for future in futures]
+
+        # assert
+        self.assertTrue(len(calls) == 1)
+        self.assertTrue([result for result, _ in results] == [42] * 5)
+        self.assertTrue(len([shared for _, shared in results if shared]) == 4)
+
+    def test_calls_with_different_keys_are_not_shared(self):
+        # arrange
+        single_flight = SingleFlight()
+        calls = []
+
+        def function(value):
+            calls.append(value)
+            time.sleep(0.2)
+            return value
+
+        # act
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first_future = executor.submit(single_flight.do, "first", function, 1)
+            second_future = executor.submit(single_flight.do, "second", function, 2)
+
+        # assert
+        self.assertTrue(sorted(calls) == [1, 2])
+        self.assertTrue(first_future.result() == (1, False))
+        self.assertTrue(second_future.result() == (2, False))
+
+    def test_results_are_not_retained_after_call_completes(self):
+        # arrange
+        single_flight = SingleFlight()
+        calls = []
+
+        # act
+        single_flight.do("key", calls.append, 1)
+        single_flight.do("key", calls.append, 2)
+
+        # assert
+        self.assertTrue(calls == [1, 2])
+        self.assertTrue(single_flight._calls == {})
+
+    def test_exception_is_raised_in_all_callers(self):
+        # arrange
+        single_flight = SingleFlight()
+        started = Event()
+        errors = []
+
+        def function():
+            started.set()
+            time.sleep(0.2)
+            raise ValueError("Exception!")
+
+        def caller():
+            try:
+                single_flight.do("key", function)
+            except ValueError as e:
+                errors.append(e)
+
+        # act
+        first_thread = Thread(target=caller)
+        first_thread.start()
+        started.wait()
+        second_thread = Thread(target=caller)
+        second_thread.start()
+        first_thread.join()
+        second_thread.join()
+
+        # assert
+        self.assertTrue(len(errors) == 2)
+        self.assertTrue(single_flight._calls == {})
+
+    def test_prediction_controller_coalesces_identical_predictions(self):
+        # arrange
+        model = SlowCountingIrisModel()
+        controller = PredictionController(model=model, coalesce=True)
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+        other_data = IrisModelInput(sepal_length=7.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(controller.predict, data) for _ in range(3)]
+            futures.append(executor.submit(controller.predict, other_data))
+            predictions = [future.result() for future in futures]
+
+        # assert
+        self.assertTrue(model.calls == 2)
+        self.assertTrue(all(prediction.species == Species.iris_setosa for prediction in predictions))
+
+    def test_prediction_controller_does_not_coalesce_by_default(self):
+        # arrange
+        model = SlowCountingIrisModel()
+        controller = PredictionController(model=model)
+        data = IrisModelInput(sepal_length=6.0, sepal_width=5.0, petal_length=3.0, petal_width=2.0)
+
+        # act
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(controller.predict, data) for _ in range(3)]
+            _ = [future.result() for future in futures]
+
+        # assert
+        self.assertTrue(model.calls == 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
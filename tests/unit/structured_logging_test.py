@@ -0,0 +1,185 @@
+import os
+from pathlib import Path
+
+import unittest
+import sys
+import json
+import logging
+import logging.config
+from io import StringIO
+from unittest.mock import patch
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration
+from rest_model_service.structured_logging import JSONFormatter, BackgroundHandler, RateLimitingFilter, \
+    configure_logging
+
+
+def create_record(msg="Message %s.", args=("asdf",), level=logging.ERROR, exc_info=None, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+class StructuredLoggingTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def test_json_formatter(self):
+        # arrange
+        formatter = JSONFormatter()
+        try:
+            raise ValueError("Exception!")
+        except ValueError:
+            exc_info = sys.exc_info()
+        record = create_record(exc_info=exc_info, endpoint="/api/models", suppressed=3)
+
+        # act
+        document = json.loads(formatter.format(record))
+
+        # assert
+        self.assertTrue(document["level"] == "ERROR")
+        self.assertTrue(document["logger"] == "test")
+        self.assertTrue(document["message"] == "Message asdf.")
+        self.assertTrue(document["endpoint"] == "/api/models")
+        self.assertTrue(document["suppressed"] == 3)
+        self.assertTrue("ValueError: Exception!" in document["exception"])
+        self.assertTrue("msg" not in document and "args" not in document)
+
+    def test_rate_limiting_filter(self):
+        # arrange
+        rate_limiting_filter = RateLimitingFilter(rate=0.0, burst=2)
+
+        # act
+        results = [rate_limiting_filter.filter(create_record(args=(i,))) for i in range(5)]
+        other_result = rate_limiting_filter.filter(create_record(msg="Other message."))
+        info_result = rate_limiting_filter.filter(create_record(level=logging.INFO))
+
+        # assert
+        self.assertTrue(results == [True, True, False, False, False])
+        self.assertTrue(other_result is True)
+        self.assertTrue(info_result is True)
+
+    def test_rate_limiting_filter_reports_suppressed_records(self):
+        # arrange
+        rate_limiting_filter = RateLimitingFilter(rate=0.0, burst=1)
+        records = [create_record() for _ in range(4)]
+
+        # act
+        _ = [rate_limiting_filter.filter(record) for record in records[:3]]
+        with patch.object(rate_limiting_filter, "sample_rate", 1.0):
+            sampled_result = rate_limiting_filter.filter(records[3])
+
+        # assert
+        self.assertTrue(sampled_result is True)
+        self.assertTrue(records[3].suppressed == 2)
+        self.assertTrue(not hasattr(records[0], "suppressed"))
+
+    def test_rate_limiting_filter_bounds_the_number_of_groups(self):
+        # arrange
+        rate_limiting_filter = RateLimitingFilter(rate=0.0, burst=1, max_groups=2)
+
+        # act
+        first_results = [rate_limiting_filter.filter(create_record(msg="First %s.")) for _ in range(2)]
+        _ = rate_limiting_filter.filter(create_record(msg="Second %s."))
+        _ = rate_limiting_filter.filter(create_record(msg="First %s."))
+        _ = rate_limiting_filter.filter(create_record(msg="Third %s."))
+        first_result = rate_limiting_filter.filter(create_record(msg="First %s."))
+        second_result = rate_limiting_filter.filter(create_record(msg="Second %s."))
+
+        # assert
+        self.assertTrue(first_results == [True, False])
+        self.assertTrue(len(rate_limiting_filter._buckets) == 2)
+        self.assertTrue(first_result is False)
+        self.assertTrue(second_result is True)
+
+    def test_background_handler(self):
+        # arrange
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JSONFormatter())
+        handler = BackgroundHandler(targets=[target], queue_size=10)
+
+        # act
+        for i in range(3):
+            handler.handle(create_record(args=(i,)))
+        handler.close()
+
+        # assert
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertTrue([line["message"] for line in lines] == ["Message 0.", "Message 1.", "Message 2."])
+
+    def test_structured_logging_configuration(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[], logging="structured")
+        root_logger = logging.getLogger()
+        root_handlers = root_logger.handlers[:]
+        root_level = root_logger.level
+
+        # act
+        try:
+            _ = create_app(configuration, wait_for_model_creation=True)
+            handlers = root_logger.handlers[:]
+        finally:
+            for handler in root_logger.handlers[:]:
+                root_logger.removeHandler(handler)
+                handler.close()
+            for handler in root_handlers:
+                root_logger.addHandler(handler)
+            root_logger.setLevel(root_level)
+
+        # assert
+        self.assertTrue(len(handlers) == 1)
+        self.assertTrue(type(handlers[0]) is BackgroundHandler)
+        self.assertTrue(type(handlers[0].filters[0]) is RateLimitingFilter)
+        self.assertTrue(type(handlers[0].targets[0]) is logging.StreamHandler)
+
+    def test_configure_logging_resolves_targets(self):
+        # arrange
+        configuration = {
+            "version": 1,
+            "handlers": {
+                "a_background": {
+                    "class": "rest_model_service.structured_logging.BackgroundHandler",
+                    "targets": ["z_target"]
+                },
+                "z_target": {
+                    "class": "logging.StreamHandler",
+                    "stream": "ext://sys.stdout"
+                }
+            },
+            "loggers": {
+                "test_configure_logging": {
+                    "handlers": ["a_background"]
+                }
+            }
+        }
+        bad_configuration = {
+            "version": 1,
+            "handlers": {
+                "background": {
+                    "class": "rest_model_service.structured_logging.BackgroundHandler",
+                    "targets": ["missing"]
+                }
+            }
+        }
+
+        # act
+        configure_logging(configuration)
+        handler = logging.getLogger("test_configure_logging").handlers[0]
+        handler.close()
+
+        # assert
+        self.assertTrue(type(handler) is BackgroundHandler)
+        self.assertTrue(handler.targets[0].name == "z_target")
+        with self.assertRaises(ValueError):
+            configure_logging(bad_configuration)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+from pathlib import Path
+
+import json
+import tempfile
+import unittest
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, ModelDecorator, TracingConfiguration
+from rest_model_service.decorator_pipeline import DecoratorPipeline
+from rest_model_service import tracing
+from tests.mocks import IrisModel
+
+
+IRIS_INPUT = {
+    "sepal_length": 6.0,
+    "sepal_width": 5.0,
+    "petal_length": 3.0,
+    "petal_width": 2.0
+}
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def read_spans(file_path):
+    with open(file_path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class TracingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "traces.jsonl")
+
+    def tearDown(self) -> None:
+        tracing.shutdown()
+        self.directory.cleanup()
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self, prediction_dispatcher=False, **kwargs):
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisModel", create_endpoint=True,
+                  decorators=[ModelDecorator(class_path="tests.mocks.PredictionIDDecorator")]),
+            Model(class_path="tests.mocks.DelayedIrisModel", create_endpoint=True, configuration={"delay": 0.2}),
+            Model(class_path="tests.mocks.IrisScoreModel", create_endpoint=True)
+        ], prediction_dispatcher=prediction_dispatcher,
+            tracing=TracingConfiguration(enabled=True, exporter="file", file_path=self.file_path, **kwargs))
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def test_spans_of_prediction(self):
+        # arrange
+        app = self.create_app(head_sample_rate=1.0)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction", json=IRIS_INPUT)
+        spans = read_spans(self.file_path)
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        names = {span["name"] for span in spans}
+        self.assertTrue(names == {"POST /api/models/iris_model/prediction", "routing", "validation", "queue",
+                                  "predict", "decorator PredictionIDDecorator", "model IrisModel",
+                                  "serialization"})
+        self.assertTrue(len({span["context"]["trace_id"] for span in spans}) == 1)
+        request_span = [span for span in spans if span["parent_id"] is None][0]
+        self.assertTrue(request_span["attributes"]["http.response.status_code"] == 200)
+
+    def test_trace_context_of_caller_is_continued(self):
+        # arrange
+        app = self.create_app(head_sample_rate=0.0)
+
+        # act
+        with TestClient(app) as client:
+            client.post("/api/models/iris_model/prediction", json=IRIS_INPUT,
+                        headers={"traceparent": "00-{}-00f067aa0ba902b7-01".format(TRACE_ID)})
+            client.post("/api/models/iris_model/prediction", json=IRIS_INPUT)
+        spans = read_spans(self.file_path)
+
+        # assert
+        self.assertTrue(len(spans) > 0)
+        self.assertTrue(all(span["context"]["trace_id"] == "0x" + TRACE_ID for span in spans))
+        request_span = [span for span in spans if span["kind"] == "SpanKind.SERVER"][0]
+        self.assertTrue(request_span["parent_id"] == "0x00f067aa0ba902b7")
+
+    def test_spans_of_prediction_with_dispatcher(self):
+        # arrange
+        app = self.create_app(prediction_dispatcher=True, head_sample_rate=1.0)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction", json=IRIS_INPUT)
+            bad_response = client.post("/api/models/iris_model/prediction", json={"sepal_length": 6.0})
+        spans = read_spans(self.file_path)
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(bad_response.status_code == 400)
+        names = [span["name"] for span in spans]
+        self.assertTrue(names.count("POST /api/models/{model_qualified_name}/prediction") == 2)
+        self.assertTrue(names.count("predict") == 1)
+
+    def test_tail_sampling_of_slow_traces(self):
+        # arrange
+        app = self.create_app(head_sample_rate=0.0, tail_latency_threshold_seconds=0.1)
+
+        # act
+        with TestClient(app) as client:
+            client.post("/api/models/iris_model/prediction", json=IRIS_INPUT)
+            client.post("/api/models/delayed_iris_model/prediction", json=IRIS_INPUT)
+        spans = read_spans(self.file_path)
+
+        # assert
+        request_spans = [span["name"] for span in spans if span["parent_id"] is None]
+        self.assertTrue(request_spans == ["POST /api/models/delayed_iris_model/prediction"])
+        self.assertTrue(len(spans) > 1)
+
+    def test_tail_sampling_of_failed_traces(self):
+        # arrange
+        app = self.create_app(head_sample_rate=0.0, tail_sample_errors=True)
+
+        # act
+        with TestClient(app) as client:
+            client.post("/api/models/iris_score_model/prediction", json={"sepal_area": 1.0, "petal_area": 1.0})
+            response = client.post("/api/models/iris_score_model/prediction",
+                                   json={"sepal_area": -1.0, "petal_area": 1.0})
+        spans = read_spans(self.file_path)
+
+        # assert
+        self.assertTrue(response.status_code == 500)
+        request_spans = [span for span in spans if span["parent_id"] is None]
+        self.assertTrue(len(request_spans) == 1)
+        self.assertTrue(request_spans[0]["status"]["status_code"] == "ERROR")
+        predict_span = [span for span in spans if span["name"] == "predict"][0]
+        self.assertTrue(predict_span["status"]["status_code"] == "ERROR")
+
+    def test_no_spans_are_exported_without_sampling(self):
+        # arrange
+        app = self.create_app(head_sample_rate=0.0)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_model/prediction", json=IRIS_INPUT)
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(not os.path.exists(self.file_path) or read_spans(self.file_path) == [])
+
+    def test_tracing_disabled(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+
+        # act
+        create_app(configuration, wait_for_model_creation=True)
+        pipeline = DecoratorPipeline(IrisModel())
+
+        # assert
+        self.assertTrue(not tracing.is_enabled())
+        self.assertTrue("predict" not in pipeline.model.__dict__)
+        with tracing.span("predict") as span:
+            self.assertTrue(span is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
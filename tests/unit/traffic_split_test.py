@@ -0,0 +1,189 @@
+import os
+from pathlib import Path
+
+import unittest
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, TrafficSplitConfiguration, \
+    TrafficSplitVariant
+from rest_model_service.routes import PredictionController
+from rest_model_service.traffic_split import TrafficSplitController
+from tests.mocks import IrisModel, CandidateIrisModel
+
+
+IRIS_INPUT = {
+    "sepal_length": 6.0,
+    "sepal_width": 5.0,
+    "petal_length": 3.0,
+    "petal_width": 2.0
+}
+
+
+class TrafficSplitControllerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.variants = {
+            "iris_model": PredictionController(IrisModel()),
+            "candidate_iris_model": PredictionController(CandidateIrisModel(species="Iris virginica"))
+        }
+
+    def test_choose_variant_by_weight(self):
+        # arrange
+        controller = TrafficSplitController("iris_split", self.variants, {"iris_model": 1.0,
+                                                                          "candidate_iris_model": 3.0})
+
+        # act
+        variants = [controller.choose_variant() for _ in range(4000)]
+
+        # assert
+        share = variants.count("candidate_iris_model") / len(variants)
+        self.assertTrue(0.7 < share < 0.8)
+
+    def test_choose_variant_with_key_is_sticky(self):
+        # arrange
+        controller = TrafficSplitController("iris_split", self.variants, {"iris_model": 1.0,
+                                                                          "candidate_iris_model": 1.0})
+
+        # act
+        variants = {key: {controller.choose_variant(key) for _ in range(10)}
+                    for key in ["user-{}".format(i) for i in range(100)]}
+
+        # assert
+        self.assertTrue(all(len(assigned) == 1 for assigned in variants.values()))
+        self.assertTrue({assigned.pop() for assigned in variants.values()} == set(self.variants))
+
+    def test_set_weights(self):
+        # arrange
+        controller = TrafficSplitController("iris_split", self.variants, {"iris_model": 1.0})
+
+        # act
+        variants_before = {controller.choose_variant() for _ in range(100)}
+        controller.set_weights({"candidate_iris_model": 2.0})
+        variants_after = {controller.choose_variant() for _ in range(100)}
+
+        # assert
+        self.assertTrue(variants_before == {"iris_model"})
+        self.assertTrue(variants_after == {"candidate_iris_model"})
+        self.assertTrue(controller.get_weights() == {"iris_model": 0.0, "candidate_iris_model": 2.0})
+
+    def test_set_weights_with_bad_weights(self):
+        # arrange
+        controller = TrafficSplitController("iris_split", self.variants, {"iris_model": 1.0})
+
+        # act, assert
+        with self.assertRaises(ValueError):
+            controller.set_weights({"unknown_model": 1.0})
+        with self.assertRaises(ValueError):
+            controller.set_weights({"iris_model": -1.0})
+        with self.assertRaises(ValueError):
+            controller.set_weights({"iris_model": 0.0})
+        self.assertTrue(controller.get_weights() == {"iris_model": 1.0, "candidate_iris_model": 0.0})
+
+
+class TrafficSplitEndpointTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self, runtime_updates=False, prediction_dispatcher=False):
+        configuration = ServiceConfiguration(
+            models=[
+                Model(class_path="tests.mocks.IrisModel", create_endpoint=True),
+                Model(class_path="tests.mocks.CandidateIrisModel", create_endpoint=False,
+                      configuration={"species": "Iris virginica"})
+            ],
+            traffic_splits=[
+                TrafficSplitConfiguration(qualified_name="iris_split",
+                                          variants=[TrafficSplitVariant(qualified_name="iris_model", weight=1.0),
+                                                    TrafficSplitVariant(qualified_name="candidate_iris_model",
+                                                                        weight=1.0)],
+                                          runtime_updates=runtime_updates)
+            ],
+            prediction_dispatcher=prediction_dispatcher)
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def test_prediction_with_traffic_split(self):
+        # arrange
+        app = self.create_app()
+        species = {"iris_model": "Iris setosa", "candidate_iris_model": "Iris virginica"}
+
+        # act
+        with TestClient(app) as client:
+            responses = [client.post("/api/models/iris_split/prediction", json=IRIS_INPUT,
+                                     headers={"X-Routing-Key": "user-{}".format(i % 10)}) for i in range(40)]
+
+        # assert
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertTrue(all(response.json()["species"] == species[response.headers["X-Model-Variant"]]
+                            for response in responses))
+        self.assertTrue({response.headers["X-Model-Variant"] for response in responses} == set(species))
+        for i in range(10):
+            self.assertTrue(len({response.headers["X-Model-Variant"] for response in responses[i::10]}) == 1)
+
+    def test_prediction_with_traffic_split_and_prediction_dispatcher(self):
+        # arrange
+        app = self.create_app(prediction_dispatcher=True)
+
+        # act
+        with TestClient(app) as client:
+            response = client.post("/api/models/iris_split/prediction", json=IRIS_INPUT)
+            openapi_document = client.get("/openapi.json").json()
+
+        # assert
+        self.assertTrue(response.status_code == 200)
+        self.assertTrue(response.headers["X-Model-Variant"] in {"iris_model", "candidate_iris_model"})
+        self.assertTrue("/api/models/iris_split/prediction" in openapi_document["paths"])
+
+    def test_change_weights_at_runtime(self):
+        # arrange
+        app = self.create_app(runtime_updates=True)
+
+        # act
+        with TestClient(app) as client:
+            update_response = client.put("/api/models/iris_split/traffic_split",
+                                         json={"weights": {"candidate_iris_model": 1.0}})
+            weights_response = client.get("/api/models/iris_split/traffic_split")
+            responses = [client.post("/api/models/iris_split/prediction", json=IRIS_INPUT) for _ in range(10)]
+            bad_update_response = client.put("/api/models/iris_split/traffic_split",
+                                             json={"weights": {"unknown_model": 1.0}})
+
+        # assert
+        self.assertTrue(update_response.status_code == 200)
+        self.assertTrue(weights_response.json() == {"qualified_name": "iris_split",
+                                                    "weights": {"iris_model": 0.0, "candidate_iris_model": 1.0}})
+        self.assertTrue(all(response.headers["X-Model-Variant"] == "candidate_iris_model" for response in responses))
+        self.assertTrue(bad_update_response.status_code == 400)
+
+    def test_change_weights_without_runtime_updates(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            response = client.put("/api/models/iris_split/traffic_split",
+                                  json={"weights": {"candidate_iris_model": 1.0}})
+
+        # assert
+        self.assertTrue(response.status_code == 405)
+
+    def test_traffic_split_with_model_not_loaded(self):
+        # arrange
+        configuration = ServiceConfiguration(
+            models=[Model(class_path="tests.mocks.IrisModel", create_endpoint=True)],
+            traffic_splits=[
+                TrafficSplitConfiguration(qualified_name="iris_split",
+                                          variants=[TrafficSplitVariant(qualified_name="candidate_iris_model")])
+            ])
+
+        # act, assert
+        with self.assertRaises(ValueError):
+            create_app(configuration, wait_for_model_creation=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+from pathlib import Path
+
+import unittest
+from prometheus_client import REGISTRY
+from starlette.testclient import TestClient
+from ml_base.utilities import ModelManager
+
+os.chdir(Path(__file__).resolve().parent.parent.parent)
+
+from rest_model_service.helpers import create_app
+from rest_model_service.configuration import ServiceConfiguration, Model, WebSocketConfiguration
+
+
+IRIS_INPUT = {
+    "sepal_length": 6.0,
+    "sepal_width": 5.0,
+    "petal_length": 3.0,
+    "petal_width": 2.0
+}
+
+
+class WebSocketEndpointTests(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        model_manager = ModelManager()
+        model_manager.clear_instance()
+
+    def create_app(self, max_in_flight=32):
+        configuration = ServiceConfiguration(models=[
+            Model(class_path="tests.mocks.IrisModel", create_endpoint=True),
+            Model(class_path="tests.mocks.DelayedIrisModel", create_endpoint=True, configuration={"delay": 0.3}),
+            Model(class_path="tests.mocks.IrisScoreModel", create_endpoint=True)
+        ], websocket=WebSocketConfiguration(enabled=True, max_in_flight=max_in_flight))
+        return create_app(configuration, wait_for_model_creation=True)
+
+    def test_prediction(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_json({"id": "a", "model": "iris_model", "data": IRIS_INPUT})
+                response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(response == {"id": "a", "status": 200, "result": {"species": "Iris setosa"}})
+
+    def test_responses_are_sent_out_of_order(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_json({"id": 1, "model": "delayed_iris_model", "data": IRIS_INPUT})
+                websocket.send_json({"id": 2, "model": "iris_model", "data": IRIS_INPUT})
+                first_response = websocket.receive_json()
+                second_response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(first_response["id"] == 2)
+        self.assertTrue(second_response["id"] == 1)
+        self.assertTrue(second_response["result"] == {"species": "Iris setosa"})
+
+    def test_requests_in_flight_are_limited(self):
+        # arrange
+        app = self.create_app(max_in_flight=1)
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_json({"id": 1, "model": "delayed_iris_model", "data": IRIS_INPUT})
+                websocket.send_json({"id": 2, "model": "iris_model", "data": IRIS_INPUT})
+                first_response = websocket.receive_json()
+                second_response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(first_response["id"] == 1)
+        self.assertTrue(second_response["id"] == 2)
+
+    def test_errors(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_json({"id": 1, "model": "iris_model", "data": {"sepal_length": 6.0}})
+                validation_response = websocket.receive_json()
+                websocket.send_json({"id": 2, "model": "unknown_model", "data": IRIS_INPUT})
+                not_found_response = websocket.receive_json()
+                websocket.send_text("not json")
+                bad_message_response = websocket.receive_json()
+                websocket.send_json({"id": 3, "model": "iris_score_model",
+                                     "data": {"sepal_area": -1.0, "petal_area": 1.0}})
+                exception_response = websocket.receive_json()
+                websocket.send_json({"id": 4, "model": "iris_model", "data": IRIS_INPUT})
+                response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(validation_response["status"] == 400)
+        self.assertTrue(validation_response["error"]["type"] == "ValidationError")
+        self.assertTrue(validation_response["error"]["messages"][0].startswith("Field 'sepal_width' has error"))
+        self.assertTrue(not_found_response["status"] == 404)
+        self.assertTrue(bad_message_response["id"] is None and bad_message_response["status"] == 400)
+        self.assertTrue(exception_response["status"] == 500)
+        self.assertTrue(exception_response["error"]["type"] == "ServiceError")
+        self.assertTrue(response["status"] == 200)
+
+    def test_bad_messages_do_not_block_the_connection(self):
+        # arrange
+        app = self.create_app(max_in_flight=2)
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_json({"id": 1, "model": ["iris_model"], "data": IRIS_INPUT})
+                websocket.send_json({"id": 2, "model": {"name": "iris_model"}, "data": IRIS_INPUT})
+                first_response = websocket.receive_json()
+                second_response = websocket.receive_json()
+                websocket.send_json({"id": 3, "model": "iris_model", "data": IRIS_INPUT})
+                response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(first_response["status"] == 400 and second_response["status"] == 400)
+        self.assertTrue(first_response["error"]["type"] == "ValidationError")
+        self.assertTrue(response["id"] == 3 and response["status"] == 200)
+
+    def test_binary_messages(self):
+        # arrange
+        app = self.create_app()
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                websocket.send_bytes(b'{"id": 1, "model": "iris_model"}')
+                binary_response = websocket.receive_json()
+                websocket.send_json({"id": 2, "model": "iris_model", "data": IRIS_INPUT})
+                response = websocket.receive_json()
+
+        # assert
+        self.assertTrue(binary_response["id"] is None and binary_response["status"] == 400)
+        self.assertTrue(binary_response["error"]["type"] == "ValidationError")
+        self.assertTrue(response["id"] == 2 and response["status"] == 200)
+
+    def test_unknown_models_share_a_metric_label(self):
+        # arrange
+        app = self.create_app()
+        before = REGISTRY.get_sample_value("websocket_messages_total", {"model": "unknown", "status": "404"}) or 0.0
+
+        # act
+        with TestClient(app) as client:
+            with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                for name in ["first_unknown_model", "second_unknown_model"]:
+                    websocket.send_json({"id": name, "model": name, "data": IRIS_INPUT})
+                    websocket.receive_json()
+
+        # assert
+        after = REGISTRY.get_sample_value("websocket_messages_total", {"model": "unknown", "status": "404"})
+        self.assertTrue(after - before == 2.0)
+        self.assertTrue(REGISTRY.get_sample_value("websocket_messages_total",
+                                                  {"model": "first_unknown_model", "status": "404"}) is None)
+
+    def test_websocket_endpoint_is_not_created_when_disabled(self):
+        # arrange
+        configuration = ServiceConfiguration(models=[Model(class_path="tests.mocks.IrisModel",
+                                                           create_endpoint=True)])
+        app = create_app(configuration, wait_for_model_creation=True)
+
+        # act, assert
+        with TestClient(app) as client:
+            with self.assertRaises(Exception):
+                with client.websocket_connect("/api/models/predictions/ws") as websocket:
+                    websocket.receive_json()
+
+
+if __name__ == '__main__':
+    unittest.main()